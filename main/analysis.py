@@ -6,30 +6,83 @@ data.
 
 This script requires that `pandas`, `numpy`, `scipy`and 
 `mathplotlib` are installed within the Python environment. 
+`scipy` is only imported by the functions which use it.
 
 This program is written with Python version 3.7.3 with Spyder IDE.
 
 This file is imported as a module and contains the following functions:
     * fundmagphase - Main function which analyzes voltage data 
+    * fundmagphase_config - Runs fundmagphase with an AnalysisConfig object
+    * precision_report - Compares fundmagphase in double and single precision
+    * precision_report_config - Runs precision_report with an AnalysisConfig object
+    * decimation_factor - Returns the decimation factor of a sample rate
+    * decimate_run - Decimates a voltage run with an anti-alias filter
+    * decimation_report - Compares fundmagphase with and without decimation
+    * decimation_report_config - Runs decimation_report with an AnalysisConfig object
+    * fundmagphase_windows - Analyzes sliding windows of voltage data
+    * fundmagphase_windows_config - Runs fundmagphase_windows with an AnalysisConfig object
+    * harmonic_dft - Returns the spectrum of a signal at a handful of bins
+    * harmonic_synthesis - Returns the signal of a spectrum with a handful of nonzero bins
+    * fit_sin_batch - Fits sine waves of known frequency to many traces at once
+    * opt_freq - Finds the drive frequency of a voltage run
+    * opt_freq_search - Runs the search of opt_freq, optionally around a seed
+    * peak_freq - Returns the frequency of the largest bin of a spectrum
+    * pi_mod - Reduces angles to [0, 2*pi]
+    * pi_mod_array - Reduces and re-centres phases by majority vote
+    * unwrap_phase - Removes jumps of 2*pi between consecutive phases
     
 """
 
 import os
 import numpy as np
 import math
-import scipy
-from scipy.interpolate import interp1d
 import pandas as pd
+from time import perf_counter
 from typing import Dict, List, Tuple, Callable
+from instrumentation import Instrumentation, NULL_INSTRUMENTATION
+from fftbackend import FFTBackend, NUMPY_BACKEND, getBackend, planLength
+from reference import EmptyReference
 
 pi = math.pi
 
+"""
+Calib factors from Jackson 2018-2019
+# in units of kA/m per V-s
+#M_CALIB_FACTOR = -9.551e6
+#H_CALIB_FACTOR = -1.88e7
+"""
+
+"""
+Calib factors from Zoe August 2019
+in units of kA/m per V-s
+M_CALIB_FACTOR = -9.551e6
+H_CALIB_FACTOR = -2.26e7
+"""
+
+"""
+Calib factors from Zoe January 2021
+in units of kA/m per V-s
+"""
+M_CALIB_FACTOR = -9.551e6*.47
+H_CALIB_FACTOR = -2.26e7
+
+"""
+Anti-alias filter of decimate_run, with this many taps per decimated sample
+on each side and this Kaiser window parameter
+"""
+DECIMATION_TAPS_PER_SAMPLE = 20
+DECIMATION_KAISER_BETA = 10.0
+
 def fundmagphase(ambrelldata: pd.DataFrame, Mgdata: pd.DataFrame, Hgdata: pd.DataFrame, high_cutoff_freq: int,
                  known_freq: int, MoverHrealforsub: float, MoverHimagforsub: float, MoverHforcalib: float,
                  pMminuspHforphaseadj: float, MoverH0forsubtraction: float, Hphaserealforsub: float, Hphaseimagforsub: float,
                  est_num_periods: int, begintime: int, polarity: float, temperature: float=np.nan, time: float=np.nan,
                  isNonLinearSub: bool = False, Mspecrealforsub: List[float] = None, runNum: int =np.nan,
-                 Mspecimagforsub: List[float] = None) -> Tuple[pd.DataFrame, Dict[str, float]]:
+                 Mspecimagforsub: List[float] = None, captureTemperature: float = np.nan,
+                 timer: Instrumentation = None, engine: str = "fft", fft_backend: FFTBackend = None,
+                 fft_length: str = "exact", precision: str = "double",
+                 empty_reference: EmptyReference = None, frequency_cache: 'FrequencyCache' = None,
+                 frequency_key: Tuple[str, int] = None, decimate: bool = False) -> Tuple[pd.DataFrame, Dict[str, float]]:
     """
     
 
@@ -86,6 +139,56 @@ def fundmagphase(ambrelldata: pd.DataFrame, Mgdata: pd.DataFrame, Hgdata: pd.Dat
     
     isNonLinearSub: bool, optional
         Instructs if fundmagphase should perform a linear or non-linear subtraction of background noise
+    captureTemperature : float, optional
+        Mean temperature of the Temp-V-Time Series data during collection of voltage run
+        time-series dataset. The default is np.nan.
+    timer : Instrumentation, optional
+        Records the stages "frequency", "fft", "correction", "reconstruction" and
+        "metrics" of the analysis. The default is None, which records nothing.
+    engine : str, optional
+        "fft" transforms the whole window. "sparse" evaluates only the bins
+        kept by the G-Factor correction (DC, fundamental and odd harmonics
+        below high_cutoff_freq) with a direct DFT and synthesizes the
+        reconstructed signals from them, so M_SPECTRUM_REAL and
+        M_SPECTRUM_IMAG are 0 at every other bin. The fundamental is searched
+        within 2 bins of est_num_periods. The default is "fft".
+    fft_backend : FFTBackend, optional
+        Backend of all Fourier transforms. The default is None, which is `np.fft`.
+    fft_length : str, optional
+        "exact" analyzes est_num_periods periods. "trim" analyzes fewer whole
+        periods, at least half of them, when that gives a faster transform
+        length. "resample" linearly interpolates the est_num_periods periods
+        onto the next fast transform length. Either length is only used when
+        its transform is measured to be faster, otherwise the window is kept
+        as with "exact". The chosen length and the measured speedup of its
+        transform are the properties FFT_LENGTH and FFT_SPEEDUP. The default
+        is "exact".
+    precision : str, optional
+        "double" analyzes the voltages in float64 and complex128. "single"
+        analyzes them, their spectra and the reconstructed signals in float32
+        and complex64, which halves the memory of the analysis. Sample times
+        stay float64. See precision_report for the resulting error.
+        The default is "double".
+    empty_reference : EmptyReference, optional
+        Empty field reference subtracted when isNonLinearSub is True. The
+        default is None, which builds it from Mspecrealforsub, Mspecimagforsub,
+        Hphaserealforsub and Hphaseimagforsub.
+    frequency_cache : FrequencyCache, optional
+        Frequencies of previous runs of the `frequency` module, which seed the
+        opt_freq search when known_freq is 0. The default is None, which
+        runs the full search.
+    frequency_key : Tuple[str, int], optional
+        Date-time and collection kind of the run, under which frequency_cache
+        holds the frequency of its collection. The default is None.
+    decimate : bool, optional
+        Decimates the voltages by the factor of decimation_factor before the
+        analysis, see decimate_run. The factor divides the samples of a drive
+        period, so the analyzed window is the one of the undecimated voltages.
+        When known_freq is 0 the frequency is searched on the voltages
+        decimated by the largest factor, whose truncation lengths are coarser.
+        The factor is the property DECIMATION. V_H_MAX is the peak of the
+        undecimated H voltages. See decimation_report for the resulting
+        error, of which HC has the largest. The default is False.
     Returns
     -------
     logger : pd.DataFrame
@@ -96,41 +199,44 @@ def fundmagphase(ambrelldata: pd.DataFrame, Mgdata: pd.DataFrame, Hgdata: pd.Dat
     """
     
 
-    """
-    Calib factors from Jackson 2018-2019
-    # in units of kA/m per V-s
-    #M_CALIB_FACTOR = -9.551e6
-    #H_CALIB_FACTOR = -1.88e7
-    """
-    
-    """
-    Calib factors from Zoe August 2019
-    in units of kA/m per V-s
-    M_CALIB_FACTOR = -9.551e6
-    H_CALIB_FACTOR = -2.26e7
-    """
-    
-    """
-    Calib factors from Zoe January 2021
-    in units of kA/m per V-s
-    """
-    M_CALIB_FACTOR = -9.551e6*.47
-    H_CALIB_FACTOR = -2.26e7
-    
     pi = math.pi
+    stopwatch = (NULL_INSTRUMENTATION if timer is None else timer).stopwatch(
+        None if runNum != runNum else runNum, ambrelldata.shape[0] * ambrelldata.shape[1] * 8)
+    backend = NUMPY_BACKEND if fft_backend is None else fft_backend
+    decimation = 1
+    undecimated_timestep = float(ambrelldata.iloc[1,0] - ambrelldata.iloc[0,0])
+    undecimated_start = int(begintime/undecimated_timestep)+1
+    if decimate:
+        # V_H_MAX, which selects the empty field reference, is the peak of the undecimated H
+        undecimated_vHMax = float(ambrelldata.iloc[:,1].to_numpy(dtype=np.float32 if precision == "single" else float).max())
+        if known_freq == 0:
+            # The frequency is searched on the voltages decimated by the largest factor
+            searched = decimate_run(ambrelldata, high_cutoff_freq)[0]
+            searched_H = searched.iloc[:,1].to_numpy(dtype=float)
+            searched_timestep = float(searched.iloc[1,0] - searched.iloc[0,0])
+            if frequency_cache is not None:
+                known_freq = frequency_cache.search(frequency_key, searched_H, searched_timestep, backend)
+            else:
+                known_freq = opt_freq(searched_H, len(searched_H), searched_timestep,
+                                      peak_freq(searched_H, searched_timestep, backend), backend)
+        ambrelldata, decimation = decimate_run(ambrelldata, high_cutoff_freq, known_freq, undecimated_start)
+        stopwatch.lap("decimate")
     times = ambrelldata.iloc[:,0].values.tolist()
-    H = ambrelldata.iloc[:,1].values.tolist()
-    M = (np.array(ambrelldata.iloc[:,2].values.tolist())*polarity).tolist()
-   
-    vHMax = max(H)
+    if precision == "single":
+        H = ambrelldata.iloc[:,1].to_numpy(dtype=np.float32)
+        M = ambrelldata.iloc[:,2].to_numpy(dtype=np.float32)*np.float32(polarity)
+        vHMax = float(H.max())
+    else:
+        H = ambrelldata.iloc[:,1].values.tolist()
+        M = (np.array(ambrelldata.iloc[:,2].values.tolist())*polarity).tolist()
+        vHMax = max(H)
+    if decimate:
+        vHMax = undecimated_vHMax
+    complex_type = np.complex64 if precision == "single" else np.complex128
     
     total_points = len(M)
     timestep = times[1]-times[0]
-    startdatpoint = int(begintime/timestep)+1
-    bigHspectrum = np.fft.fft(H)
-    bigfreq = np.fft.fftfreq(total_points, d=timestep) 
-    fundindex = np.argmax(np.abs(bigHspectrum[1:(int(total_points/2))]))+1
-    guess_freq = bigfreq[fundindex]
+    startdatpoint = undecimated_start//decimation
     
     """
     Best results when exact frequency is used. The most accurate frequency
@@ -141,33 +247,96 @@ def fundmagphase(ambrelldata: pd.DataFrame, Mgdata: pd.DataFrame, Hgdata: pd.Dat
     opt_freq, input 'known_freq' as 0.
     """
     
-    if known_freq == 0:
-        frequency = opt_freq(H, total_points, timestep, guess_freq)
+    if known_freq == 0 and frequency_cache is not None:
+        frequency = frequency_cache.search(frequency_key, H, timestep, backend)
+    elif known_freq == 0:
+        # The spectrum of the whole run is only needed for the guess of opt_freq
+        guess_freq = peak_freq(H, timestep, backend)
+        frequency = opt_freq(H, total_points, timestep, guess_freq, backend)
     else:
         frequency = known_freq
+    stopwatch.lap("frequency")
         
     period = 1/int(frequency)
-    tsteps_in_period = period//timestep
+    # The samples of a period are counted at the undecimated rate, which the decimation factor divides
+    tsteps_in_period = (period//undecimated_timestep)//decimation
     lower = startdatpoint
     adj_total_points = int(est_num_periods * tsteps_in_period)
     new_upper = lower + adj_total_points
+    fft_length_points, fft_periods = planLength(int(tsteps_in_period), est_num_periods, fft_length)
+    fft_speedup = 1.0
+    resampled = False
+    if fft_length_points != adj_total_points and len(M) > new_upper:
+        fft_speedup = backend.speedup(adj_total_points, fft_length_points)
+    if fft_speedup <= 1.0:
+        # A length which is not faster to transform does not change the analyzed window
+        fft_length_points = adj_total_points
+        fft_speedup = 1.0
+    else:
+        if fft_length == "resample":
+            """
+            Linear interpolation of the est_num_periods periods onto fft_length_points points
+            """
+            positions = lower + np.arange(fft_length_points)*(adj_total_points/fft_length_points)
+            samples = np.arange(lower, new_upper + 1)
+            times = np.interp(positions, samples, times[lower:new_upper + 1]).tolist()
+            M = np.interp(positions, samples, M[lower:new_upper + 1]).tolist()
+            H = np.interp(positions, samples, H[lower:new_upper + 1]).tolist()
+            timestep = timestep*adj_total_points/fft_length_points
+            lower = 0
+            resampled = True
+        else:
+            est_num_periods = fft_periods
+        adj_total_points = fft_length_points
+        new_upper = lower + adj_total_points
     times = times[lower:new_upper]
     M = M[lower:new_upper]
     H = H[lower:new_upper]
+    if precision == "single":
+        M = np.asarray(M, dtype=np.float32)
+        H = np.asarray(H, dtype=np.float32)
 
     """
     FFT to create spectrum of truncated data
     """ 
-    Mspectrum = np.fft.fft(M)
-    Hspectrum = np.fft.fft(H)
-    freq = np.fft.fftfreq(adj_total_points, d=timestep)        
-
+    halfpoints = int(adj_total_points/2)
     """
-    Determine the frequency (again... should be redundant)
+    The spectra, freq and the corrected and integrated spectra hold the values
+    of bins only. The fft engine holds every bin, the sparse engine only the
+    bins used by the analysis, all other bins being 0.
     """
-    halfpoints = int(adj_total_points/2)
-    fundindex = np.argmax(np.abs(Hspectrum[1:halfpoints]))+1
-    frequency = abs(freq[fundindex])
+    if engine == "sparse":
+        candidates = np.arange(max(int(est_num_periods) - 2, 1), min(int(est_num_periods) + 3, halfpoints))
+        fundindex = int(candidates[np.argmax(np.abs(harmonic_dft(H, candidates)))])
+        harmonics = odd_harmonic_mask(len(M), fundindex, resampled)
+        
+        def bin_freq(indices: np.ndarray) -> np.ndarray:
+            # Values of np.fft.fftfreq(adj_total_points, d=timestep) at indices
+            return np.where(indices < (adj_total_points + 1)//2, indices, indices - adj_total_points)*(1.0/(adj_total_points*timestep))
+        
+        bins = np.flatnonzero(harmonics)
+        bins = bins[np.abs(bin_freq(bins)) < high_cutoff_freq]
+        bins = np.union1d(bins[bins > 0], [0, fundindex, len(M) - fundindex])
+        freq = bin_freq(bins)
+        Mspectrum, Hspectrum = harmonic_dft(np.array([M, H]), bins).astype(complex_type)
+    else:
+        freq = np.fft.fftfreq(adj_total_points, d=timestep)
+        Mspectrum = backend.fft(M)
+        Hspectrum = backend.fft(H)
+        bins = np.arange(len(M))
+
+        """
+        Determine the frequency (again... should be redundant)
+        """
+        fundindex = np.argmax(np.abs(Hspectrum[1:halfpoints]))+1
+        harmonics = odd_harmonic_mask(len(M), fundindex, resampled)
+    
+    def position(index: int) -> int:
+        # Position of a bin in the arrays held over bins
+        return int(np.searchsorted(bins, index))
+    
+    fundamentals = [position(fundindex), position(len(M) - fundindex)]
+    frequency = abs(freq[fundamentals[0]])
     period = 1/frequency
     tsteps_in_period = int(period/timestep)
     est_num_periods = fundindex
@@ -175,17 +344,17 @@ def fundmagphase(ambrelldata: pd.DataFrame, Mgdata: pd.DataFrame, Hgdata: pd.Dat
     """
     Determine some basic info about the fundamental frequency (phase and mag)
     """
-    pH = np.angle(Hspectrum[est_num_periods])
-    pM = np.angle(Mspectrum[est_num_periods])
+    pH = np.angle(Hspectrum[fundamentals[0]])
+    pM = np.angle(Mspectrum[fundamentals[0]])
     pMminuspH = pi_mod(pM - pH)
-    Hmag = np.abs(Hspectrum[est_num_periods])
-    Mmag = np.abs(Mspectrum[est_num_periods])
+    Hmag = np.abs(Hspectrum[fundamentals[0]])
+    Mmag = np.abs(Mspectrum[fundamentals[0]])
     MoverH = Mmag/Hmag
     MoverHreal = MoverH*np.cos(pMminuspH)
     MoverHimag = MoverH*np.sin(pMminuspH)    
     Hphasereal = np.cos(pH)
     Hphaseimag = np.sin(pH)
-    MoverH0 = np.real(Mspectrum[0]/Hspectrum[0])
+    MoverH0 = np.real(Mspectrum[position(0)]/Hspectrum[position(0)])
     if (pMminuspH > pi/2) or (pMminuspH < -pi/2):
         pMminuspH -= pi
         MoverH = -MoverH
@@ -193,57 +362,61 @@ def fundmagphase(ambrelldata: pd.DataFrame, Mgdata: pd.DataFrame, Hgdata: pd.Dat
     """
     Substraction of empty spectrum
     """
-    for i in [est_num_periods, (len(Mspectrum)-est_num_periods)]:
+    for i in fundamentals:
         phase_sign = np.sign(freq[i])
         transfer_func_Hphase = complex(Hphasereal, -phase_sign*Hphaseimag)
         Mspectrum[i] = Mspectrum[i]*transfer_func_Hphase
         Mspectrum[i] -= Hmag*complex(MoverHrealforsub, phase_sign*MoverHimagforsub)
         Mspectrum[i] = Mspectrum[i]/transfer_func_Hphase
+    stopwatch.lap("fft")
 
     """
     G-Factor correction
     """
     g_interp_real, g_interp_imag = calculate_g(Mgdata, high_cutoff_freq)
     Hg_interp_real, Hg_interp_imag = calculate_g(Hgdata, high_cutoff_freq)
-    Mspectrum_gcorr = [0.0+0.0j]*len(Mspectrum)
-    Hspectrum_gcorr = [0.0+0.0j]*len(Hspectrum) #changed Mspectrum into Hspectrum
+    Mspectrum_gcorr = np.zeros_like(Mspectrum)
+    Hspectrum_gcorr = np.zeros_like(Hspectrum)
     
+    # Only the odd harmonics below high_cutoff_freq are corrected, all other bins stay 0
+    selected = np.flatnonzero((bins > 0) & (np.abs(freq[:len(bins)]) < high_cutoff_freq) & harmonics[bins])
+    Mspectrum_gcorr[selected] = Mspectrum[selected]
     
-    for i in range(len(Mspectrum)):
-        if (i>0) and (np.abs(freq[i]) < high_cutoff_freq) and odd_harmonic_M(len(freq), i, est_num_periods) == 1:
-            Mspectrum_gcorr[i] = Mspectrum[i]
-            phase_sign_2 = np.sign(freq[i])
-            """"
-            Subtraction of background spectrum. If nonLinearSub is False,
-            that means to only subtract the fundamental.
-            """
-            if isNonLinearSub and i < Mspecrealforsub.size:
-                transfer_func_Hphase = complex(Hphasereal, -phase_sign*Hphaseimag)
-                transfer_func_Hphase_sub = complex(Hphaserealforsub, -phase_sign*Hphaseimagforsub)
-                Mspectrum_gcorr[i] = Mspectrum_gcorr[i]*transfer_func_Hphase
-                term_to_subtract =  complex(Mspecrealforsub[i], Mspecimagforsub[i])*transfer_func_Hphase_sub
-                Mspectrum_gcorr[i] -= term_to_subtract
-                Mspectrum_gcorr[i] = Mspectrum_gcorr[i]/transfer_func_Hphase
-            
-            transfer_func_g = complex(g_interp_real(abs(freq[i])), phase_sign_2*g_interp_imag(abs(freq[i])))
-            Mspectrum_gcorr[i] = Mspectrum_gcorr[i]*transfer_func_g
-            
-        if i == est_num_periods or i == (len(Mspectrum) - est_num_periods):
-            Hspectrum_gcorr[i] = Hspectrum[i]            
-            phase_sign_2 = np.sign(freq[i])
-            transfer_func_Hg = complex(Hg_interp_real(abs(freq[i])), phase_sign_2*Hg_interp_imag(abs(freq[i])))
-            Hspectrum_gcorr[i] = Hspectrum_gcorr[i]*transfer_func_Hg
+    """"
+    Subtraction of background spectrum. If nonLinearSub is False,
+    that means to only subtract the fundamental.
+    """
+    if isNonLinearSub:
+        if empty_reference is None:
+            empty_reference = EmptyReference(np.asarray(Mspecrealforsub) + 1j*np.asarray(Mspecimagforsub),
+                                             MoverHrealforsub, MoverHimagforsub, Hphaserealforsub, Hphaseimagforsub)
+        # phase_sign is the one of the last bin of the empty spectrum subtraction
+        transfer_func_Hphase = complex(Hphasereal, -phase_sign*Hphaseimag)
+        empty_reference.subtract(Mspectrum_gcorr, bins[selected], transfer_func_Hphase, phase_sign, selected)
+    
+    for i in selected:
+        phase_sign_2 = np.sign(freq[i])
+        transfer_func_g = complex(g_interp_real(abs(freq[i])), phase_sign_2*g_interp_imag(abs(freq[i])))
+        Mspectrum_gcorr[i] = Mspectrum_gcorr[i]*transfer_func_g
+    
+    for i in fundamentals:
+        Hspectrum_gcorr[i] = Hspectrum[i]
+        phase_sign_2 = np.sign(freq[i])
+        transfer_func_Hg = complex(Hg_interp_real(abs(freq[i])), phase_sign_2*Hg_interp_imag(abs(freq[i])))
+        Hspectrum_gcorr[i] = Hspectrum_gcorr[i]*transfer_func_Hg
+    stopwatch.lap("correction")
  
     """
     Reconstruction of signal
     """
-    Mreconstructed = np.fft.ifft(Mspectrum_gcorr)
-    Hreconstructed = np.fft.ifft(Hspectrum_gcorr)
-    pHg = np.angle(Hspectrum_gcorr[est_num_periods])
-    pMg = np.angle(Mspectrum_gcorr[est_num_periods])
+    if engine != "sparse":
+        Mreconstructed = backend.ifft(Mspectrum_gcorr)
+        Hreconstructed = backend.ifft(Hspectrum_gcorr)
+    pHg = np.angle(Hspectrum_gcorr[fundamentals[0]])
+    pMg = np.angle(Mspectrum_gcorr[fundamentals[0]])
     pMminuspHg = pi_mod(pMg - pHg)
-    Hmagg = np.abs(Hspectrum_gcorr[est_num_periods])
-    Mmagg = np.abs(Mspectrum_gcorr[est_num_periods])
+    Hmagg = np.abs(Hspectrum_gcorr[fundamentals[0]])
+    Mmagg = np.abs(Mspectrum_gcorr[fundamentals[0]])
     MoverHg = Mmagg/Hmagg
     if (pMminuspHg > pi/2) or (pMminuspHg < -pi/2):
         pMminuspHg -= pi
@@ -252,19 +425,24 @@ def fundmagphase(ambrelldata: pd.DataFrame, Mgdata: pd.DataFrame, Hgdata: pd.Dat
     """
     Integration of signal
     """    
-    Mspectrum_int = [0.0+0.0j]*len(Mspectrum_gcorr)
-    Hspectrum_int = [0.0+0.0j]*len(Mspectrum_gcorr)
+    Mspectrum_int = np.zeros_like(Mspectrum_gcorr)
+    Hspectrum_int = np.zeros_like(Mspectrum_gcorr)
     
-    for i in range(len(Mspectrum_gcorr)):
-        if i > 0:
-            Mspectrum_int[i] = (-1.0j)*Mspectrum_gcorr[i]/(2*pi*(freq[i]))
-            Hspectrum_int[i] = (-1.0j)*Hspectrum_gcorr[i]/(2*pi*(freq[i]))
+    # Integration of the nonzero bins of the corrected spectra
+    for i in np.union1d(selected, fundamentals):
+        Mspectrum_int[i] = (-1.0j)*Mspectrum_gcorr[i]/(2*pi*(freq[i]))
+        Hspectrum_int[i] = (-1.0j)*Hspectrum_gcorr[i]/(2*pi*(freq[i]))
 
     """
     Reconstruction of integrated signal
     """
-    Mintreconstructed = np.fft.ifft(Mspectrum_int)
-    Hintreconstructed = np.fft.ifft(Hspectrum_int)
+    if engine == "sparse":
+        # All four signals share the bins of Mspectrum and are synthesized together
+        Mreconstructed, Hreconstructed, Mintreconstructed, Hintreconstructed = harmonic_synthesis(
+            bins, [Mspectrum_gcorr, Hspectrum_gcorr, Mspectrum_int, Hspectrum_int], len(M))
+    else:
+        Mintreconstructed = backend.ifft(Mspectrum_int)
+        Hintreconstructed = backend.ifft(Hspectrum_int)
 
     """
     Try integrating another way to check
@@ -300,9 +478,16 @@ def fundmagphase(ambrelldata: pd.DataFrame, Mgdata: pd.DataFrame, Hgdata: pd.Dat
     Hintreconstructedreal = np.real(Hintreconstructed)
     Mintreconstructedreallist = Mintreconstructedreal.tolist()
     Hintreconstructedreallist = Hintreconstructedreal.tolist()
+    if engine == "sparse":
+        # Only the output columns hold every bin
+        fullspectrum = np.zeros(len(M), dtype=complex_type)
+        fullspectrum[bins] = Mspectrum
+        Mspectrum = fullspectrum
+        freq = np.fft.fftfreq(adj_total_points, d=timestep)
     Mspectrumreal = (np.real(Mspectrum)).tolist()
     Mspectrumimag = (np.imag(Mspectrum)).tolist()
     freqlist = freq.tolist()
+    stopwatch.lap("reconstruction")
     
     Hmax = np.amax(Hintreconstructedreallist)
     Mmax = np.amax(Mintreconstructedreallist)
@@ -322,6 +507,11 @@ def fundmagphase(ambrelldata: pd.DataFrame, Mgdata: pd.DataFrame, Hgdata: pd.Dat
             dMdH2 = (Mintreconstructedreallist[j+1]-Mintreconstructedreallist[j-1])/(Hintreconstructedreallist[j+1]-Hintreconstructedreallist[j-1])
         integral += ((Mintreconstructedreallist[j+1]+Mintreconstructedreallist[j])/2)*(Hintreconstructedreallist[j]-Hintreconstructedreallist[j+1])
     integral = integral/est_num_periods
+    if decimation > 1:
+        # The trapezoids of few samples per period miss a part of the loop. The reconstructed loop is
+        # periodic over the window, so its area summed with the derivative of H, the reconstructed H,
+        # is exact at every sample rate which resolves the harmonics
+        integral = -timestep*H_CALIB_FACTOR*float(np.dot(Mintreconstructedreal, Hreconstructedreal))/est_num_periods
     Hc = (Hc1-Hc2)/2
     dMdH = (dMdH1+dMdH2)/2
     dMdH_over_Mmax = dMdH/Mmax
@@ -331,8 +521,8 @@ def fundmagphase(ambrelldata: pd.DataFrame, Mgdata: pd.DataFrame, Hgdata: pd.Dat
     #     property parameter is added to labelSeries and valueSeries
     #     Update legend and property plot values in documentation
         
-    labelSeries = ["M_OVER_H_REAL", "M_OVER_H_IMAG", "M_OVER_H_G", "PM_MINUS_PH_G", "M_OVER_H0", "H_PHASE_REAL", "H_PHASE_IMAG", "OSC_TIME", "TEMPERATURE", "H_MAX", "M_MAX", "V_H_MAX", "HC", "DMDH", "DMDH_OVER_M_MAX", "INTEGRAL", "RUN_NUM"]
-    valueSeries = [MoverHreal, MoverHimag, MoverHg, pMminuspHg, MoverH0, Hphasereal, Hphaseimag, time, temperature, Hmax, Mmax, vHMax, Hc, dMdH, dMdH_over_Mmax, integral, runNum]
+    labelSeries = ["M_OVER_H_REAL", "M_OVER_H_IMAG", "M_OVER_H_G", "PM_MINUS_PH_G", "M_OVER_H0", "H_PHASE_REAL", "H_PHASE_IMAG", "OSC_TIME", "TEMPERATURE", "CAPTURE_TEMPERATURE", "H_MAX", "M_MAX", "V_H_MAX", "HC", "DMDH", "DMDH_OVER_M_MAX", "INTEGRAL", "RUN_NUM", "FFT_LENGTH", "FFT_SPEEDUP", "DECIMATION"]
+    valueSeries = [MoverHreal, MoverHimag, MoverHg, pMminuspHg, MoverH0, Hphasereal, Hphaseimag, time, temperature, captureTemperature, Hmax, Mmax, vHMax, Hc, dMdH, dMdH_over_Mmax, integral, runNum, fft_length_points, fft_speedup, decimation]
     hashMap = {}
     
     for i in range(len(labelSeries)):
@@ -356,10 +546,640 @@ def fundmagphase(ambrelldata: pd.DataFrame, Mgdata: pd.DataFrame, Hgdata: pd.Dat
     logger["M_SPECTRUM_IMAG"]  = Mspectrumimag
     logger["STAT_LIST_LABEL"] = labelSeries
     logger["STAT_LIST_VALUE"] = valueSeries
+    stopwatch.lap("metrics")
     return logger, hashMap
 
 
-def opt_freq(H: List[float], total_points: int, timestep: float, guess_freq: int) -> int:
+def fundmagphase_config(ambrelldata: pd.DataFrame, Mgdata: pd.DataFrame, Hgdata: pd.DataFrame, config: 'AnalysisConfig',
+                        **kwargs) -> Tuple[pd.DataFrame, Dict[str, float]]:
+    """
+    Runs fundmagphase with the analysis parameters held by an AnalysisConfig
+    object of the `tools` module.
+
+    Parameters
+    ----------
+    ambrelldata : pd.DataFrame
+        Raw voltage run time-series dataset to be analyzed 
+    Mgdata : pd.DataFrame
+        M-Coil G-Factor dataset used in analysis
+    Hgdata : pd.DataFrame
+        H-Coil G-Factor dataset used in analysis
+    config : AnalysisConfig
+        Parsed analysis parameters of the configuration file.
+    **kwargs
+        Keyword parameters of fundmagphase. These override the values taken
+        from config, e.g. the empty field subtraction values.
+
+    Returns
+    -------
+    logger : pd.DataFrame
+        Analyzed voltage run dataframe.
+    hashMap : dict
+        Dictionary of analyzed dataset properties.
+
+    """
+    params = _fundmagphase_params(config)
+    params.update(kwargs)
+    return fundmagphase(ambrelldata, Mgdata, Hgdata, **params)
+
+
+def _fundmagphase_params(config: 'AnalysisConfig') -> Dict[str, object]:
+    # Keyword parameters of fundmagphase taken from an AnalysisConfig object
+    return {"high_cutoff_freq": config.cutoffFreq, "known_freq": config.knownFreq,
+            "MoverHrealforsub": config.mOverHRealSub, "MoverHimagforsub": config.mOverHImagSub,
+            "MoverHforcalib": config.mOverHCalib, "pMminuspHforphaseadj": config.pmPhDiffPhaseAdj,
+            "MoverH0forsubtraction": config.mOverH0Sub, "Hphaserealforsub": config.hPhaseRealSub,
+            "Hphaseimagforsub": config.hPhaseImagSub, "est_num_periods": config.numPeriod,
+            "begintime": config.beginTime, "polarity": config.polarity, "engine": config.engine,
+            "fft_backend": getBackend(config.fftBackend, config.fftWorkers), "fft_length": config.fftLength,
+            "precision": config.precision, "decimate": config.decimate}
+
+
+def precision_report(ambrelldata: pd.DataFrame, Mgdata: pd.DataFrame, Hgdata: pd.DataFrame,
+                     properties: List[str] = ("M_OVER_H_G", "HC", "INTEGRAL"), **kwargs) -> pd.DataFrame:
+    """
+    Analyzes a voltage run with fundmagphase in double and in single precision
+    and compares the resulting properties.
+
+    Parameters
+    ----------
+    ambrelldata : pd.DataFrame
+        Raw voltage run time-series dataset to be analyzed 
+    Mgdata : pd.DataFrame
+        M-Coil G-Factor dataset used in analysis
+    Hgdata : pd.DataFrame
+        H-Coil G-Factor dataset used in analysis
+    properties : List[str], optional
+        Properties of fundmagphase to compare.
+        The default is ("M_OVER_H_G", "HC", "INTEGRAL").
+    **kwargs
+        Keyword parameters of fundmagphase except precision.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per property with columns DOUBLE and SINGLE, the values of
+        both analyses, ABSOLUTE_ERROR and RELATIVE_ERROR, the absolute
+        difference divided by the absolute double precision value.
+
+    """
+    kwargs.pop("precision", None)
+    double = fundmagphase(ambrelldata, Mgdata, Hgdata, precision="double", **kwargs)[1]
+    single = fundmagphase(ambrelldata, Mgdata, Hgdata, precision="single", **kwargs)[1]
+    report = pd.DataFrame({"DOUBLE": [float(double[prop]) for prop in properties],
+                           "SINGLE": [float(single[prop]) for prop in properties]}, index=list(properties))
+    report["ABSOLUTE_ERROR"] = (report["SINGLE"] - report["DOUBLE"]).abs()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        report["RELATIVE_ERROR"] = report["ABSOLUTE_ERROR"]/report["DOUBLE"].abs()
+    return report
+
+
+def precision_report_config(ambrelldata: pd.DataFrame, Mgdata: pd.DataFrame, Hgdata: pd.DataFrame, config: 'AnalysisConfig',
+                            **kwargs) -> pd.DataFrame:
+    """
+    Runs precision_report with the analysis parameters held by an AnalysisConfig
+    object of the `tools` module, see fundmagphase_config.
+    """
+    params = _fundmagphase_params(config)
+    params.update(kwargs)
+    return precision_report(ambrelldata, Mgdata, Hgdata, **params)
+
+
+def decimation_factor(timestep: float, high_cutoff_freq: float, margin: float = 1.25, period_steps: int = None) -> int:
+    """
+    Returns the largest integer decimation factor which keeps the Nyquist
+    frequency of the decimated voltages at least margin times high_cutoff_freq,
+    so every harmonic analyzed by fundmagphase stays below the transition
+    band of the anti-alias filter. When period_steps, the number of samples
+    of a drive period, is given, the factor is the largest such one which
+    divides it, so the analyzed periods keep their length. It is 1 when no
+    decimation is possible.
+    """
+    largest = max(int(1/(timestep*2*margin*high_cutoff_freq)), 1)
+    if not period_steps:
+        return largest
+    return max(factor for factor in range(1, largest + 1) if period_steps % factor == 0)
+
+
+def decimate_run(ambrelldata: pd.DataFrame, high_cutoff_freq: float, frequency: float = None,
+                 start: int = 0) -> Tuple[pd.DataFrame, int]:
+    """
+    Decimates a voltage run by the factor of decimation_factor with
+    `scipy.signal.resample_poly`, a polyphase anti-alias filter whose delay
+    is compensated, so the decimated voltages keep the phase of the originals.
+    Its Kaiser window keeps the gain of the filter flat to about 1e-5 below
+    the cutoff, so the magnitudes of the harmonics are kept too.
+
+    Parameters
+    ----------
+    ambrelldata : pd.DataFrame
+        Raw voltage run time-series dataset.
+    high_cutoff_freq : float
+        Highest frequency of analysis.
+    frequency : float, optional
+        Drive frequency. When it is given, the factor divides the samples of
+        a drive period and the filter extends each end of the run by whole
+        periods, so the first and last samples keep no filter transient. The
+        default is None, which allows any factor and extends each end along
+        its trend.
+    start : int, optional
+        Index of a sample which the decimated samples keep, e.g. the first
+        sample of the analyzed window. Samples before start modulo the factor
+        are dropped. The default is 0.
+
+    Returns
+    -------
+    Tuple[pd.DataFrame, int]
+        Decimated dataset, with every factor-th sample time, and decimation
+        factor. The dataset is ambrelldata itself when the factor is 1.
+
+    """
+    times = ambrelldata.iloc[:,0].to_numpy(dtype=float)
+    timestep = times[1] - times[0]
+    period_steps = None if frequency is None else int((1/int(frequency))//timestep)
+    factor = decimation_factor(timestep, high_cutoff_freq, period_steps=period_steps)
+    if factor == 1:
+        return ambrelldata, 1
+    from scipy.signal import firwin, resample_poly
+    times = times[start % factor:]
+    taps = firwin(2*DECIMATION_TAPS_PER_SAMPLE*factor + 1, 1.0/factor, window=("kaiser", DECIMATION_KAISER_BETA))
+    pad = DECIMATION_TAPS_PER_SAMPLE*factor
+    shift = None if frequency is None else _period_shift(len(times), timestep, frequency, pad)
+    decimated = pd.DataFrame({ambrelldata.columns[0]: times[::factor]})
+    for index in range(1, ambrelldata.shape[1]):
+        values = ambrelldata.iloc[start % factor:,index].to_numpy()
+        if shift is None:
+            # padtype "line" extends each end along its trend, which keeps the edge transient small
+            decimated[ambrelldata.columns[index]] = resample_poly(values, 1, factor, window=taps, padtype="line")
+        else:
+            extended = np.concatenate([values[shift - pad:shift], values, values[len(values) - shift:len(values) - shift + pad]])
+            decimated[ambrelldata.columns[index]] = resample_poly(extended, 1, factor, window=taps,
+                                                                  padtype="constant")[pad//factor:pad//factor + len(decimated)]
+    return decimated, factor
+
+
+def _period_shift(length: int, timestep: float, frequency: float, least: int) -> int:
+    # Samples of the whole number of periods, between least and length samples, closest to a whole number of samples
+    shifts = np.arange(1, int(length*timestep*frequency) + 1)/(frequency*timestep)
+    shifts = shifts[(shifts >= least) & (np.round(shifts) <= length - least)]
+    if len(shifts) == 0:
+        return None
+    return int(round(shifts[np.argmin(np.abs(shifts - np.round(shifts)))]))
+
+
+def decimation_report(ambrelldata: pd.DataFrame, Mgdata: pd.DataFrame, Hgdata: pd.DataFrame,
+                      properties: List[str] = ("M_OVER_H_G", "PM_MINUS_PH_G", "HC", "INTEGRAL"),
+                      tolerance: float = 1e-3, repeats: int = 3, **kwargs) -> pd.DataFrame:
+    """
+    Analyzes a voltage run with fundmagphase with and without decimation and
+    compares the resulting properties and run times. Differences include
+    those of the frequency found by opt_freq, unless known_freq is given.
+    HC is limited by the time resolution of the decimated voltages, as its
+    zero crossings are interpolated linearly between samples: with about 40
+    samples per period, e.g. a factor of 18 or 20 at 100 MS/s and 150 kHz,
+    it differs by 1e-3 to 3e-3 and exceeds the default tolerance. A lower
+    CUTOFF_FREQ allows a larger factor, so the error of HC grows with it.
+
+    Parameters
+    ----------
+    ambrelldata : pd.DataFrame
+        Raw voltage run time-series dataset to be analyzed 
+    Mgdata : pd.DataFrame
+        M-Coil G-Factor dataset used in analysis
+    Hgdata : pd.DataFrame
+        H-Coil G-Factor dataset used in analysis
+    properties : List[str], optional
+        Properties of fundmagphase to compare, of the fundamental and of the
+        odd harmonics. The default is ("M_OVER_H_G", "PM_MINUS_PH_G", "HC", "INTEGRAL").
+    tolerance : float, optional
+        Largest accepted relative error. The default is 1e-3.
+    repeats : int, optional
+        Number of timed analyses of each kind after a first, untimed one,
+        which imports scipy and warms the caches. The SPEEDUP is the ratio
+        of the shortest times. The default is 3.
+    **kwargs
+        Keyword parameters of fundmagphase except decimate.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per property with columns FULL and DECIMATED, the values of
+        both analyses, ABSOLUTE_ERROR, RELATIVE_ERROR, the absolute difference
+        divided by the absolute value of FULL, and WITHIN_TOLERANCE. Its attrs
+        hold the DECIMATION factor and the SPEEDUP of the decimated analysis.
+
+    """
+    kwargs.pop("decimate", None)
+    full = fundmagphase(ambrelldata, Mgdata, Hgdata, decimate=False, **kwargs)[1]
+    decimated = fundmagphase(ambrelldata, Mgdata, Hgdata, decimate=True, **kwargs)[1]
+    times = {False: [], True: []}
+    for repeat in range(repeats):
+        for decimate in (False, True):
+            start = perf_counter()
+            fundmagphase(ambrelldata, Mgdata, Hgdata, decimate=decimate, **kwargs)
+            times[decimate].append(perf_counter() - start)
+    report = pd.DataFrame({"FULL": [float(full[prop]) for prop in properties],
+                           "DECIMATED": [float(decimated[prop]) for prop in properties]}, index=list(properties))
+    report["ABSOLUTE_ERROR"] = (report["DECIMATED"] - report["FULL"]).abs()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        report["RELATIVE_ERROR"] = report["ABSOLUTE_ERROR"]/report["FULL"].abs()
+    report["WITHIN_TOLERANCE"] = report["RELATIVE_ERROR"] <= tolerance
+    report.attrs["DECIMATION"] = decimated["DECIMATION"]
+    report.attrs["SPEEDUP"] = min(times[False])/min(times[True]) if repeats > 0 else math.nan
+    return report
+
+
+def decimation_report_config(ambrelldata: pd.DataFrame, Mgdata: pd.DataFrame, Hgdata: pd.DataFrame, config: 'AnalysisConfig',
+                             **kwargs) -> pd.DataFrame:
+    """
+    Runs decimation_report with the analysis parameters held by an AnalysisConfig
+    object of the `tools` module, see fundmagphase_config.
+    """
+    params = _fundmagphase_params(config)
+    params.update(kwargs)
+    return decimation_report(ambrelldata, Mgdata, Hgdata, **params)
+
+
+def fundmagphase_windows(ambrelldata: pd.DataFrame, Mgdata: pd.DataFrame, Hgdata: pd.DataFrame, high_cutoff_freq: int,
+                         known_freq: int, window_periods: float, hop_periods: float, begintime: int, polarity: float,
+                         MoverHrealforsub: float = 0.0, MoverHimagforsub: float = 0.0, runNum: int = np.nan,
+                         timer: Instrumentation = None, max_batch_points: int = 2**22,
+                         fft_backend: FFTBackend = None, frequency_cache: 'FrequencyCache' = None,
+                         frequency_key: Tuple[str, int] = None) -> pd.DataFrame:
+    """
+    Analyzes a voltage run in sliding windows of window_periods periods, moved
+    by hop_periods periods, from begintime to the end of the run.
+    
+    Each window is analyzed like the single window of fundmagphase: linear
+    subtraction of the empty field fundamental, G-Factor correction of the odd
+    harmonics and integration of the corrected spectrum. The windows are rows
+    of a zero-copy strided view of the run, so all windows of a batch are
+    transformed by one FFT call. The G-Factor transfer arrays are computed
+    once per fundamental index and reused by every window sharing it.
+
+    Parameters
+    ----------
+    ambrelldata : pd.DataFrame
+        Raw voltage run time-series dataset to be analyzed 
+    Mgdata : pd.DataFrame
+        M-Coil G-Factor dataset used in analysis
+    Hgdata : pd.DataFrame
+        H-Coil G-Factor dataset used in analysis
+    high_cutoff_freq : int
+        High cutoff frequency specified in configuration data
+    known_freq : int
+        Known frequency specified in configuration data. The frequency is
+        searched with opt_freq over the whole run when it is 0.
+    window_periods : float
+        Length of each window in periods.
+    hop_periods : float
+        Distance between the starts of consecutive windows in periods.
+    begintime : int
+        Start time of the first window.
+    polarity: float
+        Polarity of M-Coil voltage, see fundmagphase.
+    MoverHrealforsub : float, optional
+        Empty field M/H subtracted from the fundamental of each window. The default is 0.0.
+    MoverHimagforsub : float, optional
+        Empty field M/H subtracted from the fundamental of each window. The default is 0.0.
+    runNum : int, optional
+        Run number of voltage run dataset. The default is np.nan.
+    timer : Instrumentation, optional
+        Records the stages "frequency" and "windows" of the analysis.
+        The default is None, which records nothing.
+    max_batch_points : int, optional
+        Largest number of samples transformed by one FFT call, which bounds
+        the memory used. The default is 2**22.
+    fft_backend : FFTBackend, optional
+        Backend of all Fourier transforms. A "scipy" backend with several
+        workers transforms the windows of a batch in parallel.
+        The default is None, which is `np.fft`.
+    frequency_cache : FrequencyCache, optional
+        Seeds the opt_freq search, see fundmagphase. The default is None.
+    frequency_key : Tuple[str, int], optional
+        Date-time and collection kind of the run. The default is None.
+
+    Raises
+    ------
+    ValueError
+        Raised when the run is too short for a single window.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per window with columns "WINDOW", "TIME" (start time of window),
+        "FREQUENCY", "M_OVER_H_REAL", "M_OVER_H_IMAG", "M_OVER_H_G",
+        "PM_MINUS_PH_G", "H_MAX", "M_MAX", "HC" and "INTEGRAL".
+
+    """
+    stopwatch = (NULL_INSTRUMENTATION if timer is None else timer).stopwatch(
+        None if runNum != runNum else runNum, ambrelldata.shape[0] * ambrelldata.shape[1] * 8)
+    backend = NUMPY_BACKEND if fft_backend is None else fft_backend
+    times = ambrelldata.iloc[:,0].to_numpy(dtype=float)
+    H = np.ascontiguousarray(ambrelldata.iloc[:,1].to_numpy(dtype=float))
+    M = np.ascontiguousarray(ambrelldata.iloc[:,2].to_numpy(dtype=float)*polarity)
+    total_points = len(M)
+    timestep = times[1]-times[0]
+    
+    if known_freq == 0 and frequency_cache is not None:
+        frequency = frequency_cache.search(frequency_key, H, timestep, backend)
+    elif known_freq == 0:
+        frequency = opt_freq(H, total_points, timestep, peak_freq(H, timestep, backend), backend)
+    else:
+        frequency = known_freq
+    stopwatch.lap("frequency")
+    
+    tsteps_in_period = (1/int(frequency))//timestep
+    length = int(window_periods * tsteps_in_period)
+    hop = max(int(hop_periods * tsteps_in_period), 1)
+    lower = int(begintime/timestep)+1
+    count = (total_points - lower - length)//hop + 1 if length > 2 else 0
+    if count < 1:
+        raise ValueError("Voltage run of {} points is too short for a window of {} points starting at point {}".format(
+            total_points, length, lower))
+    
+    def windows(x: np.ndarray) -> np.ndarray:
+        return np.lib.stride_tricks.as_strided(x[lower:], shape=(count, length),
+                                               strides=(hop*x.strides[0], x.strides[0]), writeable=False)
+    Mwindows = windows(M)
+    Hwindows = windows(H)
+    freq = np.fft.fftfreq(length, d=timestep)
+    halfpoints = int(length/2)
+    g_interp_real, g_interp_imag = calculate_g(Mgdata, high_cutoff_freq)
+    Hg_interp_real, Hg_interp_imag = calculate_g(Hgdata, high_cutoff_freq)
+    transfers = {}
+    
+    def transfer(fundindex: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # G-Factor transfer arrays of the corrected bins, shared by all windows of the same fundamental index
+        if fundindex not in transfers:
+            mask = odd_harmonic_mask(length, fundindex) & (np.abs(freq) < high_cutoff_freq)
+            mask[0] = False
+            Mindex = np.flatnonzero(mask)
+            Hindex = np.array([fundindex, length - fundindex])
+            transfers[fundindex] = (Mindex, g_interp_real(np.abs(freq[Mindex])) + 1j*np.sign(freq[Mindex])*g_interp_imag(np.abs(freq[Mindex])),
+                                    Hindex, Hg_interp_real(np.abs(freq[Hindex])) + 1j*np.sign(freq[Hindex])*Hg_interp_imag(np.abs(freq[Hindex])))
+        return transfers[fundindex]
+    
+    batch = max(max_batch_points//length, 1)
+    columns = {name: np.empty(count) for name in ("FREQUENCY", "M_OVER_H_REAL", "M_OVER_H_IMAG", "M_OVER_H_G",
+                                                   "PM_MINUS_PH_G", "H_MAX", "M_MAX", "HC", "INTEGRAL")}
+    for start in range(0, count, batch):
+        stop = min(start + batch, count)
+        rows = np.arange(stop - start)
+        Mspectrum = backend.fft(Mwindows[start:stop], axis=1)
+        Hspectrum = backend.fft(Hwindows[start:stop], axis=1)
+        fundindex = np.argmax(np.abs(Hspectrum[:,1:halfpoints]), axis=1)+1
+        
+        pH = np.angle(Hspectrum[rows, fundindex])
+        pM = np.angle(Mspectrum[rows, fundindex])
+        pMminuspH = pi_mod(pM - pH)
+        Hmag = np.abs(Hspectrum[rows, fundindex])
+        MoverH = np.abs(Mspectrum[rows, fundindex])/Hmag
+        Hphasereal = np.cos(pH)
+        Hphaseimag = np.sin(pH)
+        for index in (fundindex, length - fundindex):
+            phase_sign = np.sign(freq[index])
+            transfer_func_Hphase = Hphasereal - 1j*phase_sign*Hphaseimag
+            Mspectrum[rows, index] = (Mspectrum[rows, index]*transfer_func_Hphase
+                                      - Hmag*(MoverHrealforsub + 1j*phase_sign*MoverHimagforsub))/transfer_func_Hphase
+        
+        Mspectrum_gcorr = np.zeros_like(Mspectrum)
+        Hspectrum_gcorr = np.zeros_like(Hspectrum)
+        for index in np.unique(fundindex):
+            selected = np.flatnonzero(fundindex == index)
+            Mindex, Mtransfer, Hindex, Htransfer = transfer(int(index))
+            Mspectrum_gcorr[np.ix_(selected, Mindex)] = Mspectrum[np.ix_(selected, Mindex)]*Mtransfer
+            Hspectrum_gcorr[np.ix_(selected, Hindex)] = Hspectrum[np.ix_(selected, Hindex)]*Htransfer
+        pMminuspHg = pi_mod(np.angle(Mspectrum_gcorr[rows, fundindex]) - np.angle(Hspectrum_gcorr[rows, fundindex]))
+        MoverHg = np.abs(Mspectrum_gcorr[rows, fundindex])/np.abs(Hspectrum_gcorr[rows, fundindex])
+        flip = (pMminuspHg > pi/2) | (pMminuspHg < -pi/2)
+        pMminuspHg[flip] -= pi
+        MoverHg[flip] = -MoverHg[flip]
+        
+        Mspectrum_int = np.zeros_like(Mspectrum_gcorr)
+        Hspectrum_int = np.zeros_like(Hspectrum_gcorr)
+        Mspectrum_int[:,1:] = (-1.0j)*Mspectrum_gcorr[:,1:]/(2*pi*freq[1:])
+        Hspectrum_int[:,1:] = (-1.0j)*Hspectrum_gcorr[:,1:]/(2*pi*freq[1:])
+        Mint = M_CALIB_FACTOR*np.real(backend.ifft(Mspectrum_int, axis=1))
+        Hint = H_CALIB_FACTOR*np.real(backend.ifft(Hspectrum_int, axis=1))
+        
+        columns["FREQUENCY"][start:stop] = np.abs(freq[fundindex])
+        columns["M_OVER_H_REAL"][start:stop] = MoverH*np.cos(pMminuspH)
+        columns["M_OVER_H_IMAG"][start:stop] = MoverH*np.sin(pMminuspH)
+        columns["M_OVER_H_G"][start:stop] = MoverHg
+        columns["PM_MINUS_PH_G"][start:stop] = pMminuspHg
+        columns["H_MAX"][start:stop] = np.amax(Hint, axis=1)
+        columns["M_MAX"][start:stop] = np.amax(Mint, axis=1)
+        columns["HC"][start:stop] = (_last_crossing(Hint, Mint, True) - _last_crossing(Hint, Mint, False))/2
+        columns["INTEGRAL"][start:stop] = np.sum(((Mint[:,1:] + Mint[:,:-1])/2)*(Hint[:,:-1] - Hint[:,1:]), axis=1)/fundindex
+    stopwatch.lap("windows")
+    
+    timeSeries = pd.DataFrame()
+    timeSeries["WINDOW"] = np.arange(count)
+    timeSeries["TIME"] = times[lower + hop*np.arange(count)]
+    for name, values in columns.items():
+        timeSeries[name] = values
+    return timeSeries
+
+
+def fundmagphase_windows_config(ambrelldata: pd.DataFrame, Mgdata: pd.DataFrame, Hgdata: pd.DataFrame, config: 'AnalysisConfig',
+                                **kwargs) -> pd.DataFrame:
+    """
+    Runs fundmagphase_windows with the analysis and window parameters held by
+    an AnalysisConfig object of the `tools` module. Windows are moved by one
+    period when WINDOW_HOP is not defined.
+
+    Parameters
+    ----------
+    ambrelldata : pd.DataFrame
+        Raw voltage run time-series dataset to be analyzed 
+    Mgdata : pd.DataFrame
+        M-Coil G-Factor dataset used in analysis
+    Hgdata : pd.DataFrame
+        H-Coil G-Factor dataset used in analysis
+    config : AnalysisConfig
+        Parsed analysis parameters of the configuration file.
+    **kwargs
+        Keyword parameters of fundmagphase_windows. These override the values
+        taken from config, e.g. the empty field subtraction values.
+
+    Returns
+    -------
+    pd.DataFrame
+        Analyzed windows, see fundmagphase_windows.
+
+    """
+    params = {"high_cutoff_freq": config.cutoffFreq, "known_freq": config.knownFreq,
+              "window_periods": config.windowPeriods,
+              "hop_periods": config.windowHop if config.windowHop == config.windowHop else 1.0,
+              "begintime": config.beginTime, "polarity": config.polarity,
+              "MoverHrealforsub": config.mOverHRealSub, "MoverHimagforsub": config.mOverHImagSub,
+              "fft_backend": getBackend(config.fftBackend, config.fftWorkers)}
+    params.update(kwargs)
+    return fundmagphase_windows(ambrelldata, Mgdata, Hgdata, **params)
+
+
+def harmonic_dft(x: np.ndarray, bins: np.ndarray, chunk: int = 16384) -> np.ndarray:
+    """
+    Returns the values of np.fft.fft(x) at the given bins only, with a
+    direct DFT over chunks of chunk samples. It is cheaper than the FFT when
+    only a handful of bins is needed. Bins above half the length are taken
+    as the complex conjugate of their mirror bin, as x is real.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Real signal, or real signals of equal length as rows of a 2-D array.
+    bins : np.ndarray
+        Bin indices.
+    chunk : int, optional
+        Number of samples per DFT matrix, which bounds the memory used.
+        The default is 16384.
+
+    Returns
+    -------
+    np.ndarray
+        Complex spectrum at bins, one row per signal when x is 2-D.
+
+    """
+    x = np.asarray(x, dtype=float)
+    signals = np.atleast_2d(x)
+    bins = np.asarray(bins, dtype=np.int64)
+    length = signals.shape[1]
+    folded, inverse = np.unique(np.minimum(bins, length - bins) % length, return_inverse=True)
+    spectrum = np.zeros((signals.shape[0], len(folded)), dtype=complex)
+    # The DFT matrix of a later chunk is that of the first chunk times the phase of its start.
+    # Products are reduced modulo length before scaling, which keeps the phase exact for long signals.
+    matrix = np.exp((-2j*pi/length)*(np.outer(np.arange(min(chunk, length), dtype=np.int64), folded) % length))
+    for start in range(0, length, chunk):
+        stop = min(start + chunk, length)
+        spectrum += (signals[:, start:stop] @ matrix[:stop - start])*np.exp((-2j*pi/length)*((start*folded) % length))
+    spectrum = spectrum[:, inverse.ravel()]
+    mirrored = bins > length - bins
+    spectrum[:, mirrored] = np.conj(spectrum[:, mirrored])
+    return spectrum if x.ndim > 1 else spectrum[0]
+
+def harmonic_synthesis(bins: np.ndarray, spectrum: np.ndarray, length: int, chunk: int = 16384) -> np.ndarray:
+    """
+    Returns the real part of the inverse DFT of a spectrum which is 0 except
+    at a handful of bins, i.e. np.real(np.fft.ifft(...)) without building
+    the full spectrum.
+
+    Parameters
+    ----------
+    bins : np.ndarray
+        Indices of nonzero bins.
+    spectrum : np.ndarray
+        Value of each nonzero bin, or values of several spectra as rows of a 2-D array.
+    length : int
+        Length of signal.
+    chunk : int, optional
+        Number of samples per synthesis matrix, which bounds the memory used.
+        The default is 16384.
+
+    Returns
+    -------
+    np.ndarray
+        Real signal of given length, one row per spectrum when spectrum is 2-D.
+
+    """
+    spectrum = np.asarray(spectrum, dtype=complex)
+    spectra = np.atleast_2d(spectrum)
+    bins = np.asarray(bins, dtype=np.int64)
+    folded, inverse = np.unique(np.minimum(bins, length - bins) % length, return_inverse=True)
+    inverse = inverse.ravel()
+    # Re(X*exp(i*angle)) of bin length - b, whose angle is minus that of bin b, flips the sign of its sine term
+    sign = np.where(bins > length - bins, -1.0, 1.0)
+    coefficients = np.zeros((len(folded), spectra.shape[0]), dtype=complex)
+    np.add.at(coefficients, inverse, (spectra.real + 1j*sign*spectra.imag).T)
+    angle = (2*pi/length)*(np.outer(np.arange(min(chunk, length), dtype=np.int64), folded) % length)
+    cosine = np.cos(angle)
+    sine = np.sin(angle)
+    signals = np.empty((spectra.shape[0], length))
+    for start in range(0, length, chunk):
+        stop = min(start + chunk, length)
+        # Coefficients are rotated by the phase of the start of the chunk, see harmonic_dft
+        rotated = coefficients*np.exp((2j*pi/length)*((start*folded) % length))[:, None]
+        signals[:, start:stop] = ((cosine[:stop - start] @ rotated.real - sine[:stop - start] @ rotated.imag)/length).T
+    return signals if spectrum.ndim > 1 else signals[0]
+
+def fit_sin_batch(tt: np.ndarray, yy: np.ndarray, freq: float = None, refine_tolerance: float = None) -> np.ndarray:
+    """
+    Fits A*sin(w*t + p) + c to many traces at once. Given the frequency of
+    each trace, A, p and c follow from a linear least squares fit of
+    a*sin(w*t) + b*cos(w*t) + c, solved for every trace together. Traces
+    which the linear fit leaves with a large residual are refined with
+    `scipy.optimize.curve_fit`, which also fits w.
+
+    Parameters
+    ----------
+    tt : np.ndarray
+        Uniformly spaced time of every trace.
+    yy : np.ndarray
+        Trace, or traces of equal length as rows of a 2-D array.
+    freq : float, optional
+        Frequency of the traces, or of each trace, e.g. found by opt_freq.
+        The default is None, which takes the frequency of the largest
+        non-zero bin of the FFT of each trace.
+    refine_tolerance : float, optional
+        Root mean square residual, relative to A, above which a trace is
+        refined. The default is None, which refines no trace.
+
+    Returns
+    -------
+    np.ndarray
+        A, w, p and c of the trace, or of each trace as rows of a 2-D array.
+
+    """
+    tt = np.asarray(tt, dtype=float)
+    yy = np.asarray(yy, dtype=float)
+    traces = np.atleast_2d(yy)
+    if freq is None:
+        spectrum = np.abs(np.fft.rfft(traces, axis=1))
+        freq = np.fft.rfftfreq(len(tt), tt[1] - tt[0])[np.argmax(spectrum[:, 1:], axis=1) + 1]
+    w = np.array(np.broadcast_to(2*pi*np.asarray(freq, dtype=float), (traces.shape[0],)))
+    shared = bool(np.all(w == w[0]))
+    if shared:
+        # One design matrix of t x 3 for every trace
+        angle = w[0]*tt
+        design = np.column_stack([np.sin(angle), np.cos(angle), np.ones_like(angle)])
+        coefficients = np.linalg.lstsq(design, traces.T, rcond=None)[0].T
+    else:
+        angle = w[:, None]*tt
+        design = np.stack([np.sin(angle), np.cos(angle), np.ones_like(angle)], axis=2)
+        normal = np.einsum("nti,ntj->nij", design, design)
+        coefficients = np.linalg.solve(normal, np.einsum("nti,nt->ni", design, traces)[..., None])[..., 0]
+    fit = np.column_stack([np.hypot(coefficients[:, 0], coefficients[:, 1]), w,
+                           np.arctan2(coefficients[:, 1], coefficients[:, 0]), coefficients[:, 2]])
+    if refine_tolerance is not None:
+        fitted = coefficients @ design.T if shared else np.einsum("nti,ni->nt", design, coefficients)
+        residual = np.sqrt(np.mean((traces - fitted)**2, axis=1))
+        refine = np.flatnonzero(residual > refine_tolerance*fit[:, 0])
+        if len(refine) > 0:
+            import scipy.optimize
+        for row in refine:
+            try:
+                fit[row] = scipy.optimize.curve_fit(sinfunc, tt, traces[row], p0=fit[row], maxfev=200000)[0]
+            except RuntimeError:
+                pass
+    return fit if yy.ndim > 1 else fit[0]
+
+def _last_crossing(H: np.ndarray, M: np.ndarray, rising: bool) -> np.ndarray:
+    # H where M last crosses zero in each row, interpolated as in fundmagphase, 0 where M does not cross zero
+    if rising:
+        crossing = (M[:,1:] > 0) & (M[:,:-1] < 0)
+    else:
+        crossing = (M[:,1:] < 0) & (M[:,:-1] > 0)
+    j = (crossing.shape[1] - 1 - np.argmax(crossing[:,::-1], axis=1))[:,None]
+    H0 = np.take_along_axis(H, j, axis=1)[:,0]
+    H1 = np.take_along_axis(H, j + 1, axis=1)[:,0]
+    M0 = np.take_along_axis(M, j, axis=1)[:,0]
+    M1 = np.take_along_axis(M, j + 1, axis=1)[:,0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(crossing.any(axis=1), H0 - (H1 - H0)*M0/(M1 - M0), 0.0)
+
+
+def opt_freq(H: List[float], total_points: int, timestep: float, guess_freq: int, fft_backend: FFTBackend = None) -> int:
     """
     Frequency from fft of whole dataset is not exactly correct.
     Best results when fft is performed on a dataset with an integer number of periods
@@ -370,19 +1190,55 @@ def opt_freq(H: List[float], total_points: int, timestep: float, guess_freq: int
     Thus I have implemented an algorithm to zero in on the optimal frequency by first
     testing those truncated data sets with numbers of points divisble by powers of 2,
     and then zeroing in from there.
+    """
+    return opt_freq_search(H, total_points, timestep, guess_freq, fft_backend)[0]
+
+def opt_freq_search(H: List[float], total_points: int, timestep: float, guess_freq: float, fft_backend: FFTBackend = None,
+                    center: int = None, search_range: int = None,
+                    powersof2: Tuple[int] = (1024, 256, 64, 16, 4)) -> Tuple[float, int, float]:
+    """
+    Runs the search of opt_freq and returns its details. The search starts
+    around center with search_range when given, which lets a search seeded
+    by a previous run of the same drive frequency test only a few lengths.
+
+    Parameters
+    ----------
+    H : List[float]
+        H-Coil voltages.
+    total_points : int
+        Number of voltages.
+    timestep : float
+        Time between voltages.
+    guess_freq : float
+        Guess of frequency, e.g. the frequency of the largest bin of the FFT of H.
+    fft_backend : FFTBackend, optional
+        Backend of the Fourier transforms. The default is None, which uses `np.fft`.
+    center : int, optional
+        Truncation length around which the search starts. The default is
+        None, which starts half a period before the end of H.
+    search_range : int, optional
+        Number of points tested on either side of center with the first step.
+        The default is None, which derives it from guess_freq.
+    powersof2 : Tuple[int], optional
+        Steps between tested truncation lengths, one per level of the search.
+        The default is (1024, 256, 64, 16, 4).
+
+    Returns
+    -------
+    Tuple[float, int, float]
+        Frequency, truncation length and figure of merit (off-peak over
+        on-peak magnitude) of the best truncation. The frequency is 0 and the
+        length None when no truncation has a figure of merit below 1.
+
     """
     best_fom = 1
     frequency = 0
+    best_i = None
     guess_period = 1/guess_freq
     guess_tsteps_in_period = guess_period//timestep
-    powersof2 = [1024, 256, 64, 16, 4]
-    last_i =  total_points - guess_tsteps_in_period//2
-    jrange =  powersof2[0] * math.floor(guess_tsteps_in_period//(2 * powersof2[0]))
+    last_i =  total_points - guess_tsteps_in_period//2 if center is None else center
+    jrange =  powersof2[0] * math.floor(guess_tsteps_in_period//(2 * powersof2[0])) if search_range is None else search_range
     for j in range(len(powersof2)):
-        freqsforfom = []
-        fom = []
-        ilist = []
-        fundindexlist = []
         if j > 0:
             jrange = powersof2[j-1]
         center_i =  int(powersof2[j]*math.floor(last_i/powersof2[j]))
@@ -390,26 +1246,34 @@ def opt_freq(H: List[float], total_points: int, timestep: float, guess_freq: int
         upper_lim = min(center_i + jrange, total_points)
         for i in range(lower_lim, upper_lim, powersof2[j]):
             testH = H[0:(i)]
-            testHspectrum = np.fft.fft(testH)
+            testHspectrum = (NUMPY_BACKEND if fft_backend is None else fft_backend).fft(testH)
             freqspectrum = np.fft.fftfreq((i), d=timestep)
             fundindex = np.argmax(np.abs(testHspectrum[1:(int(total_points/2))]))+1
-            guess_freq = abs(freqspectrum[fundindex])
             offpeak = np.abs(testHspectrum[fundindex+1])
             onpeak = np.abs(testHspectrum[fundindex])
             fomi = offpeak/onpeak
-            fom.append(fomi)
-            freqsforfom.append(guess_freq)
-            ilist.append(i)
-            fundindexlist.append(fundindex)
             if fomi < best_fom:
                 best_fom = fomi
-                frequency = guess_freq
+                frequency = abs(freqspectrum[fundindex])
                 best_i = i
                 last_i = best_i
-    return frequency
+    return frequency, best_i, best_fom
+
+def peak_freq(H: List[float], timestep: float, fft_backend: FFTBackend = None) -> float:
+    """
+    Returns the frequency of the largest non-zero bin of the FFT of H in
+    the lower half of the spectrum, the guess of opt_freq.
+    """
+    total_points = len(H)
+    bigHspectrum = (NUMPY_BACKEND if fft_backend is None else fft_backend).fft(H)
+    bigfreq = np.fft.fftfreq(total_points, d=timestep)
+    fundindex = np.argmax(np.abs(bigHspectrum[1:(int(total_points/2))]))+1
+    return bigfreq[fundindex]
    
     
 def calculate_g(gdata: pd.DataFrame, high_cutoff_freq: int) -> Tuple[Callable[[List[float]], List[float]]]:
+    from scipy.interpolate import interp1d
+    
     avgfreqlist = gdata.iloc[:,0].values.tolist()
     greallist = gdata.iloc[:,3].values.tolist()
     gimaglist = gdata.iloc[:,4].values.tolist()
@@ -419,12 +1283,40 @@ def calculate_g(gdata: pd.DataFrame, high_cutoff_freq: int) -> Tuple[Callable[[L
     return(g_interp_real, g_interp_imag)
 
 def pi_mod(pavg: float) -> float:
-    while (pavg < 0 or pavg > 2*pi):
-        if pavg < 0:
-            pavg += 2*pi
-        if pavg > 2*pi:
-            pavg -= 2*pi
-    return pavg
+    """
+    Reduces an angle, or every angle of an array, to the range [0, 2*pi].
+    Angles already in the range are returned unchanged and positive multiples
+    of 2*pi are returned as 2*pi, as by the former loop of 2*pi steps, which
+    this matches exactly for angles within (-2*pi, 4*pi].
+
+    Parameters
+    ----------
+    pavg : float
+        Angle in radians, or array of angles.
+
+    Returns
+    -------
+    float
+        Reduced angle, or array of reduced angles.
+
+    """
+    angle = np.asarray(pavg, dtype=float)
+    reduced = np.mod(angle, 2*pi)
+    # +0.0 turns the -0.0 of negative multiples of 2*pi into 0.0
+    reduced = np.where((reduced == 0) & (angle > 0), 2*pi, reduced) + 0.0
+    return reduced if reduced.ndim > 0 else reduced[()]
+
+def odd_harmonic_mask(length: int, est_num_periods: int, symmetric: bool = False) -> np.ndarray:
+    # odd_harmonic_M of every index of a spectrum of given length
+    # symmetric mirrors the positive frequency harmonics onto the negative ones,
+    # which is needed when length is not a multiple of est_num_periods
+    i = np.arange(length)
+    oddnums = np.arange(1, 40, 2)
+    lower = np.isin(np.round(i/est_num_periods), oddnums) & (i < length/2) & (i % est_num_periods == 0)
+    if symmetric:
+        return lower | np.roll(lower[::-1], 1)
+    upper = np.isin(np.round((length - i)/est_num_periods), oddnums) & (i > length/2)
+    return lower | ((i % est_num_periods == 0) & upper)
 
 def odd_harmonic_M(length: int, i: int, est_num_periods: int) -> Tuple[int]:
     oddnums = [1,3,5,7,9,11,13,15,17,19,21,23,25,27,29,31,33,35,37,39]
@@ -444,51 +1336,59 @@ def sinfunc(t, A, w, p, c):  return A * np.sin(w*t + p) + c
 
 def fit_sin(tt, yy):
     #Fit sin to the input time sequence, and return fitting parameters "amp", "omega", "phase", "offset"
-    tt = np.array(tt)
-    yy = np.array(yy)
-    ff = np.fft.fftfreq(len(tt), (tt[1]-tt[0]))   # assume uniform spacing
-    Fyy = abs(np.fft.fft(yy))
-    guess_freq = abs(ff[np.argmax(np.abs(Fyy[1:]))+1])   # excluding the zero frequency "peak", which is related to offset
-    guess_amp = 1.41*np.std(yy)
-    guess_w = 2.*np.pi*guess_freq
-    guess_offset = np.mean(yy)
-    ind1 = int(len(yy)/4)
-    ind2 = int(len(yy)/8)
-    arccosarg = (yy[ind1] - yy[0])/((tt[ind1] - tt[0])*guess_amp*guess_w)
-    if arccosarg > 1:
-        arccosarg = 1
-    if arccosarg < -1:
-        arccosarg = -1
-    guess_phase = np.arccos(arccosarg)-pi_mod(guess_w*tt[ind2])
-    guess = np.array([guess_amp, guess_w, guess_phase, guess_offset])
-    try:
-        popt, pcov = scipy.optimize.curve_fit(sinfunc, tt, yy, p0=guess, maxfev = 200000)
-    except:
-        popt = [guess_amp, guess_w, guess_phase, guess_offset]
-    A, w, p, c = popt
-    return [A, w, p, c]
-
-def pi_mod_array(phasearray):
-    for k in range(len(phasearray)):
-        phasearray[k] = pi_mod(phasearray[k])
-    topcount = 0
-    midcount = 0
-    bottomcount = 0
-    for k in range(len(phasearray)):
-        if phasearray[k] < pi/2:
-            bottomcount += 1
-        elif phasearray[k] > 3*pi/2:
-            topcount += 1
-        else:
-            midcount += 1
-    if ((bottomcount + topcount) > midcount):
-        mult = np.sign(bottomcount - topcount)
-        if mult ==0: mult = 1
-        cutoff = pi
-        for k in range(len(phasearray)):
-            if mult*phasearray[k] > mult*float(cutoff):
-                phasearray[k] = phasearray[k] - mult*2*pi
-    return phasearray
+    #The linear fit of fit_sin_batch is the initial guess of curve_fit
+    return fit_sin_batch(tt, yy, refine_tolerance=0.0).tolist()
+
+def pi_mod_array(phasearray: np.ndarray, axis: int = None) -> np.ndarray:
+    """
+    Reduces phases with pi_mod, then re-centres them by majority vote: when
+    more phases lie below pi/2 or above 3*pi/2 than between, the phases are
+    moved next to 0, i.e. into [-pi, pi] if more lie below pi/2 and into
+    [pi, 3*pi] otherwise, so that phases close to 0 are not split across
+    the ends of [0, 2*pi].
+
+    Parameters
+    ----------
+    phasearray : np.ndarray
+        Phases in radians, e.g. PM_MINUS_PH_G of every voltage run.
+    axis : int, optional
+        Axis along which phases vote together, e.g. 1 for one row of phases
+        per sweep. The default is None, where every phase votes together.
+
+    Returns
+    -------
+    np.ndarray
+        Re-centred phases, of the shape of phasearray.
+
+    """
+    phases = np.array(pi_mod(phasearray), dtype=float)
+    bottom = np.sum(phases < pi/2, axis=axis, keepdims=True)
+    top = np.sum(phases > 3*pi/2, axis=axis, keepdims=True)
+    middle = (phases.size if axis is None else phases.shape[axis]) - bottom - top
+    mult = np.where(bottom >= top, 1, -1)
+    shift = ((bottom + top) > middle) & (mult*phases > mult*pi)
+    phases[shift] -= np.broadcast_to(mult*2*pi, phases.shape)[shift]
+    return phases
+
+def unwrap_phase(phasearray: np.ndarray, axis: int = -1) -> np.ndarray:
+    """
+    Removes the jumps of 2*pi between consecutive phases, e.g. of a sweep
+    of voltage runs, after reducing the first phase with pi_mod.
+
+    Parameters
+    ----------
+    phasearray : np.ndarray
+        Phases in radians.
+    axis : int, optional
+        Axis of consecutive phases. The default is -1.
+
+    Returns
+    -------
+    np.ndarray
+        Unwrapped phases.
+
+    """
+    return np.unwrap(pi_mod(phasearray), axis=axis)
 
 def writefunc(k):
     if k % 10 == 0:
@@ -496,9 +1396,9 @@ def writefunc(k):
     else:
         return 0
 
-def fftdata(selectarray):
+def fftdata(selectarray, fft_backend: FFTBackend = None):
     arraylist = selectarray
-    Mspectrumselect = np.fft.fft(arraylist)
+    Mspectrumselect = (NUMPY_BACKEND if fft_backend is None else fft_backend).fft(arraylist)
     realMspectrumselect = np.real(Mspectrumselect)
     imagMspectrumselect = np.imag(Mspectrumselect)
     
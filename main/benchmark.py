@@ -0,0 +1,500 @@
+# -*- coding: utf-8 -*-
+"""Benchmark Package
+
+This script times the stages of the analysis program on synthetic datasets.
+A deterministic generator writes a complete data tree (oscilloscope voltage
+runs, G-Factor files, temperature and time files and a configuration file)
+for every requested number of runs, and each scenario is timed on it.
+
+The timed scenarios are:
+    * reader - Loading the configuration file and all datasets with Reader
+    * opt_freq - Frequency search of `analysis` on every voltage run
+    * fundmagphase - Analysis of every voltage run
+    * writeData - Writing analyzed data with Writer
+    * writePlots - Writing plots of analyzed data with Writer
+
+This program is written with Python version 3.7.3 with Spyder IDE and
+can be run on its own on the command line:
+    python benchmark.py [--sizes N ...] [--points N] [--repeats N] [--scenarios NAME ...] [--output FILE]
+                        [--baseline FILE] [--tolerance FRACTION] [--min-seconds SECONDS] [--min-baseline SECONDS]
+                        [--statistic MIN|MEDIAN] [--ungated NAME ...]
+Results are printed and written as JSON to the output file.
+
+With --baseline, the scenarios of a stored result file are run again with
+its settings and their fastest repeats (or medians, see --statistic) are
+compared side by side. The program exits with status 1 when any of them is
+slower than the baseline by more than the tolerance and by more than
+--min-seconds. Scenarios whose baseline is shorter than --min-baseline are
+shown but not gated, since their timing is dominated by noise, and so are
+the --ungated scenarios (by default writeData, whose timing follows the load
+of the file system more than the code). Only the project's own dependencies
+are needed and no network access. Baselines are machine-specific and are not
+committed; record one on the machine running the comparison before a change,
+e.g.:
+    python benchmark.py --sizes 100 1000 --output baseline.json
+and compare against it after the change:
+    python benchmark.py --baseline baseline.json
+
+This file can be imported as a module and contains the following functions:
+    * main - Command line entry point of the benchmark
+    * runScenarios - Times the scenarios for every number of runs
+    * compareResults - Compares timings against baseline timings
+    * printComparison - Prints baseline and current timings side by side
+    * writeDataTree - Writes a synthetic data tree and its configuration file
+    * makeVoltageDataFrame - Returns a synthetic oscilloscope voltage run
+    * writeGFactorFile - Writes a synthetic G-Factor file
+    * timeScenario - Times repeated calls of a function
+
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+import numpy as np
+import pandas as pd
+
+DATE_TIME = "20210131140159"
+SCENARIOS = ["reader", "opt_freq", "fundmagphase", "writeData", "writePlots"]
+UNGATED_SCENARIOS = ["writeData"]
+
+def writeGFactorFile(path: str, sampleRate: float, numPoints: int = 200) -> None:
+    """
+    Writes a synthetic G-Factor file with a smooth, slightly complex response.
+
+    Parameters
+    ----------
+    path : str
+        File path of G-Factor file.
+    sampleRate : float
+        Sample rate of voltage runs. Frequencies span up to its Nyquist frequency.
+    numPoints : int, optional
+        Number of frequencies in the file. The default is 200.
+
+    Returns
+    -------
+    None.
+
+    """
+    freqs = np.linspace(0, sampleRate / 2, numPoints)
+    pd.DataFrame({"Frequency": freqs, "Amplitude": freqs, "Phase": freqs,
+                  "gfactor real": 1 + 1e-8 * freqs, "gfactor imag": 1e-9 * freqs}).to_csv(path, index=False)
+
+def makeVoltageDataFrame(numPoints: int, sampleRate: float, frequency: float, amplitude: float, phase: float,
+                         harmonics: Dict[int, float] = None, noise: float = 0.01, seed: int = 0) -> pd.DataFrame:
+    """
+    Returns a synthetic oscilloscope voltage run.
+
+    H is a sinusoid and M is its phase-shifted response with odd harmonics
+    and Gaussian noise.
+
+    Parameters
+    ----------
+    numPoints : int
+        Number of samples.
+    sampleRate : float
+        Sample rate in Hz.
+    frequency : float
+        Frequency of H in Hz.
+    amplitude : float
+        Amplitude of H.
+    phase : float
+        Phase of M relative to H in radians.
+    harmonics : Dict[int, float], optional
+        Relative amplitude of each harmonic of M. The default is None, which is
+        {1: 0.3, 3: 0.05, 5: 0.01}.
+    noise : float, optional
+        Standard deviation of noise added to M. The default is 0.01.
+    seed : int, optional
+        Seed of noise. The default is 0.
+
+    Returns
+    -------
+    pd.DataFrame
+        Voltage run with columns "Time(s)", "Voltage(CH1)" and "Voltage(CH2)".
+
+    """
+    if harmonics is None:
+        harmonics = {1: 0.3, 3: 0.05, 5: 0.01}
+    times = np.arange(numPoints) / sampleRate
+    angle = 2 * np.pi * frequency * times
+    H = amplitude * np.sin(angle)
+    M = np.zeros(numPoints)
+    for harmonic, ratio in harmonics.items():
+        M += ratio * amplitude * np.sin(harmonic * (angle + phase))
+    M += noise * np.random.default_rng(seed).standard_normal(numPoints)
+    return pd.DataFrame({"Time(s)": times, "Voltage(CH1)": H, "Voltage(CH2)": M})
+
+def writeDataTree(root: str, numRuns: int, numPoints: int = 5000, sampleRate: float = 10e6, frequency: float = 100e3,
+                  noise: float = 0.01, seed: int = 0, withEmpty: bool = False, extra: str = "") -> str:
+    """
+    Writes a synthetic data tree and its configuration file.
+
+    The same arguments always write the same files.
+
+    Parameters
+    ----------
+    root : str
+        Directory of data tree. It is created when it does not exist.
+    numRuns : int
+        Number of voltage runs.
+    numPoints : int, optional
+        Number of samples of each voltage run. The default is 5000.
+    sampleRate : float, optional
+        Sample rate in Hz. The default is 10e6.
+    frequency : float, optional
+        Frequency of H in Hz. The default is 100e3.
+    noise : float, optional
+        Standard deviation of noise added to M. The default is 0.01.
+    seed : int, optional
+        Seed of noise. The default is 0.
+    withEmpty : bool, optional
+        Value of WITH_EMPTY. The default is False.
+    extra : str, optional
+        Lines appended to the configuration file. The default is "".
+
+    Returns
+    -------
+    str
+        File path of configuration file.
+
+    """
+    base = os.path.join(root, "base")
+    for folder in ["MCoil", "HCoil", "Oscilloscope", "Empty", "Opsens", "Time"]:
+        os.makedirs(os.path.join(base, folder), exist_ok=True)
+    os.makedirs(os.path.join(root, "out"), exist_ok=True)
+
+    writeGFactorFile(os.path.join(base, "MCoil", "gfactors.csv"), sampleRate)
+    writeGFactorFile(os.path.join(base, "HCoil", "gfactors.csv"), sampleRate)
+    duration = numPoints / sampleRate
+    for run in range(1, numRuns + 1):
+        makeVoltageDataFrame(numPoints, sampleRate, frequency, 20 + 20 * run / numRuns, 0.3 + 0.2 * run / numRuns,
+                             noise=noise, seed=seed + run).to_csv(
+            os.path.join(base, "Oscilloscope", "voltageDataScopeRun" + DATE_TIME + "(" + str(run) + ")CollectionKind1.csv"), index=False)
+    makeVoltageDataFrame(numPoints, sampleRate, frequency, 30, 0.0, noise=noise, seed=seed).to_csv(
+        os.path.join(base, "Empty", "voltageDataScopeRun" + DATE_TIME + "(0)CollectionKind0.csv"), index=False)
+
+    runs = np.arange(1, numRuns + 1)
+    pd.DataFrame({"Oscilloscope Run": runs, "Temperature": 25 + 0.01 * runs}).to_csv(
+        os.path.join(base, "Opsens", "tempData" + DATE_TIME + "CollectionKind1.csv"), index=False)
+    tempTimes = np.linspace(0, 2 * numRuns + 2, 2 * numRuns + 3)
+    pd.DataFrame({"Time": tempTimes, "Temperature": 25 + 0.005 * tempTimes}).to_csv(
+        os.path.join(base, "Opsens", "tempTimeData" + DATE_TIME + "CollectionKind1.csv"), index=False)
+    times = [100.0, 100.5, 0.5]
+    for run in runs:
+        times += [100.0 + 2 * run, 2.0 * run]
+    pd.DataFrame({"Data": ["Time"] * len(times), "Time": times}).to_csv(
+        os.path.join(base, "Time", "Time_ComparisonRun" + DATE_TIME + "CollectionKind1.csv"), index=False)
+
+    configDir = os.path.join(root, "config.txt")
+    with open(configDir, 'w') as configFile:
+        configFile.write("\n".join([
+            "# Synthetic benchmark data: " + str(numRuns) + " runs of " + str(numPoints) + " samples, " + str(duration) + " s each",
+            "OUT_DIR = " + os.path.join(root, "out"),
+            "BASE_DIR = " + base,
+            "DATA_EMPTY = Empty/voltageDataScopeRun" + DATE_TIME + "(0)CollectionKind0.csv",
+            "DATA_ACTUAL = Oscilloscope",
+            "DESCRIPTION = Benchmark",
+            "M_G_FACTOR_FILE = MCoil/gfactors.csv",
+            "H_G_FACTOR_FILE = HCoil/gfactors.csv",
+            "CUTOFF_FREQ = " + str(int(sampleRate * 0.4)),
+            "KNOWN_FREQ = 0",
+            "M_OVER_H_REAL_SUB = 0",
+            "M_OVER_H_IMAG_SUB = 0",
+            "M_OVER_H_CALIB = 0",
+            "PM_PH_DIFF_PHASE_ADJ = 0",
+            "M_OVER_H0_SUB = 0",
+            "H_PHASE_REAL_SUB = 0",
+            "H_PHASE_IMAG_SUB = 0",
+            "V_H_OFFSET = 10",
+            "NUM_PERIOD = 4",
+            "BEGIN_TIME = 0",
+            "POLARITY = 1",
+            "WITH_EMPTY = " + ("TRUE" if withEmpty else "FALSE"),
+            "NON_LINEAR_SUB = FALSE",
+            "TEMP_DIR = Opsens",
+            "TIME_DIR = Time",
+            "READ_TIME = TRUE",
+            "H_MIN = 0",
+            "H_MAX = 1000000",
+            "LEGEND = TEMPERATURE",
+            "PLOT = H_INT_RECONSTRUCTED_REAL_LIST:M_INT_RECONSTRUCTED_REAL_LIST",
+            "PLOT_LABEL = H (kA/m):M (kA/m)",
+            "PROPERTY_PLOT = TEMPERATURE:HC",
+            "PROPERTY_PLOT_LABEL = T:Hc",
+        ]) + "\n" + extra)
+    return configDir
+
+def timeScenario(function: Callable[[], Any], repeats: int) -> Dict[str, Any]:
+    """
+    Times repeated calls of a function.
+
+    Parameters
+    ----------
+    function : Callable[[], Any]
+        Function to be timed.
+    repeats : int
+        Number of calls.
+
+    Returns
+    -------
+    Dict[str, Any]
+        Timing with keys "SECONDS" (every call), "MEDIAN", "MIN" and "MAX".
+
+    """
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    return {"SECONDS": seconds, "MEDIAN": statistics.median(seconds), "MIN": min(seconds), "MAX": max(seconds)}
+
+def runScenarios(sizes: List[int], workDir: str, scenarios: List[str] = None, repeats: int = 3,
+                 **treeArgs) -> List[Dict[str, Any]]:
+    """
+    Times the scenarios for every number of runs.
+
+    Parameters
+    ----------
+    sizes : List[int]
+        Numbers of voltage runs.
+    workDir : str
+        Directory in which the data trees are written.
+    scenarios : List[str], optional
+        Names of scenarios to be timed. The default is None, which times all of them.
+    repeats : int, optional
+        Number of timed calls of each scenario. The default is 3.
+    **treeArgs
+        Keyword arguments passed to writeDataTree.
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        Timing of each scenario and number of runs, with keys "SCENARIO",
+        "RUNS", "REPEATS", "SECONDS", "MEDIAN", "MIN", "MAX" and "PER_RUN".
+
+    """
+    import analysis
+    from tools import Reader, Writer
+
+    if scenarios is None:
+        scenarios = SCENARIOS
+    results = []
+    for size in sizes:
+        root = os.path.join(workDir, "runs" + str(size))
+        print("Writing synthetic data tree of {} runs".format(size))
+        configDir = writeDataTree(root, size, **treeArgs)
+        reader = Reader(configDir)
+        config = reader.getAnalysisConfig()
+        voltages = reader.get("DICT_DATAFRAME_ACTUAL")
+        keys = [key for key in voltages if key.startswith("voltageDataScopeRun")]
+
+        def analyze():
+            return {key + "_ACTUAL_LINEAR": analysis.fundmagphase_config(
+                voltages[key], reader.get("M_G_FACTOR_DATAFRAME"), reader.get("H_G_FACTOR_DATAFRAME"), config,
+                runNum=reader.getRunNum(key), temperature=reader.getRunTemp(key)) for key in keys}
+
+        inputs = []
+        for key in keys:
+            H = voltages[key].iloc[:, 1].to_numpy()
+            timestep = voltages[key].iloc[1, 0] - voltages[key].iloc[0, 0]
+            spectrum = np.abs(np.fft.fft(H)[1:len(H) // 2])
+            inputs.append((H.tolist(), len(H), timestep, np.fft.fftfreq(len(H), d=timestep)[np.argmax(spectrum) + 1]))
+
+        analyzed = {}
+        timed = {
+            "reader": lambda: Reader(configDir),
+            "opt_freq": lambda: [analysis.opt_freq(*args) for args in inputs],
+            "fundmagphase": lambda: analyzed.update(analyze()),
+            "writeData": lambda: Writer(reader, analyzed).writeData(),
+            "writePlots": lambda: Writer(reader, analyzed).writePlots(),
+        }
+        for scenario in scenarios:
+            if scenario in ("writeData", "writePlots") and len(analyzed) == 0:
+                analyzed.update(analyze())
+            print("Timing {} on {} runs".format(scenario, size))
+            result = {"SCENARIO": scenario, "RUNS": size, "REPEATS": repeats}
+            result.update(timeScenario(timed[scenario], repeats))
+            result["PER_RUN"] = result["MEDIAN"] / size
+            results.append(result)
+        if "writePlots" in scenarios:
+            import matplotlib.pyplot as plt
+            plt.close("all")
+        shutil.rmtree(root)
+    return results
+
+def compareResults(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float = 0.25,
+                   minSeconds: float = 0.05, minBaseline: float = 0.25, statistic: str = "MIN",
+                   ungated: List[str] = ()) -> List[Dict[str, Any]]:
+    """
+    Compares the timing of each scenario against a baseline.
+
+    Parameters
+    ----------
+    results : List[Dict[str, Any]]
+        Timings returned by runScenarios.
+    baseline : List[Dict[str, Any]]
+        Baseline timings in the same format.
+    tolerance : float, optional
+        Fraction by which a timing may be slower than its baseline. The default is 0.25.
+    minSeconds : float, optional
+        Slowdowns smaller than this many seconds are never regressions, so that
+        timer noise of short scenarios is ignored. The default is 0.05.
+    minBaseline : float, optional
+        Scenarios whose baseline timing is shorter than this many seconds are
+        not gated. The default is 0.25.
+    statistic : str, optional
+        Compared timing of the repeats, "MIN" or "MEDIAN". The default is
+        "MIN", the fastest repeat, which other load of the machine can only
+        make slower.
+    ungated : List[str], optional
+        Scenarios which are compared but not gated. The default is none.
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        Comparison of each timed scenario, with keys "SCENARIO", "RUNS",
+        "BASELINE", "CURRENT", "RATIO" and "STATUS" ("OK", "FASTER",
+        "REGRESSION", "UNGATED" when the baseline is shorter than minBaseline
+        or the scenario is ungated, or "NEW" when the baseline lacks the scenario).
+
+    """
+    timings = {(result["SCENARIO"], result["RUNS"]): result[statistic] for result in baseline}
+    rows = []
+    for result in results:
+        current = result[statistic]
+        row = {"SCENARIO": result["SCENARIO"], "RUNS": result["RUNS"], "BASELINE": None,
+               "CURRENT": current, "RATIO": None, "STATUS": "NEW"}
+        base = timings.get((result["SCENARIO"], result["RUNS"]))
+        if base is not None:
+            row["BASELINE"] = base
+            row["RATIO"] = current / base if base > 0 else float("inf")
+            if base < minBaseline or result["SCENARIO"] in ungated:
+                row["STATUS"] = "UNGATED"
+            elif current > base * (1 + tolerance) and current - base > minSeconds:
+                row["STATUS"] = "REGRESSION"
+            elif current < base / (1 + tolerance):
+                row["STATUS"] = "FASTER"
+            else:
+                row["STATUS"] = "OK"
+        rows.append(row)
+    return rows
+
+def printComparison(rows: List[Dict[str, Any]]) -> None:
+    """
+    Prints baseline and current timings side by side.
+
+    Parameters
+    ----------
+    rows : List[Dict[str, Any]]
+        Comparison returned by compareResults.
+
+    Returns
+    -------
+    None.
+
+    """
+    print("SCENARIO".ljust(14) + "RUNS".rjust(7) + "BASELINE (s)".rjust(14) + "CURRENT (s)".rjust(13) + "RATIO".rjust(8) + "  STATUS")
+    for row in rows:
+        baseline = "{:14.4f}".format(row["BASELINE"]) if row["BASELINE"] is not None else "-".rjust(14)
+        ratio = "{:8.2f}".format(row["RATIO"]) if row["RATIO"] is not None else "-".rjust(8)
+        print(row["SCENARIO"].ljust(14) + str(row["RUNS"]).rjust(7) + baseline + "{:13.4f}".format(row["CURRENT"])
+              + ratio + "  " + row["STATUS"])
+
+def main(argv: List[str] = None) -> int:
+    """
+    Command line entry point of the benchmark.
+
+    Parameters
+    ----------
+    argv : List[str], optional
+        Command line arguments without the program name.
+        The default is None, which reads sys.argv.
+
+    Returns
+    -------
+    int
+        Exit status. 1 when a scenario regressed against the baseline, 0 otherwise.
+
+    """
+    parser = argparse.ArgumentParser(description="Times the analysis program on synthetic datasets.")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        help="Numbers of voltage runs to benchmark, e.g. 10 100 1000 10000. Default: 10 100 1000.")
+    parser.add_argument("--points", type=int, help="Number of samples of each voltage run. Default: 5000.")
+    parser.add_argument("--sample-rate", type=float, help="Sample rate of voltage runs in Hz. Default: 10e6.")
+    parser.add_argument("--frequency", type=float, help="Frequency of H in Hz. Default: 100e3.")
+    parser.add_argument("--noise", type=float, help="Standard deviation of noise added to M. Default: 0.01.")
+    parser.add_argument("--seed", type=int, help="Seed of noise. Default: 0.")
+    parser.add_argument("--repeats", type=int, help="Number of timed calls of each scenario. Default: 5.")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, help="Scenarios to time. Default: all.")
+    parser.add_argument("--work-dir", help="Directory for synthetic data trees. A temporary directory is used by default.")
+    parser.add_argument("--output", default="benchmark.json", help="JSON file to which results are written.")
+    parser.add_argument("--baseline",
+                        help="Result file recorded on this machine to compare against. Its settings are used unless given.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Fraction by which a timing may be slower than the baseline. Default: 0.25.")
+    parser.add_argument("--min-seconds", type=float, default=0.05,
+                        help="Slowdowns smaller than this many seconds are never regressions. Default: 0.05.")
+    parser.add_argument("--min-baseline", type=float, default=0.25,
+                        help="Scenarios whose baseline is shorter than this many seconds are not gated. Default: 0.25.")
+    parser.add_argument("--statistic", choices=["MIN", "MEDIAN"], default="MIN",
+                        help="Compared timing of the repeats of each scenario. Default: MIN, the fastest repeat.")
+    parser.add_argument("--ungated", nargs="*", choices=SCENARIOS, default=UNGATED_SCENARIOS,
+                        help="Scenarios which are compared but never regressions. Default: writeData.")
+    args = parser.parse_args(argv)
+    
+    settings = {"SIZES": [10, 100, 1000], "POINTS": 5000, "SAMPLE_RATE": 10e6, "FREQUENCY": 100e3, "NOISE": 0.01,
+                "SEED": 0, "REPEATS": 5, "SCENARIOS": SCENARIOS}
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as baselineFile:
+            baseline = json.load(baselineFile)
+        settings.update({key: value for key, value in baseline["META"].items() if key in settings})
+    for key, value in (("SIZES", args.sizes), ("POINTS", args.points), ("SAMPLE_RATE", args.sample_rate),
+                       ("FREQUENCY", args.frequency), ("NOISE", args.noise), ("SEED", args.seed),
+                       ("REPEATS", args.repeats), ("SCENARIOS", args.scenarios)):
+        if value is not None:
+            settings[key] = value
+
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    workDir = args.work_dir if args.work_dir is not None else tempfile.mkdtemp(prefix="benchmark")
+    try:
+        results = runScenarios(settings["SIZES"], workDir, settings["SCENARIOS"], settings["REPEATS"],
+                               numPoints=settings["POINTS"], sampleRate=settings["SAMPLE_RATE"],
+                               frequency=settings["FREQUENCY"], noise=settings["NOISE"], seed=settings["SEED"])
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(workDir, ignore_errors=True)
+
+    meta = {"PYTHON": platform.python_version(), "NUMPY": np.__version__, "PANDAS": pd.__version__,
+            "PLATFORM": platform.platform()}
+    meta.update(settings)
+    report = {"META": meta, "RESULTS": results}
+    with open(args.output, 'w') as outputFile:
+        json.dump(report, outputFile, indent=2)
+
+    print("SCENARIO".ljust(14) + "RUNS".rjust(7) + "MEDIAN (s)".rjust(12) + "PER RUN (ms)".rjust(14))
+    for result in results:
+        print(result["SCENARIO"].ljust(14) + str(result["RUNS"]).rjust(7) + "{:12.4f}".format(result["MEDIAN"])
+              + "{:14.3f}".format(1000 * result["PER_RUN"]))
+    print("Results written to " + args.output)
+    
+    if baseline is None:
+        return 0
+    print("Comparison against " + args.baseline + " (tolerance {:.0%})".format(args.tolerance))
+    rows = compareResults(results, baseline["RESULTS"], args.tolerance, args.min_seconds, args.min_baseline,
+                          args.statistic, args.ungated)
+    printComparison(rows)
+    regressions = [row for row in rows if row["STATUS"] == "REGRESSION"]
+    if len(regressions) > 0:
+        print("{} scenario(s) regressed".format(len(regressions)))
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""Calibration Package
+
+This script contains the CalibrationStore class which keeps the analysis of
+empty field voltage datasets on disk, so the same empty field calibration
+shared by many invocations of the analysis program is analyzed only once.
+
+Each analysis is stored as a versioned .npz artifact named after its
+fingerprint, the SHA-256 digest of:
+    * ARTIFACT_VERSION
+    * the sources of the modules listed in SOURCE_MODULES
+    * the contents of the empty field voltage dataset and both G-Factor files
+    * the analysis parameters listed in ANALYSIS_ATTRIBUTES
+A change of any of them changes the fingerprint, so an outdated artifact is
+never loaded. Artifacts hold no pickled objects.
+
+The digests of files are kept in an index of the artifact directory, keyed
+by the resolved path, size and modification time of each file, so an
+unchanged dataset is not hashed again by later invocations.
+
+This program is written with Python version 3.7.3 with Spyder IDE.
+
+This file is imported as a module and contains the following class:
+    * CalibrationStore - Saves and loads analyzed empty field datasets
+
+It provides the following functions:
+    * fileDigest - Returns the SHA-256 digest of the contents of a file
+    * fingerprint - Returns the fingerprint of an empty field analysis
+
+It provides the following objects:
+    * ARTIFACT_VERSION - Version of the artifact format and of its contents
+    * ANALYSIS_ATTRIBUTES - AnalysisConfig attributes which change the empty field analysis
+    * SOURCE_MODULES - Modules whose sources change the empty field analysis
+
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+import analysis
+import fftbackend
+import reference
+
+ARTIFACT_VERSION = 1
+"""
+int: Version of the artifact format. It has to be increased whenever the
+contents of an artifact change meaning.
+"""
+
+ANALYSIS_ATTRIBUTES = ("cutoffFreq", "knownFreq", "mOverHRealSub", "mOverHImagSub", "mOverHCalib", "pmPhDiffPhaseAdj",
+                       "mOverH0Sub", "hPhaseRealSub", "hPhaseImagSub", "numPeriod", "beginTime", "polarity",
+                       "engine", "fftBackend", "fftLength", "precision", "decimate")
+"""
+Tuple[str]: Attributes of AnalysisConfig which change the analysis of the empty field dataset.
+"""
+
+SOURCE_MODULES = (analysis, fftbackend, reference)
+"""
+Tuple[module]: Modules whose sources change the analysis of the empty field dataset.
+"""
+
+def fileDigest(path: str, blockSize: int = 1 << 20) -> str:
+    """
+    Returns the hexadecimal SHA-256 digest of the contents of a file.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(blockSize), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def fingerprint(files: List[str], config: 'AnalysisConfig', digests: Callable[[str], str] = None) -> str:
+    """
+    Returns the fingerprint of the analysis of an empty field dataset.
+
+    Parameters
+    ----------
+    files : List[str]
+        File paths of the empty field voltage dataset, M-Coil and H-Coil G-Factor files.
+    config : AnalysisConfig
+        Analysis parameters of the configuration file.
+    digests : Callable[[str], str], optional
+        Function returning the digest of a file, e.g. CalibrationStore.fileDigest.
+        The default is None, which is fileDigest.
+
+    Returns
+    -------
+    str
+        Hexadecimal SHA-256 digest.
+
+    """
+    if digests is None:
+        digests = fileDigest
+    digest = hashlib.sha256()
+    digest.update(("version=" + str(ARTIFACT_VERSION) + "\n").encode())
+    for module in SOURCE_MODULES:
+        digest.update((module.__name__ + "=" + digests(module.__file__) + "\n").encode())
+    for path in files:
+        digest.update(("file=" + digests(path) + "\n").encode())
+    for name in ANALYSIS_ATTRIBUTES:
+        digest.update((name + "=" + repr(getattr(config, name)) + "\n").encode())
+    return digest.hexdigest()
+
+
+class CalibrationStore(object):
+    """
+    Saves and loads analyzed empty field datasets as .npz artifacts.
+
+    Artifacts are written to:
+        directory/EMPTY_ + FINGERPRINT + .npz
+    Every column of the analyzed dataframe is stored as an array and the
+    properties are stored as JSON, so a loaded analysis equals the saved one.
+    The digests of hashed files are indexed in:
+        directory/DIGESTS.json
+
+    Attributes
+    ----------
+    directory : str
+        Directory of artifacts.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Parameters
+        ----------
+        directory : str
+            Directory of artifacts. It is created when the first artifact is saved.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.directory = str(directory)
+        self._digests = None
+        self._lock = threading.Lock()
+
+    def path(self, key: str) -> str:
+        """
+        Returns the file path of the artifact of a fingerprint.
+        """
+        return os.path.join(self.directory, "EMPTY_" + key + ".npz")
+
+    def fileDigest(self, path: str) -> str:
+        """
+        Returns the SHA-256 digest of the contents of a file. Digests are
+        indexed by resolved path, size and modification time in nanoseconds,
+        so a file is only hashed again once it changes.
+
+        Parameters
+        ----------
+        path : str
+            File path.
+
+        Returns
+        -------
+        str
+            Hexadecimal SHA-256 digest.
+
+        """
+        resolved = os.path.realpath(path)
+        stat = os.stat(resolved)
+        key = "{}|{}|{}".format(resolved, stat.st_size, stat.st_mtime_ns)
+        indexPath = os.path.join(self.directory, "DIGESTS.json")
+        with self._lock:
+            if self._digests is None:
+                try:
+                    with open(indexPath, 'r') as indexFile:
+                        self._digests = dict(json.load(indexFile))
+                except (OSError, ValueError, TypeError):
+                    self._digests = {}
+            if key in self._digests:
+                return self._digests[key]
+            # Entries of earlier versions of the file and of files which no longer exist are dropped
+            self._digests = {name: value for name, value in self._digests.items()
+                             if name.rsplit("|", 2)[0] != resolved and os.path.exists(name.rsplit("|", 2)[0])}
+            self._digests[key] = fileDigest(resolved)
+            os.makedirs(self.directory, exist_ok=True)
+            handle, temporary = tempfile.mkstemp(suffix=".json", dir=self.directory)
+            try:
+                with os.fdopen(handle, "w") as indexFile:
+                    json.dump(self._digests, indexFile)
+                os.replace(temporary, indexPath)
+            except BaseException:
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+                raise
+            return self._digests[key]
+
+    def load(self, key: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Returns the analyzed empty field dataset saved under a fingerprint.
+
+        Parameters
+        ----------
+        key : str
+            Fingerprint of analysis.
+
+        Returns
+        -------
+        Tuple[pd.DataFrame, Dict[str, Any]]
+            Analyzed dataframe and properties, or None when no valid artifact
+            of this fingerprint and ARTIFACT_VERSION exists.
+
+        """
+        try:
+            with np.load(self.path(key), allow_pickle=False) as artifact:
+                if int(artifact["version"]) != ARTIFACT_VERSION or str(artifact["fingerprint"]) != key:
+                    return None
+                columns = json.loads(str(artifact["columns"]))
+                logger = pd.DataFrame()
+                for index, column in enumerate(columns):
+                    values = artifact["column" + str(index)]
+                    logger[column] = values.tolist() if values.dtype.kind == "U" else values
+                properties = json.loads(str(artifact["properties"]))
+        except (OSError, KeyError, ValueError):
+            return None
+        return logger, properties
+
+    def save(self, key: str, analyzed: Tuple[pd.DataFrame, Dict[str, Any]]) -> str:
+        """
+        Saves an analyzed empty field dataset under a fingerprint. The artifact
+        is written to a temporary file first, so a concurrent or interrupted
+        run never leaves a partial artifact.
+
+        Parameters
+        ----------
+        key : str
+            Fingerprint of analysis.
+        analyzed : Tuple[pd.DataFrame, Dict[str, Any]]
+            Analyzed dataframe and properties of fundmagphase function in `analysis`.
+
+        Returns
+        -------
+        str
+            File path of artifact.
+
+        """
+        logger, properties = analyzed
+        arrays = {"version": np.array(ARTIFACT_VERSION), "fingerprint": np.array(key),
+                  "columns": np.array(json.dumps([str(column) for column in logger.columns])),
+                  "properties": np.array(json.dumps({name: value.item() if isinstance(value, np.generic) else value
+                                                     for name, value in properties.items()}))}
+        for index, column in enumerate(logger.columns):
+            values = logger[column].to_numpy()
+            arrays["column" + str(index)] = values.astype(str) if values.dtype.kind in "OTU" else values
+        os.makedirs(self.directory, exist_ok=True)
+        handle, temporary = tempfile.mkstemp(suffix=".npz", dir=self.directory)
+        try:
+            with os.fdopen(handle, "wb") as file:
+                np.savez(file, **arrays)
+            os.replace(temporary, self.path(key))
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return self.path(key)
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""FFT Backend Package
+
+This script contains the FFTBackend class through which the `analysis`
+package runs its Fourier transforms, and functions which plan transform
+lengths that are fast to transform.
+
+The "numpy" backend uses `np.fft` on a single thread. The "scipy" backend
+uses `scipy.fft`, which runs a transform of many signals, e.g. the batches of
+sliding windows, on several threads. `scipy` is only imported when the
+"scipy" backend is used.
+
+Transforms of lengths with large prime factors are several times slower
+than those of nearby lengths whose prime factors are all small. The window
+of NUM_PERIOD periods analyzed by fundmagphase can be trimmed to fewer whole
+periods or resampled to a nearby fast length, see planLength.
+
+This program is written with Python version 3.7.3 with Spyder IDE.
+
+This file is imported as a module and contains the following class:
+    * FFTBackend - Runs Fourier transforms with `np.fft` or `scipy.fft`
+
+It provides the following functions:
+    * getBackend - Returns the shared FFTBackend object of a backend and number of workers
+    * isFastLength - Returns True if a length only has prime factors up to 11
+    * nextFastLength - Returns the smallest fast length not below a length
+    * planLength - Returns the transform length and number of periods of a window
+
+It provides the following objects:
+    * NUMPY_BACKEND - FFTBackend object of `np.fft`
+    * LENGTH_MODES - Accepted modes of planLength
+
+"""
+import threading
+import time
+from typing import Tuple
+import numpy as np
+
+class FFTBackend(object):
+    """
+    Runs Fourier transforms with `np.fft` or `scipy.fft`.
+
+    Attributes
+    ----------
+    name : str
+        "numpy" or "scipy".
+    workers : int
+        Number of threads of each transform of the "scipy" backend. Negative
+        values count back from the number of CPUs, e.g. -1 uses all of them.
+        The "numpy" backend always uses one thread.
+    """
+
+    names = ("numpy", "scipy")
+    """
+    Tuple[str]: Accepted backend names.
+    """
+
+    def __init__(self, name: str = "numpy", workers: int = 1):
+        """
+        Parameters
+        ----------
+        name : str, optional
+            "numpy" or "scipy". The default is "numpy".
+        workers : int, optional
+            Number of threads of each transform of the "scipy" backend. The default is 1.
+
+        Raises
+        ------
+        ValueError
+            Raised when name is not an accepted backend name.
+
+        Returns
+        -------
+        None.
+
+        """
+        if name not in self.names:
+            raise ValueError("FFT backend must be one of: " + ", ".join(self.names))
+        self.name = name
+        self.workers = workers
+        self._seconds = {}
+        self._lock = threading.Lock()
+        if name == "scipy":
+            import scipy.fft
+            self._module = scipy.fft
+        else:
+            self._module = None
+
+    def fft(self, x: np.ndarray, axis: int = -1) -> np.ndarray:
+        """
+        Returns the discrete Fourier transform of x along axis.
+        """
+        if self._module is None:
+            return np.fft.fft(x, axis=axis)
+        return self._module.fft(x, axis=axis, workers=self.workers)
+
+    def ifft(self, x: np.ndarray, axis: int = -1) -> np.ndarray:
+        """
+        Returns the inverse discrete Fourier transform of x along axis.
+        """
+        if self._module is None:
+            return np.fft.ifft(x, axis=axis)
+        return self._module.ifft(x, axis=axis, workers=self.workers)
+
+    def transformSeconds(self, length: int, repeats: int = 3) -> float:
+        """
+        Returns the time of one transform of given length, measured once per
+        length and reused afterwards.
+
+        Parameters
+        ----------
+        length : int
+            Length of transform.
+        repeats : int, optional
+            Number of measured transforms, of which the fastest counts.
+            The default is 3.
+
+        Returns
+        -------
+        float
+            Seconds.
+
+        """
+        with self._lock:
+            if length not in self._seconds:
+                x = np.random.default_rng(0).standard_normal(length)
+                best = float("inf")
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    self.fft(x)
+                    best = min(best, time.perf_counter() - start)
+                self._seconds[length] = best
+            return self._seconds[length]
+
+    def speedup(self, original: int, chosen: int) -> float:
+        """
+        Returns how many times faster a transform of length chosen is than
+        one of length original. It is 1.0 when both lengths are the same.
+        """
+        if original == chosen:
+            return 1.0
+        return self.transformSeconds(original)/max(self.transformSeconds(chosen), 1e-9)
+
+    def __repr__(self) -> str:
+        return "FFTBackend(" + repr(self.name) + ", workers=" + repr(self.workers) + ")"
+
+NUMPY_BACKEND = FFTBackend()
+
+_backends = {("numpy", 1): NUMPY_BACKEND}
+_backendsLock = threading.Lock()
+
+def getBackend(name: str = "numpy", workers: int = 1) -> FFTBackend:
+    """
+    Returns the FFTBackend object of a backend and number of workers. It is
+    shared by every caller, so transform lengths are only timed once.
+
+    Parameters
+    ----------
+    name : str, optional
+        "numpy" or "scipy". The default is "numpy".
+    workers : int, optional
+        Number of threads of each transform of the "scipy" backend. The default is 1.
+
+    Returns
+    -------
+    FFTBackend
+        Shared FFTBackend object.
+
+    """
+    if name == "numpy":
+        workers = 1
+    with _backendsLock:
+        if (name, workers) not in _backends:
+            _backends[(name, workers)] = FFTBackend(name, workers)
+        return _backends[(name, workers)]
+
+def isFastLength(length: int) -> bool:
+    """
+    Returns True if length > 0 has no prime factor above 11, the largest
+    factor with a dedicated kernel in `np.fft` and `scipy.fft`.
+    """
+    if length < 1:
+        return False
+    for factor in (2, 3, 5, 7, 11):
+        while length % factor == 0:
+            length //= factor
+    return length == 1
+
+def nextFastLength(length: int) -> int:
+    """
+    Returns the smallest length, not below given length, without a prime factor above 11.
+    """
+    length = max(int(length), 1)
+    while not isFastLength(length):
+        length += 1
+    return length
+
+LENGTH_MODES = ("exact", "trim", "resample")
+"""
+Tuple[str]: Accepted modes of planLength.
+"""
+
+def planLength(periodSteps: int, periods: float, mode: str = "exact") -> Tuple[int, float]:
+    """
+    Returns the transform length and number of periods of a window of
+    int(periods*periodSteps) samples.
+
+    Parameters
+    ----------
+    periodSteps : int
+        Number of samples per period.
+    periods : float
+        Number of periods of window.
+    mode : str, optional
+        "exact" keeps the window. "trim" drops whole periods, keeping at least
+        half of them, until the length is fast, and keeps the window when no
+        such length exists. "resample" keeps all periods and chooses the next
+        fast length, to which the window has to be resampled.
+        The default is "exact".
+
+    Raises
+    ------
+    ValueError
+        Raised when mode is not accepted.
+
+    Returns
+    -------
+    Tuple[int, float]
+        Transform length and number of periods.
+
+    """
+    length = int(periods*periodSteps)
+    if mode == "exact" or isFastLength(length):
+        return length, periods
+    if mode == "trim":
+        for trimmed in range(int(periods), max(int(np.ceil(periods/2)), 1) - 1, -1):
+            if isFastLength(int(trimmed*periodSteps)):
+                return int(trimmed*periodSteps), float(trimmed)
+        return length, periods
+    if mode == "resample":
+        return nextFastLength(length), periods
+    raise ValueError("FFT length mode must be one of: " + ", ".join(LENGTH_MODES))
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""Frequency Package
+
+This script contains the FrequencyCache class which shares the drive
+frequency found by the opt_freq search of `analysis` between the voltage runs
+of one collection, all of which are driven at the same Ambrell coil frequency.
+
+The first run of a collection runs the full search and its best truncation
+length and figure of merit are kept. Later runs of the collection only test
+a few truncation lengths around that length. When their best figure of
+merit is worse than that of the full search by more than a tolerance, the
+run falls back to the full search, whose result replaces the kept one.
+
+This program is written with Python version 3.7.3 with Spyder IDE.
+
+This file is imported as a module and contains the following class:
+    * FrequencyCache - Frequencies of the collections of voltage runs
+
+"""
+import threading
+from typing import List, Tuple
+import analysis
+from fftbackend import FFTBackend
+
+class FrequencyCache(object):
+    """
+    Frequencies of the collections of voltage runs, keyed by the date-time
+    and collection kind returned by the getRunGroup method of the Reader
+    class in `tools`. The cache can be used by several threads at once.
+
+    Attributes
+    ----------
+    fomTolerance : float
+        Factor by which the figure of merit of a seeded search may exceed
+        that of the full search of its collection.
+    searchRange : int
+        Number of points tested on either side of the kept truncation length.
+    hits : int
+        Number of runs whose frequency was found by a seeded search.
+    misses : int
+        Number of runs which ran the full search.
+    """
+
+    def __init__(self, fomTolerance: float = 2.0, searchRange: int = 16):
+        """
+        Parameters
+        ----------
+        fomTolerance : float, optional
+            Factor by which the figure of merit of a seeded search may exceed
+            that of the full search. The default is 2.0.
+        searchRange : int, optional
+            Number of points tested on either side of the kept truncation
+            length, in steps of 4. The default is 16.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.fomTolerance = fomTolerance
+        self.searchRange = searchRange
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, int]) -> Tuple[float, int, float]:
+        """
+        Returns the frequency, truncation length and figure of merit of the
+        full search of a collection, or None when none was run.
+        """
+        with self._lock:
+            return self._entries.get(key)
+
+    def search(self, key: Tuple[str, int], H: List[float], timestep: float, fft_backend: FFTBackend = None) -> float:
+        """
+        Returns the frequency of a voltage run of a collection, see opt_freq in `analysis`.
+
+        Parameters
+        ----------
+        key : Tuple[str, int]
+            Date-time and collection kind of the run.
+        H : List[float]
+            H-Coil voltages of the run.
+        timestep : float
+            Time between voltages.
+        fft_backend : FFTBackend, optional
+            Backend of the Fourier transforms. The default is None, which uses `np.fft`.
+
+        Returns
+        -------
+        float
+            Frequency of the run.
+
+        """
+        total_points = len(H)
+        seed = self.get(key)
+        if seed is not None and seed[1] <= total_points:
+            frequency, length, fom = analysis.opt_freq_search(H, total_points, timestep, seed[0], fft_backend,
+                                                              center=seed[1], search_range=self.searchRange, powersof2=(4,))
+            if length is not None and fom <= self.fomTolerance*seed[2]:
+                with self._lock:
+                    self.hits += 1
+                return frequency
+        guess_freq = analysis.peak_freq(H, timestep, fft_backend)
+        frequency, length, fom = analysis.opt_freq_search(H, total_points, timestep, guess_freq, fft_backend)
+        with self._lock:
+            self.misses += 1
+            if length is not None:
+                self._entries[key] = (frequency, length, fom)
+        return frequency
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
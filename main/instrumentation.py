@@ -0,0 +1,667 @@
+# -*- coding: utf-8 -*-
+"""Instrumentation Package
+
+This script contains classes which record the wall time, CPU time and bytes
+processed by each stage of the analysis program, per voltage run.
+
+Stages are recorded either as blocks:
+    with instrumentation.stage("writeData"):
+        writer.writeData()
+or as consecutive laps of straight-line code:
+    stopwatch = instrumentation.stopwatch(runNum, nbytes)
+    ...
+    stopwatch.lap("fft")
+
+A disabled Instrumentation object hands out shared objects which do nothing,
+so instrumented code runs at full speed when instrumentation is turned off.
+
+In memory mode, `tracemalloc` additionally measures the peak and retained
+Python memory of every stage and the resident set size (RSS) of the process
+is sampled at its end. Runs whose peak memory per input byte is abnormally
+high compared to the other runs are flagged. `tracemalloc` slows the program
+down, so memory mode is meant for investigations. Stages should not be
+nested in memory mode, since an inner stage resets the peak of the outer one.
+
+A Profiler object runs chosen stages under `cProfile` and writes a `.prof`
+file and a text summary of the most expensive functions for each of them.
+Profiles of several programs, e.g. the workers of a batch, can be merged
+with mergeProfiles.
+
+This program is written with Python version 3.7.3 with Spyder IDE.
+
+This file is imported as a module and contains the following classes:
+    * Instrumentation - Records timing and throughput of program stages
+    * Stopwatch - Records consecutive stages of one voltage run
+    * Profiler - Runs chosen stages under `cProfile`
+
+It provides the following function:
+    * mergeProfiles - Merges `.prof` files into one
+
+It provides the following object:
+    * NULL_INSTRUMENTATION - Disabled Instrumentation object
+
+"""
+import cProfile
+import json
+import os
+import pstats
+import statistics
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+_tracingLock = threading.Lock()
+_profileLock = threading.Lock()
+_tracingUsers = 0
+_tracingOwned = False
+
+def _startTracing() -> None:
+    """
+    Starts `tracemalloc` unless it already runs. Calls are counted so that
+    several Instrumentation objects can trace at once.
+    """
+    global _tracingUsers, _tracingOwned
+    with _tracingLock:
+        if _tracingUsers == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracingOwned = True
+        _tracingUsers += 1
+
+def _stopTracing() -> None:
+    """
+    Stops `tracemalloc` when the last user stops and it was started by _startTracing.
+    """
+    global _tracingUsers, _tracingOwned
+    with _tracingLock:
+        _tracingUsers -= 1
+        if _tracingUsers == 0 and _tracingOwned:
+            tracemalloc.stop()
+            _tracingOwned = False
+
+def _rss() -> int:
+    """
+    Returns the resident set size of the process in bytes, or its peak where
+    the current value is not available, or 0 when neither is.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        import sys
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == "darwin" else maxrss * 1024
+    except (ImportError, OSError):
+        return 0
+
+def _memoryMark() -> int:
+    """
+    Resets the traced peak and returns the traced memory in bytes.
+    """
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+    return tracemalloc.get_traced_memory()[0]
+
+def _memorySince(mark: int) -> Dict[str, int]:
+    """
+    Returns the peak and retained traced memory since a mark and the current RSS.
+    """
+    current, peak = tracemalloc.get_traced_memory()
+    return {"PEAK": max(peak - mark, 0), "RETAINED": current - mark, "RSS": _rss()}
+
+class Stopwatch(object):
+    """
+    Records consecutive stages of one voltage run. Each lap is the stage
+    that ran since the previous lap or since the stopwatch was created.
+
+    Attributes
+    ----------
+    run : Any
+        Voltage run the stages belong to.
+    nbytes : int
+        Bytes processed by each stage unless a lap states otherwise.
+    """
+
+    def __init__(self, instrumentation: 'Instrumentation', run: Any = None, nbytes: int = 0):
+        """
+        Parameters
+        ----------
+        instrumentation : Instrumentation
+            Instrumentation object which records the laps.
+        run : Any, optional
+            Voltage run the stages belong to. The default is None.
+        nbytes : int, optional
+            Bytes processed by each stage. The default is 0.
+
+        Returns
+        -------
+        None.
+
+        """
+        self._instrumentation = instrumentation
+        self.run = run
+        self.nbytes = nbytes
+        self._memory = _memoryMark() if instrumentation.memory else None
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+
+    def lap(self, name: str, nbytes: int = None) -> None:
+        """
+        Records the stage that ran since the previous lap.
+
+        Parameters
+        ----------
+        name : str
+            Name of stage.
+        nbytes : int, optional
+            Bytes processed by stage. The default is None, which uses the
+            bytes of the stopwatch.
+
+        Returns
+        -------
+        None.
+
+        """
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        memory = None if self._memory is None else _memorySince(self._memory)
+        self._instrumentation.record(name, wall - self._wall, cpu - self._cpu, self.nbytes if nbytes is None else nbytes,
+                                     self.run, memory)
+        if self._memory is not None:
+            self._memory = _memoryMark()
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+
+
+class _Stage(object):
+    """
+    Context manager which records one block as a stage. Its nbytes attribute
+    can be set within the block.
+    """
+
+    def __init__(self, instrumentation: 'Instrumentation', name: str, run: Any, nbytes: int):
+        self._instrumentation = instrumentation
+        self._name = name
+        self.run = run
+        self.nbytes = nbytes
+
+    def __enter__(self) -> '_Stage':
+        self._memory = _memoryMark() if self._instrumentation.memory else None
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        memory = None if self._memory is None else _memorySince(self._memory)
+        self._instrumentation.record(self._name, wall, cpu, self.nbytes, self.run, memory)
+        return False
+
+
+class _NullStage(object):
+    """
+    Context manager and stopwatch which record nothing.
+    """
+
+    run = None
+    nbytes = 0
+
+    def __enter__(self) -> '_NullStage':
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        return False
+
+    def lap(self, name: str, nbytes: int = None) -> None:
+        pass
+
+_NULL_STAGE = _NullStage()
+
+
+class Instrumentation(object):
+    """
+    Records the wall time, CPU time and bytes processed by each stage of the
+    analysis program, per voltage run.
+
+    CPU time is measured for the calling thread, so stages of programs
+    running in parallel threads do not count each other's work.
+
+    `tracemalloc` traces every thread, so in memory mode the memory of
+    stages running at the same time in parallel threads adds up.
+
+    Attributes
+    ----------
+    enabled : bool
+        Stages are only recorded when True.
+    memory : bool
+        Memory of stages is recorded when True.
+    memoryThreshold : float
+        A run is flagged when its peak memory per input byte exceeds the
+        median of all runs by this factor.
+    records : List[Dict[str, Any]]
+        Recorded stages in order, with keys "STAGE", "RUN", "WALL", "CPU" and
+        "BYTES", and "PEAK", "RETAINED" and "RSS" in memory mode.
+    """
+
+    def __init__(self, enabled: bool = True, memory: bool = False, memoryThreshold: float = 2.0):
+        """
+        Parameters
+        ----------
+        enabled : bool, optional
+            Stages are only recorded when True. The default is True.
+        memory : bool, optional
+            Records the memory of stages when True, which also enables the
+            object. `tracemalloc` runs until close is called. The default is False.
+        memoryThreshold : float, optional
+            Factor over the median peak memory per input byte above which a
+            run is flagged. The default is 2.0.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.enabled = enabled or memory
+        self.memory = memory
+        self.memoryThreshold = memoryThreshold
+        self.records = []
+        self._lock = threading.Lock()
+        if memory:
+            _startTracing()
+    
+    def close(self) -> None:
+        """
+        Stops `tracemalloc` in memory mode. Memory is not recorded afterwards.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.memory:
+            self.memory = False
+            _stopTracing()
+
+    def record(self, name: str, wall: float, cpu: float, nbytes: int = 0, run: Any = None,
+               memory: Dict[str, int] = None) -> None:
+        """
+        Records a stage measured by the caller.
+
+        Parameters
+        ----------
+        name : str
+            Name of stage.
+        wall : float
+            Wall time of stage in seconds.
+        cpu : float
+            CPU time of stage in seconds.
+        nbytes : int, optional
+            Bytes processed by stage. The default is 0.
+        run : Any, optional
+            Voltage run the stage belongs to. The default is None.
+        memory : Dict[str, int], optional
+            "PEAK", "RETAINED" and "RSS" memory of stage in bytes. The default is None.
+
+        Returns
+        -------
+        None.
+
+        """
+        if not self.enabled:
+            return
+        record = {"STAGE": name, "RUN": run, "WALL": wall, "CPU": cpu, "BYTES": int(nbytes)}
+        if memory is not None:
+            record.update(memory)
+        with self._lock:
+            self.records.append(record)
+
+    def stage(self, name: str, run: Any = None, nbytes: int = 0) -> Any:
+        """
+        Returns a context manager which records its block as a stage.
+
+        Parameters
+        ----------
+        name : str
+            Name of stage.
+        run : Any, optional
+            Voltage run the stage belongs to. The default is None.
+        nbytes : int, optional
+            Bytes processed by stage. The default is 0.
+
+        Returns
+        -------
+        Any
+            Context manager.
+
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, run, nbytes)
+
+    def stopwatch(self, run: Any = None, nbytes: int = 0) -> Stopwatch:
+        """
+        Returns a Stopwatch object which records consecutive stages of a voltage run.
+
+        Parameters
+        ----------
+        run : Any, optional
+            Voltage run the stages belong to. The default is None.
+        nbytes : int, optional
+            Bytes processed by each stage. The default is 0.
+
+        Returns
+        -------
+        Stopwatch
+            Stopwatch started now.
+
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return Stopwatch(self, run, nbytes)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns the totals of each stage.
+
+        Returns
+        -------
+        Dict[str, Dict[str, float]]
+            Totals of each stage in order of first record, with keys "COUNT",
+            "WALL", "CPU", "BYTES" and "MB_PER_S" (bytes per wall time). When
+            memory was recorded, "PEAK" (largest peak), "RETAINED" (sum) and
+            "RSS" (largest) are added.
+
+        """
+        stages = {}
+        with self._lock:
+            records = list(self.records)
+        for record in records:
+            totals = stages.setdefault(record["STAGE"], {"COUNT": 0, "WALL": 0.0, "CPU": 0.0, "BYTES": 0})
+            totals["COUNT"] += 1
+            totals["WALL"] += record["WALL"]
+            totals["CPU"] += record["CPU"]
+            totals["BYTES"] += record["BYTES"]
+            if "PEAK" in record:
+                totals["PEAK"] = max(totals.get("PEAK", 0), record["PEAK"])
+                totals["RETAINED"] = totals.get("RETAINED", 0) + record["RETAINED"]
+                totals["RSS"] = max(totals.get("RSS", 0), record["RSS"])
+        for totals in stages.values():
+            totals["MB_PER_S"] = totals["BYTES"] / totals["WALL"] / 1e6 if totals["WALL"] > 0 else 0.0
+        return stages
+
+    def runs(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns the wall time of each stage of each voltage run.
+
+        Returns
+        -------
+        Dict[str, Dict[str, float]]
+            Wall time of each stage keyed by voltage run. Stages which do not
+            belong to a voltage run are left out.
+
+        """
+        runs = {}
+        with self._lock:
+            records = list(self.records)
+        for record in records:
+            if record["RUN"] is None:
+                continue
+            stages = runs.setdefault(str(record["RUN"]), {})
+            stages[record["STAGE"]] = stages.get(record["STAGE"], 0.0) + record["WALL"]
+        return runs
+
+    def memoryRuns(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns the peak memory of each voltage run and flags abnormal runs.
+        
+        The peak memory of a run is the largest peak of its stages. It is
+        divided by the bytes of the run, which are proportional to its number
+        of samples, so runs of different lengths can be compared.
+
+        Returns
+        -------
+        Dict[str, Dict[str, float]]
+            Memory of each voltage run, with keys "PEAK", "BYTES",
+            "PEAK_PER_BYTE" and "ABNORMAL". Empty when no memory was recorded.
+
+        """
+        runs = {}
+        with self._lock:
+            records = list(self.records)
+        for record in records:
+            if record["RUN"] is None or "PEAK" not in record:
+                continue
+            run = runs.setdefault(str(record["RUN"]), {"PEAK": 0, "BYTES": 0})
+            run["PEAK"] = max(run["PEAK"], record["PEAK"])
+            run["BYTES"] = max(run["BYTES"], record["BYTES"])
+        for run in runs.values():
+            run["PEAK_PER_BYTE"] = run["PEAK"] / run["BYTES"] if run["BYTES"] > 0 else 0.0
+        ratios = [run["PEAK_PER_BYTE"] for run in runs.values() if run["BYTES"] > 0]
+        median = statistics.median(ratios) if len(ratios) > 0 else 0.0
+        for run in runs.values():
+            run["ABNORMAL"] = len(ratios) >= 3 and run["PEAK_PER_BYTE"] > self.memoryThreshold * median
+        return runs
+
+    def abnormalRuns(self) -> List[str]:
+        """
+        Returns the voltage runs whose peak memory per input byte exceeds the
+        median of all runs by more than memoryThreshold. At least three runs
+        are needed to flag any.
+
+        Returns
+        -------
+        List[str]
+            Flagged voltage runs.
+
+        """
+        return [run for run, memory in self.memoryRuns().items() if memory["ABNORMAL"]]
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Returns every recorded stage with its totals.
+
+        Returns
+        -------
+        Dict[str, Any]
+            Report with keys "STAGES" (see summary), "RUNS" (see runs) and "RECORDS",
+            and "MEMORY_RUNS" (see memoryRuns) and "ABNORMAL_RUNS" when memory was recorded.
+
+        """
+        with self._lock:
+            records = [dict(record) for record in self.records]
+        for record in records:
+            if record["RUN"] is not None:
+                record["RUN"] = str(record["RUN"])
+        report = {"STAGES": self.summary(), "RUNS": self.runs(), "RECORDS": records}
+        if any("PEAK" in record for record in records):
+            report["MEMORY_RUNS"] = self.memoryRuns()
+            report["ABNORMAL_RUNS"] = [run for run, memory in report["MEMORY_RUNS"].items() if memory["ABNORMAL"]]
+        return report
+
+    def writeReport(self, path: str) -> None:
+        """
+        Writes the report as a JSON file.
+
+        Parameters
+        ----------
+        path : str
+            File path of JSON file.
+
+        Returns
+        -------
+        None.
+
+        """
+        with open(path, 'w') as reportFile:
+            json.dump(self.report(), reportFile, indent=2)
+
+NULL_INSTRUMENTATION = Instrumentation(enabled=False)
+
+
+def _writeProfileSummary(stats: pstats.Stats, path: str, top: int) -> None:
+    """
+    Writes the functions with the largest cumulative time of a profile as text.
+    """
+    with open(path, 'w') as summaryFile:
+        stats.stream = summaryFile
+        stats.sort_stats("cumulative").print_stats(top)
+
+def mergeProfiles(paths: List[str], outPath: str, top: int = 30) -> str:
+    """
+    Merges `.prof` files into one and writes its text summary next to it.
+
+    Parameters
+    ----------
+    paths : List[str]
+        File paths of `.prof` files.
+    outPath : str
+        File path of merged `.prof` file.
+    top : int, optional
+        Number of functions listed in the text summary. The default is 30.
+
+    Returns
+    -------
+    str
+        File path of merged `.prof` file.
+
+    """
+    stats = pstats.Stats(*paths)
+    stats.dump_stats(outPath)
+    _writeProfileSummary(stats, os.path.splitext(outPath)[0] + ".txt", top)
+    return outPath
+
+
+class Profiler(object):
+    """
+    Runs chosen stages of the analysis program under `cProfile`.
+    
+    A stage run more than once adds to the same profile. `cProfile` only
+    profiles the thread which runs the stage, so each worker of a parallel
+    batch needs its own Profiler object. Python 3.12 and later allow only
+    one active profiler per process, so profiled stages of all Profiler
+    objects run one at a time, while unprofiled stages still run in parallel.
+
+    Attributes
+    ----------
+    stages : List[str]
+        Stages to be profiled. Other stages run unprofiled.
+    top : int
+        Number of functions listed in text summaries.
+    errors : List[str]
+        Stages which could not be profiled and the reason, e.g. another
+        profiler of the process, such as `python -m cProfile`, being active.
+    """
+
+    STAGES = ("read", "analyze", "write", "plot")
+    """
+    Tuple[str]: Stages of the analysis program which can be profiled.
+    """
+
+    def __init__(self, stages: List[str], top: int = 30):
+        """
+        Parameters
+        ----------
+        stages : List[str]
+            Stages to be profiled, out of STAGES.
+        top : int, optional
+            Number of functions listed in text summaries. The default is 30.
+
+        Raises
+        ------
+        ValueError
+            Raised when a stage is not one of STAGES.
+
+        Returns
+        -------
+        None.
+
+        """
+        for stage in stages:
+            if stage not in self.STAGES:
+                raise ValueError("Stage " + repr(stage) + " cannot be profiled. Accepted stages: " + ", ".join(self.STAGES))
+        self.stages = list(stages)
+        self.top = top
+        self.errors = []
+        self._profiles = {}
+
+    def stage(self, name: str) -> Any:
+        """
+        Returns a context manager which profiles its block when the stage is chosen.
+
+        Parameters
+        ----------
+        name : str
+            Name of stage.
+
+        Returns
+        -------
+        Any
+            Context manager.
+
+        """
+        if name not in self.stages:
+            return _NULL_STAGE
+        return _ProfiledStage(self, name, self._profiles.setdefault(name, cProfile.Profile()))
+
+    def dump(self, pathPrefix: str) -> Dict[str, str]:
+        """
+        Writes a `.prof` file and a text summary for every profiled stage.
+
+        Parameters
+        ----------
+        pathPrefix : str
+            Beginning of file paths, followed by the stage name and extension.
+
+        Returns
+        -------
+        Dict[str, str]
+            File path of `.prof` file of each profiled stage.
+
+        """
+        paths = {}
+        for name, profile in self._profiles.items():
+            path = pathPrefix + name + ".prof"
+            stats = pstats.Stats(profile)
+            stats.dump_stats(path)
+            _writeProfileSummary(stats, pathPrefix + name + ".txt", self.top)
+            paths[name] = path
+        return paths
+
+
+class _ProfiledStage(object):
+    """
+    Context manager which profiles one block, one profiled block of the
+    process at a time.
+    """
+
+    def __init__(self, profiler: Profiler, name: str, profile: cProfile.Profile):
+        self._profiler = profiler
+        self._name = name
+        self._profile = profile
+
+    def __enter__(self) -> '_ProfiledStage':
+        _profileLock.acquire()
+        try:
+            self._profile.enable()
+            self._enabled = True
+        except ValueError as error:
+            # Python 3.12 and later refuse a second profiler, e.g. one profiling the whole program
+            self._profiler.errors.append(self._name + ": " + str(error))
+            print("Stage " + self._name + " is not profiled: " + str(error))
+            self._enabled = False
+        except BaseException:
+            _profileLock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        try:
+            if self._enabled:
+                self._profile.disable()
+        finally:
+            _profileLock.release()
+        return False
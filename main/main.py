@@ -9,17 +9,48 @@ This script requires that `tools` and `analysis` packages
 are installed within the Python environment. 
 
 This program is written with Python version 3.7.3 with Spyder IDE and
-can be run on its own on the command line.
+can be run on its own on the command line:
+    python main.py [CONFIG ...] [--out-dir DIR] [--workers N] [--no-plots] [--show-plots] [--validate] [--instrument] [--memory] [--profile STAGE ...] [--progress] [--progress-log FILE]
+When no configuration file is given, a `PySimpleGUI` window asks for one.
+`PySimpleGUI`, `matplotlib` and `scipy` are only imported when they are used,
+so headless runs do not pay for their import time.
 
 This file can be imported as a module and contains the following class:
     * Main - Central class which runs the analysis program.
 
-"""
+It provides the following functions:
+    * main - Command line entry point of the analysis program
+    * runBatch - Runs many configuration files sharing loaded datasets
+    * batchDescriptions - Makes the output files of a batch unique
+    * printBatchSummary - Prints the outcome of each configuration file of a batch
+    * mergeBatchProfiles - Merges the profiles of a batch per stage
+    * selectConfigFile - Asks for a configuration file in a pop-up window
 
+"""
 
-import PySimpleGUI as sg
+import argparse
+import itertools
+import os
+import sys
+import threading
+import time
+import traceback
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+import pandas as pd
 import analysis
-from tools import Writer, Reader, ReaderError
+import calibration
+from calibration import CalibrationStore
+from tools import Writer, Reader, ReaderError, DatasetCache, addDirectory, getBool
+from instrumentation import Instrumentation, NULL_INSTRUMENTATION, Profiler, mergeProfiles
+from progress import ProgressReporter, NULL_PROGRESS, TerminalSink, JsonLinesSink, GuiSink
+from reference import EmptyReference, EmptyReferenceLibrary
+from frequency import FrequencyCache
+import transport
+from transport import Transport
+
+_plotLock = threading.Lock()
 
 class Main(object):
     """
@@ -39,7 +70,10 @@ class Main(object):
             are read from.
         * DATA_EMPTY:
             File-path of the voltage run dataset considered as the empty field
-            voltage reading. Ought to be a .csv file.
+            voltage reading. Ought to be a .csv file. It may instead be a
+            directory of empty field voltage datasets recorded at several drive
+            amplitudes, in which case each voltage run is corrected with the
+            empty field dataset of the closest V_H_MAX.
         * DATA_ACTUAL:
             File-path containing all voltage run dataset to be analyzed i.e
             non-empty field voltage reading.
@@ -128,7 +162,101 @@ class Main(object):
         * READ_TIME:
             Parameter which states if time data recording should
             be considered during analysis or not. Value is either TRUE or FALSE.
-    
+        * INSTRUMENT:
+            Optional parameter which states if the wall time, CPU time and bytes
+            processed by each stage of the program are recorded. The report is
+            written into OUT_DIR/DATE/TIME as DATE + TIME + DESCRIPTION +
+            "_instrumentation.json". Value is either TRUE or FALSE, FALSE when
+            not defined.
+        * MEMORY:
+            Optional parameter which states if the peak and retained memory of
+            each stage of the program are recorded as well, using `tracemalloc`.
+            Runs whose peak memory is abnormal for their number of samples
+            are listed in the report. Recording memory slows the program down.
+            `tracemalloc` measures the whole process, so MEMORY is turned off,
+            keeping INSTRUMENT, for configuration files analyzed in parallel
+            by runBatch. Value is either TRUE or FALSE, FALSE when not defined.
+        * PROFILE:
+            Optional list of stages of the program which are run under
+            `cProfile`. Accepted PROFILE values are of nature:
+                STAGE | STAGE | ... | STAGE
+            where STAGE is "read", "analyze", "write" or "plot". A .prof file
+            and a text summary of the most expensive functions are written per
+            stage into OUT_DIR/DATE/TIME/Profile.
+        * WINDOW_PERIODS:
+            Optional length in periods of the sliding windows in which every
+            voltage run is analyzed from BEGIN_TIME to its end, giving
+            M_OVER_H_REAL, M_OVER_H_IMAG, M_OVER_H_G, PM_MINUS_PH_G, H_MAX,
+            M_MAX, HC and INTEGRAL as a function of time. One table per run is
+            written into OUT_DIR/DATE/TIME/MHTimeSeries. No sliding-window
+            analysis is done when not defined.
+        * WINDOW_HOP:
+            Optional distance in periods between the starts of consecutive
+            sliding windows. The default is 1 when not defined.
+        * ENGINE:
+            Optional spectrum engine of the analysis function. "fft" (default)
+            transforms the whole analyzed window. "sparse" evaluates only the
+            DC, fundamental and odd harmonic bins below CUTOFF_FREQ, the only
+            bins kept by the G-Factor correction, which is faster for long
+            windows. M_SPECTRUM_REAL and M_SPECTRUM_IMAG are then 0 at every
+            other bin.
+        * FFT_BACKEND:
+            Optional library of the Fourier transforms of the analysis, "numpy"
+            (default) or "scipy". Only "scipy" uses FFT_WORKERS threads.
+        * FFT_WORKERS:
+            Optional number of threads of each Fourier transform of the "scipy"
+            backend. Negative values count back from the number of CPUs, e.g.
+            -1 uses all of them. The default is 1.
+        * FFT_LENGTH_MODE:
+            Optional choice of the length of the analyzed window. "exact"
+            (default) analyzes NUM_PERIOD periods. "trim" analyzes fewer whole
+            periods, at least half of them, when their length is faster to
+            transform. "resample" interpolates the NUM_PERIOD periods onto the
+            next length which is fast to transform. Either length is only used
+            when its transform is measured to be faster, otherwise the
+            NUM_PERIOD periods are analyzed as with "exact". The chosen length and the
+            measured speedup of its transform are the properties FFT_LENGTH and
+            FFT_SPEEDUP of each run.
+        * CALIBRATION_DIR:
+            Optional directory of empty field calibration artifacts. When
+            defined, the analysis of each DATA_EMPTY dataset is saved there and
+            later runs with the same dataset and G-Factor file contents and
+            analysis parameters load it instead of analyzing it again.
+        * PRECISION:
+            Optional choice of the floating point precision of the analysis.
+            "double" (default) or "single". With "single" the voltages are
+            held and analyzed in float32, which halves the memory of large
+            sweeps. The first voltage run is then also analyzed in double
+            precision and the errors of M_OVER_H_G, HC and INTEGRAL are
+            printed and written to DATE + TIME + DESCRIPTION + _precision.csv.
+        * FREQUENCY_CACHE:
+            Optional, FALSE when not defined. When TRUE and KNOWN_FREQ is 0,
+            the frequency search of the first voltage run of each collection
+            (date-time and CollectionKind of the file name) seeds a narrow
+            search of the later runs of the collection. A run falls back to
+            the full search when the narrow search fits its frequency worse.
+        * DECIMATE:
+            Optional, FALSE when not defined. When TRUE, the voltages are
+            decimated by the largest integer factor which keeps their Nyquist
+            frequency 1.25 times above CUTOFF_FREQ and divides the samples of
+            a drive period, after an anti-alias filter, before they are
+            analyzed. The factor is the property DECIMATION of each run. The
+            first voltage run is then also analyzed without decimation and
+            the speedup and the errors of M_OVER_H_G, PM_MINUS_PH_G, HC and
+            INTEGRAL are printed and written to
+            DATE + TIME + DESCRIPTION + _decimation.csv. HC is limited by
+            the time resolution of the decimated voltages and differs by
+            up to about 3e-3 at 40 samples per period.
+        * PROCESSES:
+            Optional number of worker processes analyzing the voltage runs,
+            1 (default) analyzes them in this process. The voltage runs,
+            G-Factor datasets and empty field spectra are handed to the
+            workers in shared memory, see the `transport` module, and the
+            shared blocks are removed when the analysis ends or fails. Worker
+            processes do not use FREQUENCY_CACHE and their per-run stages
+            are not recorded by INSTRUMENT. Sliding-window analysis stays in
+            this process.
+
     The configuration file's parameters for plotting are listed below:
         * H_MIN:
             Minimum value of H_MAX property of analyzed voltage datasets to be
@@ -145,6 +273,7 @@ class Main(object):
                 * "M_OVER_H0"
                 * "OSC_TIME"
                 * "TEMPERATURE"
+                * "CAPTURE_TEMPERATURE"
                 * "H_MAX"
                 * "M_MAX"
                 * "HC"
@@ -152,6 +281,9 @@ class Main(object):
                 * "DMDH_OVER_M_MAX"
                 * "INTEGRAL"
                 * "RUN_NUM"
+                * "FFT_LENGTH"
+                * "FFT_SPEEDUP"
+                * "DECIMATION"
             These accepted values are considered property values of each
             analyzed voltage dataset.
         * PLOT:
@@ -197,6 +329,7 @@ class Main(object):
                 * "M_OVER_H0"
                 * "OSC_TIME"
                 * "TEMPERATURE"
+                * "CAPTURE_TEMPERATURE"
                 * "H_MAX"
                 * "M_MAX"
                 * "HC"
@@ -204,6 +337,9 @@ class Main(object):
                 * "DMDH_OVER_M_MAX"
                 * "INTEGRAL"
                 * "RUN_NUM"
+                * "FFT_LENGTH"
+                * "FFT_SPEEDUP"
+                * "DECIMATION"
                 
         * PROPERTY_PLOT_LABEL:
             Labels of property values to be plotted on combined graph.
@@ -231,21 +367,59 @@ class Main(object):
     ----------
     reader : Reader
         Reader object that extracts parameters from configuration file.
+    config : AnalysisConfig
+        Analysis parameters parsed once by the Reader object.
     dict : Dict[str, Tuple[pd.DataFrame, Dict[str, float]]]
         Dictionary object that stores the analysis output data for each
         analyzed voltage dataset output from fundmagphase function in `analysis`. 
+    timeSeries : Dict[str, pd.DataFrame]
+        Output of fundmagphase_windows function in `analysis` for each key of
+        dict except the empty field datasets. It is empty unless WINDOW_PERIODS is defined.
     writer: Writer
         Writer object that writes output data and plot data.
+    instrumentation : Instrumentation
+        Records the stages of the program. It records nothing unless INSTRUMENT
+        is TRUE or an enabled Instrumentation object is given.
+    profiler : Profiler
+        Runs the stages listed by PROFILE under `cProfile`.
+    profileFiles : Dict[str, str]
+        File path of the .prof file of each stage profiled by the last run.
+    progress : ProgressReporter
+        Reports the progress of reading, analysis and writing.
+    emptyReferences : EmptyReferenceLibrary
+        Analyses of the empty field voltage datasets, one of which is used by
+        the analysis of each actual voltage run. It is None unless WITH_EMPTY is TRUE.
+    frequencyCache : FrequencyCache
+        Frequencies of the collections of voltage runs. It is None unless
+        FREQUENCY_CACHE is TRUE.
+    precisionReport : pd.DataFrame
+        Output of precision_report function in `analysis` for the first
+        voltage run. It is None unless PRECISION is SINGLE.
+    decimationReport : pd.DataFrame
+        Output of decimation_report function in `analysis` for the first
+        voltage run. It is None unless DECIMATE is TRUE.
     
     """
     
-    def __init__(self, configDir: str):
+    def __init__(self, configDir: str, overrides: Dict[str, str] = None, cache: DatasetCache = None,
+                 instrumentation: Instrumentation = None, progress: ProgressReporter = None):
         """
 
         Parameters
         ----------
         configDir : str
             File path of configuration text file.
+        overrides : Dict[str, str], optional
+            Property values which replace those of the configuration file.
+            The default is None.
+        cache : DatasetCache, optional
+            Cache of datasets shared with other Main objects. The default is None.
+        instrumentation : Instrumentation, optional
+            Records the stages of the program. The default is None, which
+            records them only when INSTRUMENT or MEMORY is TRUE.
+        progress : ProgressReporter, optional
+            Reports the progress of reading, analysis and writing, e.g. to the
+            terminal. The default is None, which reports nothing.
 
         Returns
         -------
@@ -254,69 +428,445 @@ class Main(object):
         """
         print("Starting Main program")
         print("Reading config file for program inputs")
-        self.reader = Reader(configDir)
-        self.reader.writeConfigFile()
+        # Instrumentation and profiling have to be set up before datasets are
+        # loaded, so their properties are read ahead of the Reader object
+        properties = Reader.readProperties(configDir, overrides=overrides)
+        self.profiler = Profiler(Reader.getProfileStages(properties))
+        self.profileFiles = {}
+        self._ownsInstrumentation = instrumentation is None
+        if instrumentation is None:
+            if getBool(properties["MEMORY"]):
+                instrumentation = Instrumentation(memory=True)
+            elif getBool(properties["INSTRUMENT"]):
+                instrumentation = Instrumentation()
+            else:
+                instrumentation = NULL_INSTRUMENTATION
+        self.instrumentation = instrumentation
+        self.progress = NULL_PROGRESS if progress is None else progress
+        try:
+            with self.instrumentation.stage("read") as stage, self.profiler.stage("read"):
+                self.reader = Reader(configDir, overrides=overrides, cache=cache, progress=self.progress)
+                self.config = self.reader.getAnalysisConfig()
+                if self.instrumentation.enabled:
+                    stage.nbytes = self._datasetBytes()
+            self.reader.writeConfigFile()
+        except Exception:
+            if self._ownsInstrumentation:
+                self.instrumentation.close()
+            raise
         print("Data successfully read from .txt configuration file")
         self.dict = {}
+        self.timeSeries = {}
+        self.emptyReferences = None
+        self.frequencyCache = FrequencyCache() if self.config.frequencyCache else None
+        self.precisionReport = None
+        self.decimationReport = None
+        self._pool = None
+        self._transport = None
+        self._pending = {}
         
-    def run(self) -> None:
+    def run(self, plot: bool = True) -> None:
         """
         Runs the analysis program.
 
+        Parameters
+        ----------
+        plot : bool, optional
+            Writes plots of analyzed data when True. The default is True.
+
         Returns
         -------
         None.
 
         """
-        if self.reader.get("WITH_EMPTY"):
-            self._withEmpty()
-        else:
-            self._withoutEmpty()
-        self.writer = Writer(self.reader, self.dict)
-        print("Writing data into OUT_DIR")
-        self.writer.writeData()
-        print("Running plot code")
-        self.writer.writePlots()
+        try:
+            with self.profiler.stage("analyze"):
+                self._startPool()
+                try:
+                    if self.config.withEmpty:
+                        self._withEmpty()
+                    else:
+                        self._withoutEmpty()
+                finally:
+                    self._stopPool()
+                if self.config.precision == "single":
+                    self._precisionReport()
+                if self.config.decimate:
+                    self._decimationReport()
+            self.writer = Writer(self.reader, self.dict)
+            print("Writing data into OUT_DIR")
+            analyzedBytes = 0
+            if self.instrumentation.enabled:
+                analyzedBytes = int(sum(value[0].memory_usage(index=False).sum() for value in self.dict.values()))
+            with self.instrumentation.stage("writeData", nbytes=analyzedBytes), self.profiler.stage("write"):
+                self.writer.writeData(self.progress)
+                if len(self.timeSeries) > 0:
+                    self.writer.writeTimeSeries(self.timeSeries, self.progress)
+            if plot:
+                print("Running plot code")
+                # matplotlib.pyplot is not thread-safe, plots of a parallel batch are written one at a time
+                with _plotLock:
+                    with self.instrumentation.stage("writePlots"), self.profiler.stage("plot"):
+                        self.writer.writePlots(self.progress)
+            if self.instrumentation.enabled:
+                self.instrumentation.writeReport(self._outputPath("_instrumentation.json"))
+                for run in self.instrumentation.abnormalRuns():
+                    print("Run {} used abnormally much memory for its number of samples".format(run))
+            if len(self.profiler.stages) > 0:
+                self.profileFiles = self.profiler.dump(self._outputPath("_", "Profile"))
+        finally:
+            # tracemalloc is stopped even when the analysis fails
+            if self._ownsInstrumentation:
+                self.instrumentation.close()
         print("Program sucessfully completed")
+    
+    def _outputPath(self, suffix: str, folder: str = None) -> str:
+        """
+        Returns the path of an output file next to the property file written by the Reader object.
+
+        Parameters
+        ----------
+        suffix : str
+            Ending of file name.
+        folder : str, optional
+            Folder within OUT_DIR/DATE/TIME holding the file. The default is None.
+
+        Returns
+        -------
+        str
+            OUT_DIR/DATE/TIME/[folder/]DATE + TIME + DESCRIPTION + suffix
+
+        """
+        directory = addDirectory(addDirectory(self.reader.get("OUT_DIR"), self.reader.get("DATE")), self.reader.get("TIME"))
+        if folder is not None:
+            directory = addDirectory(directory, folder)
+        return addDirectory(directory, self.reader.get("DATE") + self.reader.get("TIME") + self.reader.get("DESCRIPTION") + suffix)
+    
+    def _datasetBytes(self) -> int:
+        """
+        Returns the memory used by the voltage and G-Factor datasets read by the Reader object.
+
+        Returns
+        -------
+        int
+            Memory in bytes.
+
+        """
+        datasets = list(self.reader.get("DICT_DATAFRAME_ACTUAL").values())
+        datasets += [self.reader.get("M_G_FACTOR_DATAFRAME"), self.reader.get("H_G_FACTOR_DATAFRAME")]
+        if self.config.withEmpty:
+            # Empty field datasets are only read once analyzed, see _emptyAnalysis
+            empty = self.reader.get("DICT_DATAFRAME_EMPTY")
+            datasets += [empty[key] for key in empty if empty.isLoaded(key)]
+        return int(sum(df.memory_usage(index=False).sum() for df in datasets))
         
-    def _withoutEmpty(self) -> None:
+    def _runLookups(self) -> Dict[str, Tuple[float, float, float]]:
         """
-        Runs analysis program without an empty field voltage dataset.
+        Looks up the temperature, oscilloscope start time and capture window
+        temperature of every voltage run to be analyzed, one call per collection.
+
+        Returns
+        -------
+        Dict[str, Tuple[float, float, float]]
+            Temperature, relative oscilloscope start time and mean Temp-V-Time
+            temperature during capture of each voltage run.
+
+        """
+        keys = itertools.takewhile(lambda key: key.startswith("voltageDataScopeRun"),
+                                   self.reader.get("DICT_DATAFRAME_ACTUAL"))
+        groups = {}
+        for key in keys:
+            groups.setdefault(self.reader.getRunGroup(key), []).append(key)
+        lookups = {}
+        for (dateTime, collectionKind), groupKeys in groups.items():
+            runNums = [self.reader.getRunNum(key) for key in groupKeys]
+            temperatures = self.reader.getRunTemps(dateTime, collectionKind, runNums)
+            times = self.reader.getTimes(dateTime, collectionKind, runNums)
+            durations = []
+            for key in groupKeys:
+                timeSeries = self.reader.get("DICT_DATAFRAME_ACTUAL").get(key).iloc[:, 0]
+                durations.append(timeSeries.iloc[-1] - timeSeries.iloc[0])
+            captureTemperatures = self.reader.getCaptureTemps(dateTime, collectionKind, runNums, durations)
+            lookups.update(zip(groupKeys, zip(temperatures, times, captureTemperatures)))
+        return lookups
+        
+    def _precisionReport(self) -> None:
+        """
+        Analyzes the first voltage run in double and single precision, then
+        prints and writes the errors of single precision.
 
         Returns
         -------
         None.
 
         """
-        print("Running analysis without empty data")
-        for key in self.reader.get("DICT_DATAFRAME_ACTUAL"):
-            if not key.startswith("voltageDataScopeRun"):
-                return
-            self.dict[key + "_ACTUAL_LINEAR"] = analysis.fundmagphase(
+        if len(self.reader.get("DICT_DATAFRAME_ACTUAL")) == 0:
+            print("No voltage run for the single precision report")
+            return
+        key = next(iter(self.reader.get("DICT_DATAFRAME_ACTUAL")))
+        with self.instrumentation.stage("precisionReport"):
+            self.precisionReport = analysis.precision_report_config(
+                self.reader.get("DICT_DATAFRAME_ACTUAL").get(key),
+                self.reader.get("M_G_FACTOR_DATAFRAME"),
+                self.reader.get("H_G_FACTOR_DATAFRAME"),
+                self.config
+            )
+        print("Single precision errors of " + key + ":")
+        print(self.precisionReport.to_string())
+        self.precisionReport.to_csv(self._outputPath("_precision.csv"), index_label="PROPERTY")
+    
+    def _decimationReport(self) -> None:
+        """
+        Analyzes the first voltage run with and without decimation, then
+        prints and writes the speedup and errors of decimation.
+
+        Returns
+        -------
+        None.
+
+        """
+        if len(self.reader.get("DICT_DATAFRAME_ACTUAL")) == 0:
+            print("No voltage run for the decimation report")
+            return
+        key = next(iter(self.reader.get("DICT_DATAFRAME_ACTUAL")))
+        with self.instrumentation.stage("decimationReport"):
+            self.decimationReport = analysis.decimation_report_config(
                 self.reader.get("DICT_DATAFRAME_ACTUAL").get(key),
                 self.reader.get("M_G_FACTOR_DATAFRAME"),
                 self.reader.get("H_G_FACTOR_DATAFRAME"),
-                self.reader.get("CUTOFF_FREQ", Reader.asFloat),
-                self.reader.get("KNOWN_FREQ", Reader.asFloat),
-                self.reader.get("M_OVER_H_REAL_SUB", Reader.asFloat),
-                self.reader.get("M_OVER_H_IMAG_SUB", Reader.asFloat),
-                self.reader.get("M_OVER_H_CALIB", Reader.asFloat),
-                self.reader.get("PM_PH_DIFF_PHASE_ADJ", Reader.asFloat),
-                self.reader.get("M_OVER_H0_SUB", Reader.asFloat),
-                self.reader.get("H_PHASE_REAL_SUB", Reader.asFloat),
-                self.reader.get("H_PHASE_IMAG_SUB", Reader.asFloat),
-                self.reader.get("NUM_PERIOD", Reader.asFloat),
-                self.reader.get("BEGIN_TIME", Reader.asFloat),
-                self.reader.get("POLARITY", Reader.asFloat),
-                runNum = self.reader.getRunNum(key),
-                temperature=self.reader.getRunTemp(key),
-                time=self.reader.getTime(key, "oscilloscope")
+                self.config
             )
+        print("Decimation by {} of {} sped up its analysis {:.1f} times with errors:".format(
+            self.decimationReport.attrs["DECIMATION"], key, self.decimationReport.attrs["SPEEDUP"]))
+        print(self.decimationReport.to_string())
+        if not self.decimationReport["WITHIN_TOLERANCE"].all():
+            print("Decimation changed the analysis of " + key + " beyond tolerance")
+        self.decimationReport.to_csv(self._outputPath("_decimation.csv"), index_label="PROPERTY")
+    
+    def _emptyAnalysis(self, key: str) -> Tuple[pd.DataFrame, Dict[str, float]]:
+        """
+        Analyzes an empty field voltage dataset. When CALIBRATION_DIR is
+        defined, the analysis is loaded from its calibration artifact, which
+        is written by the first run with the same files and parameters.
+
+        Parameters
+        ----------
+        key : str
+            Key of dataset in DICT_DATAFRAME_EMPTY of the Reader object.
+
+        Returns
+        -------
+        Tuple[pd.DataFrame, Dict[str, float]]
+            Output of fundmagphase function in `analysis` for the empty field dataset.
+
+        """
+        try:
+            directory = str(self.reader.get("CALIBRATION_DIR"))
+        except ReaderError:
+            # CALIBRATION_DIR is optional and left empty when not defined
+            directory = ""
+        if len(directory) > 0:
+            store = CalibrationStore(directory)
+            files = [self.reader.get("DICT_FILE_EMPTY")[key]]
+            files += [os.path.join(self.reader.get("BASE_DIR"), self.reader.get(prop)) for prop in ["M_G_FACTOR_FILE", "H_G_FACTOR_FILE"]]
+            fingerprint = calibration.fingerprint(files, self.config, store.fileDigest)
+            analyzed = store.load(fingerprint)
+            if analyzed is not None:
+                print("Empty field calibration loaded from " + store.path(fingerprint))
+                return analyzed
+        analyzed = analysis.fundmagphase_config(
+            self.reader.get("DICT_DATAFRAME_EMPTY")[key],
+            self.reader.get("M_G_FACTOR_DATAFRAME"),
+            self.reader.get("H_G_FACTOR_DATAFRAME"),
+            self.config,
+            timer = self.instrumentation
+        )
+        if len(directory) > 0:
+            print("Empty field calibration saved to " + store.save(fingerprint, analyzed))
+        return analyzed
+    
+    @contextlib.contextmanager
+    def _analyzePhase(self) -> Any:
+        """
+        Runs the "analyze" phase of the progress report over the voltage runs
+        to be analyzed. When the phase ends without error, it waits for the
+        voltage runs queued to the worker processes.
+
+        Yields
+        ------
+        Any
+            Phase object of the ProgressReporter object.
+
+        """
+        total = sum(1 for key in itertools.takewhile(lambda key: key.startswith("voltageDataScopeRun"),
+                                                     self.reader.get("DICT_DATAFRAME_ACTUAL")))
+        with self.progress.phase("analyze", total, "runs", self.reader.get("DESCRIPTION")) as phase:
+            yield phase
+            self._collect(phase)
+    
+    def _startPool(self) -> None:
+        """
+        Starts the worker processes and their Transport object when PROCESSES is greater than 1.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.config.processes > 1:
+            print("Analyzing voltage runs in {} processes".format(self.config.processes))
+            self._transport = Transport()
+            self._pool = ProcessPoolExecutor(max_workers=self.config.processes)
+    
+    def _stopPool(self) -> None:
+        """
+        Stops the worker processes and removes the shared blocks of the
+        Transport object. Queued voltage runs are cancelled, so it also ends
+        an analysis interrupted by an error or by the user.
+
+        Returns
+        -------
+        None.
+
+        """
+        try:
+            if self._pool is not None:
+                if sys.version_info >= (3, 9):
+                    self._pool.shutdown(wait=True, cancel_futures=True)
+                else:
+                    # cancel_futures is new in Python 3.9
+                    for future, nbytes in self._pending.values():
+                        future.cancel()
+                    self._pool.shutdown(wait=True)
+        finally:
+            self._pool = None
+            self._pending = {}
+            if self._transport is not None:
+                self._transport.close()
+                self._transport = None
+    
+    def _analyze(self, key: str, df: pd.DataFrame, **kwargs: Any) -> bool:
+        """
+        Analyzes a voltage run with the fundmagphase_config function in
+        `analysis` and stores the output in dict. With worker processes the
+        run is queued instead, its datasets are shared with the Transport
+        object and its output is stored by the _collect method.
+
+        Parameters
+        ----------
+        key : str
+            Key of output in dict.
+        df : pd.DataFrame
+            Voltage run.
+        **kwargs : Any
+            Keyword arguments of fundmagphase_config function other than timer and frequency_cache.
+
+        Returns
+        -------
+        bool
+            True when the run was analyzed, False when it was queued.
+
+        """
+        args = (df, self.reader.get("M_G_FACTOR_DATAFRAME"), self.reader.get("H_G_FACTOR_DATAFRAME"), self.config)
+        if self._pool is None:
+            self.dict[key] = analysis.fundmagphase_config(*args, timer = self.instrumentation,
+                                                          frequency_cache = self.frequencyCache, **kwargs)
+            return True
+        # The placeholder keeps the outputs in the order of the voltage runs
+        self.dict[key] = None
+        self._pending[key] = (self._pool.submit(transport.runTask, "fundmagphase_config",
+                                                tuple(self._transport.share(arg) for arg in args),
+                                                {name: self._transport.share(value) for name, value in kwargs.items()}),
+                              df.shape[0]*df.shape[1]*8)
+        return False
+    
+    def _analyzeWindows(self, key: str, df: pd.DataFrame, **kwargs: Any) -> None:
+        """
+        Analyzes a voltage run in sliding windows with the
+        fundmagphase_windows_config function in `analysis` and stores the
+        output in timeSeries. A run too short for a single window is skipped
+        with a message, and the analysis of the other runs continues.
+
+        Parameters
+        ----------
+        key : str
+            Key of output in timeSeries.
+        df : pd.DataFrame
+            Voltage run.
+        **kwargs : Any
+            Keyword arguments of fundmagphase_windows_config function other than timer and frequency_cache.
+
+        Returns
+        -------
+        None.
+
+        """
+        try:
+            self.timeSeries[key] = analysis.fundmagphase_windows_config(
+                df, self.reader.get("M_G_FACTOR_DATAFRAME"), self.reader.get("H_G_FACTOR_DATAFRAME"), self.config,
+                timer = self.instrumentation, frequency_cache = self.frequencyCache, **kwargs)
+        except ValueError as error:
+            print("Sliding windows of " + key + " skipped: " + str(error))
+    
+    def _collect(self, phase: Any) -> None:
+        """
+        Stores the output of the voltage runs queued to the worker processes in dict.
+
+        Parameters
+        ----------
+        phase : Any
+            Phase object advanced by each collected run.
+
+        Returns
+        -------
+        None.
+
+        """
+        for key, (future, nbytes) in list(self._pending.items()):
+            self.dict[key] = future.result()
+            del self._pending[key]
+            phase.advance(1, nbytes)
+        
+    def _withoutEmpty(self) -> None:
+        """
+        Runs analysis program without an empty field voltage dataset.
+
+        Returns
+        -------
+        None.
+
+        """
+        print("Running analysis without empty data")
+        lookups = self._runLookups()
+        with self._analyzePhase() as phase:
+            for key in self.reader.get("DICT_DATAFRAME_ACTUAL"):
+                if not key.startswith("voltageDataScopeRun"):
+                    return
+                df = self.reader.get("DICT_DATAFRAME_ACTUAL").get(key)
+                analyzed = self._analyze(
+                    key + "_ACTUAL_LINEAR",
+                    df,
+                    runNum = self.reader.getRunNum(key),
+                    temperature=lookups[key][0],
+                    time=lookups[key][1],
+                    captureTemperature=lookups[key][2],
+                    frequency_key = self.reader.getRunGroup(key)
+                )
+                if self.config.windowPeriods > 0:
+                    self._analyzeWindows(
+                        key + "_ACTUAL_LINEAR",
+                        df,
+                        runNum = self.reader.getRunNum(key),
+                        frequency_key = self.reader.getRunGroup(key)
+                    )
+                if analyzed:
+                    phase.advance(1, df.shape[0]*df.shape[1]*8)
         print("Analysis of actual data completed")
         
     def _withEmpty(self) -> None:
         """
-        Runs analysis program with empty field voltage dataset.
+        Runs analysis program with empty field voltage datasets. Each voltage
+        run is corrected with the empty field dataset of the closest V_H_MAX.
 
         Returns
         -------
@@ -324,66 +874,76 @@ class Main(object):
 
         """
         print("Running analysis with empty data")
-        self.dict["EMPTY"] = analysis.fundmagphase(
-            self.reader.get("DATAFRAME_EMPTY"),
-            self.reader.get("M_G_FACTOR_DATAFRAME"),
-            self.reader.get("H_G_FACTOR_DATAFRAME"),
-            self.reader.get("CUTOFF_FREQ", Reader.asFloat),
-            self.reader.get("KNOWN_FREQ", Reader.asFloat),
-            self.reader.get("M_OVER_H_REAL_SUB", Reader.asFloat),
-            self.reader.get("M_OVER_H_IMAG_SUB", Reader.asFloat),
-            self.reader.get("M_OVER_H_CALIB", Reader.asFloat),
-            self.reader.get("PM_PH_DIFF_PHASE_ADJ", Reader.asFloat),
-            self.reader.get("M_OVER_H0_SUB", Reader.asFloat),
-            self.reader.get("H_PHASE_REAL_SUB", Reader.asFloat),
-            self.reader.get("H_PHASE_IMAG_SUB", Reader.asFloat),
-            self.reader.get("NUM_PERIOD", Reader.asFloat),
-            self.reader.get("BEGIN_TIME", Reader.asFloat),
-            self.reader.get("POLARITY", Reader.asFloat)
-        )
+        references = []
+        for key in self.reader.get("DICT_DATAFRAME_EMPTY"):
+            self.dict[key] = self._emptyAnalysis(key)
+            references.append(EmptyReference.fromAnalysis(self.dict[key], self.config.vHOffset))
+        self.emptyReferences = EmptyReferenceLibrary(references)
         print("Analysis of empty data completed")
         print("Running analysis of actual data")
         linearSignifier = "LINEAR"
-        for key in self.reader.get("DICT_DATAFRAME_ACTUAL"):
-            if not key.startswith("voltageDataScopeRun"):
-                return
-            nonLinearSub = self.reader.get("NON_LINEAR_SUB")
-            vHMax = 0
-            if nonLinearSub:
-                vHMax = self.reader.get("DICT_DATAFRAME_ACTUAL").get(key).iloc[:,1].max()
-                if vHMax <= self.dict.get("EMPTY")[1]["V_H_MAX"] + self.reader.get("V_H_OFFSET", Reader.asFloat) and vHMax >= self.dict.get("EMPTY")[1]["V_H_MAX"] - self.reader.get("V_H_OFFSET", Reader.asFloat):
-                    linearSignifier = "NON_LINEAR"
-                else:
-                    nonLinearSub = False
+        lookups = self._runLookups()
+        with self._analyzePhase() as phase:
+            for key in self.reader.get("DICT_DATAFRAME_ACTUAL"):
+                if not key.startswith("voltageDataScopeRun"):
+                    return
+                df = self.reader.get("DICT_DATAFRAME_ACTUAL").get(key)
+                nonLinearSub = self.config.nonLinearSub
+                vHMax = df.iloc[:,1].max()
+                emptyReference = self.emptyReferences.nearest(vHMax)
+                if nonLinearSub:
+                    if emptyReference.accepts(vHMax):
+                        linearSignifier = "NON_LINEAR"
+                    else:
+                        nonLinearSub = False
+                    
                 
-            
-            self.dict[key + "_ACTUAL_" + linearSignifier] = analysis.fundmagphase(
-                self.reader.get("DICT_DATAFRAME_ACTUAL").get(key),
-                self.reader.get("M_G_FACTOR_DATAFRAME"),
-                self.reader.get("H_G_FACTOR_DATAFRAME"),
-                self.reader.get("CUTOFF_FREQ", Reader.asFloat),
-                self.reader.get("KNOWN_FREQ", Reader.asFloat),
-                self.dict.get("EMPTY")[1]["M_OVER_H_REAL"],
-                self.dict.get("EMPTY")[1]["M_OVER_H_IMAG"],
-                self.reader.get("M_OVER_H_CALIB", Reader.asFloat),
-                self.reader.get("PM_PH_DIFF_PHASE_ADJ", Reader.asFloat),
-                self.reader.get("M_OVER_H0_SUB", Reader.asFloat),
-                self.dict.get("EMPTY")[1]["H_PHASE_REAL"],
-                self.dict.get("EMPTY")[1]["H_PHASE_IMAG"],
-                self.reader.get("NUM_PERIOD", Reader.asFloat),
-                self.reader.get("BEGIN_TIME", Reader.asFloat),
-                self.reader.get("POLARITY", Reader.asFloat),
-                temperature=self.reader.getRunTemp(key),
-                runNum = self.reader.getRunNum(key),
-                time=self.reader.getTime(key, "oscilloscope"),
-                isNonLinearSub = nonLinearSub,
-                Mspecrealforsub = self.dict.get("EMPTY")[0]["M_SPECTRUM_REAL"],
-                Mspecimagforsub = self.dict.get("EMPTY")[0]["M_SPECTRUM_IMAG"]
-            )
+                analyzed = self._analyze(
+                    key + "_ACTUAL_" + linearSignifier,
+                    df,
+                    MoverHrealforsub = emptyReference.mOverHReal,
+                    MoverHimagforsub = emptyReference.mOverHImag,
+                    Hphaserealforsub = emptyReference.hPhaseReal,
+                    Hphaseimagforsub = emptyReference.hPhaseImag,
+                    temperature=lookups[key][0],
+                    runNum = self.reader.getRunNum(key),
+                    time=lookups[key][1],
+                    captureTemperature=lookups[key][2],
+                    isNonLinearSub = nonLinearSub,
+                    empty_reference = emptyReference,
+                    frequency_key = self.reader.getRunGroup(key)
+                )
+                if self.config.windowPeriods > 0:
+                    self._analyzeWindows(
+                        key + "_ACTUAL_" + linearSignifier,
+                        df,
+                        MoverHrealforsub = emptyReference.mOverHReal,
+                        MoverHimagforsub = emptyReference.mOverHImag,
+                        runNum = self.reader.getRunNum(key),
+                        frequency_key = self.reader.getRunGroup(key)
+                    )
+                if analyzed:
+                    phase.advance(1, df.shape[0]*df.shape[1]*8)
         
         print("Analysis of actual data completed")    
         
-if __name__ == "__main__":
+def selectConfigFile() -> str:
+    """
+    Asks for a configuration file in a `PySimpleGUI` pop-up window.
+
+    Raises
+    ------
+    ReaderError
+        Raised when no file was selected.
+
+    Returns
+    -------
+    str
+        File path of selected configuration file.
+
+    """
+    import PySimpleGUI as sg
+    
     event, values = sg.Window('Configuration File Selection',
                   [[sg.Text('Select Cogfiguration File: ', size=(25, 1)), 
                     sg.InputText(key='-FILE-'), 
@@ -395,5 +955,294 @@ if __name__ == "__main__":
         raise ReaderError("Configuration File", "No file was selected in pop-up windows")
     elif len(path) == 0:
         raise ReaderError("Configuration File", "No file was selected in pop-up windows")
-    else:
-        Main(path).run()
+    return path
+
+def runBatch(configDirs: List[str], overrides: Dict[str, str] = None, workers: int = 1, plot: bool = True,
+             cache: DatasetCache = None, progress: ProgressReporter = None) -> List[Dict[str, Any]]:
+    """
+    Runs the analysis program for many configuration files in one process.
+    
+    Every distinct dataset (G-Factor files, temperature and time files,
+    voltage runs) is read once into a DatasetCache object shared by all
+    configuration files. A failing configuration file does not stop the others.
+    Configuration files sharing OUT_DIR and DESCRIPTION would write into the
+    same files when they start within the same second, the TIME of their
+    OUT_DIR/DATE/TIME folder. In parallel their DESCRIPTION is extended by
+    the name of the configuration file, see batchDescriptions. One after
+    the other, a configuration file waits for the next second instead.
+
+    Parameters
+    ----------
+    configDirs : List[str]
+        File paths of configuration text files.
+    overrides : Dict[str, str], optional
+        Property values which replace those of every configuration file.
+        The default is None.
+    workers : int, optional
+        Number of configuration files analyzed in parallel threads. With more
+        than one, MEMORY is turned off, since the peaks of `tracemalloc`
+        would mix the memory of configuration files running at once.
+        The default is 1.
+    plot : bool, optional
+        Writes plots of analyzed data when True. The default is True.
+    cache : DatasetCache, optional
+        Dataset cache to use. The default is None, which creates a new cache.
+    progress : ProgressReporter, optional
+        Reports the progress of every configuration file and of the batch as
+        phase "batch". The default is None, which reports nothing.
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        Summary of each configuration file in the order given, with keys
+        "CONFIG", "STATUS" ("OK" or "FAILED"), "RUNS", "SECONDS", "ERROR"
+        (type and message of the exception of a failed configuration file),
+        "TRACEBACK" (its traceback), "PROFILES" (.prof file of each profiled
+        stage) and "PROFILE_ERRORS" (stages which could not be profiled,
+        see Profiler).
+
+    """
+    if cache is None:
+        cache = DatasetCache()
+    if progress is None:
+        progress = NULL_PROGRESS
+    
+    descriptions = batchDescriptions(configDirs, overrides) if workers > 1 else [None]*len(configDirs)
+    # DATE + TIME of the last configuration file of each OUT_DIR and DESCRIPTION run one after the other
+    stamps = {}
+    
+    def runConfig(index: int) -> Dict[str, Any]:
+        configDir = configDirs[index]
+        summary = {"CONFIG": configDir, "STATUS": "OK", "RUNS": 0, "SECONDS": 0.0, "ERROR": "", "TRACEBACK": "",
+                   "PROFILES": {}, "PROFILE_ERRORS": []}
+        start = time.perf_counter()
+        try:
+            configOverrides = dict(overrides or {})
+            if descriptions[index] is not None:
+                configOverrides["DESCRIPTION"] = descriptions[index]
+            properties = Reader.readProperties(configDir, overrides=configOverrides)
+            group = (os.path.realpath(str(properties["OUT_DIR"])), str(properties["DESCRIPTION"]))
+            if workers > 1 and getBool(str(properties["MEMORY"])):
+                print("Warning: MEMORY of {} is turned off as configuration files are analyzed in parallel, "
+                      "only the time of its stages is recorded".format(configDir))
+                configOverrides.update({"MEMORY": "FALSE", "INSTRUMENT": "TRUE"})
+            if workers <= 1 and stamps.get(group) == time.strftime("%Y%m%d%H%M%S"):
+                # The previous configuration file of this OUT_DIR and DESCRIPTION writes into the folder of this second
+                time.sleep(1.01 - time.time() % 1)
+            program = Main(configDir, configOverrides, cache, progress=progress)
+            stamps[group] = program.reader.get("DATE") + program.reader.get("TIME")
+            program.run(plot=plot)
+            summary["RUNS"] = len([key for key in program.dict if not key.startswith("EMPTY")])
+            summary["PROFILES"] = program.profileFiles
+            summary["PROFILE_ERRORS"] = program.profiler.errors
+        except Exception as error:
+            summary["STATUS"] = "FAILED"
+            summary["ERROR"] = type(error).__name__ + ": " + str(error)
+            summary["TRACEBACK"] = traceback.format_exc()
+        summary["SECONDS"] = time.perf_counter() - start
+        batchPhase.advance()
+        return summary
+    
+    with progress.phase("batch", len(configDirs), "configs") as batchPhase:
+        if workers <= 1:
+            return [runConfig(index) for index in range(len(configDirs))]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(runConfig, range(len(configDirs))))
+
+def batchDescriptions(configDirs: List[str], overrides: Dict[str, str] = None) -> List[str]:
+    """
+    Returns a DESCRIPTION for each configuration file of a batch which shares
+    OUT_DIR and DESCRIPTION with another one, so no two configuration files
+    analyzed in parallel write into the same output files. The DESCRIPTION is extended by the
+    name of the configuration file, and also by its position in the batch
+    when the names are the same.
+
+    Parameters
+    ----------
+    configDirs : List[str]
+        File paths of configuration text files.
+    overrides : Dict[str, str], optional
+        Property values which replace those of every configuration file.
+        The default is None.
+
+    Returns
+    -------
+    List[str]
+        New DESCRIPTION of each configuration file, None when it is kept.
+        Configuration files which cannot be read keep theirs and fail later.
+
+    """
+    groups = {}
+    for index, configDir in enumerate(configDirs):
+        try:
+            properties = Reader.readProperties(configDir, overrides=overrides)
+        except ReaderError:
+            continue
+        key = (os.path.realpath(str(properties["OUT_DIR"])), str(properties["DESCRIPTION"]))
+        groups.setdefault(key, []).append(index)
+    descriptions = [None]*len(configDirs)
+    for (outDir, description), indices in groups.items():
+        if len(indices) < 2:
+            continue
+        names = [os.path.splitext(os.path.basename(configDirs[index]))[0] for index in indices]
+        for index, name in zip(indices, names):
+            descriptions[index] = description + "_" + name
+            if names.count(name) > 1:
+                descriptions[index] += "_" + str(index + 1)
+            print("DESCRIPTION of {} changed to {}, as other configuration files share its OUT_DIR and DESCRIPTION"
+                  .format(configDirs[index], descriptions[index]))
+    return descriptions
+
+def mergeBatchProfiles(summaries: List[Dict[str, Any]], directory: str) -> List[str]:
+    """
+    Merges the profiles of each stage written by the configuration files of a batch.
+    
+    Each configuration file, and so each parallel worker, writes its own
+    .prof files, see batchDescriptions. They are merged per stage into
+    directory/"batch_" + STAGE + ".prof" with a text summary next to it.
+
+    Parameters
+    ----------
+    summaries : List[Dict[str, Any]]
+        Summaries returned by runBatch.
+    directory : str
+        Directory of merged files.
+
+    Returns
+    -------
+    List[str]
+        File paths of merged .prof files.
+
+    """
+    stages = {}
+    for summary in summaries:
+        for stage, path in summary["PROFILES"].items():
+            stages.setdefault(stage, []).append(path)
+    return [mergeProfiles(paths, os.path.join(directory, "batch_" + stage + ".prof")) for stage, paths in stages.items()]
+
+def printBatchSummary(summaries: List[Dict[str, Any]], cache: DatasetCache = None) -> None:
+    """
+    Prints the outcome of each configuration file of a batch, and the
+    traceback of each failed one to stderr.
+
+    Parameters
+    ----------
+    summaries : List[Dict[str, Any]]
+        Summaries returned by runBatch.
+    cache : DatasetCache, optional
+        Dataset cache used by the batch, whose statistics are printed.
+        The default is None.
+
+    Returns
+    -------
+    None.
+
+    """
+    width = max([len("CONFIG")] + [len(str(summary["CONFIG"])) for summary in summaries])
+    print("CONFIG".ljust(width) + "  STATUS  " + "RUNS".rjust(6) + "  " + "SECONDS".rjust(9) + "  ERROR")
+    for summary in summaries:
+        print(str(summary["CONFIG"]).ljust(width) + "  " + summary["STATUS"].ljust(6) + "  " + str(summary["RUNS"]).rjust(6)
+              + "  " + "{:9.2f}".format(summary["SECONDS"]) + "  " + summary["ERROR"])
+    for summary in summaries:
+        if summary.get("TRACEBACK", ""):
+            print("Traceback of {}:\n{}".format(summary["CONFIG"], summary["TRACEBACK"]), end="", file=sys.stderr)
+    for summary in summaries:
+        for error in summary.get("PROFILE_ERRORS", []):
+            print("Profile of {} is incomplete, stage {}".format(summary["CONFIG"], error))
+    if cache is not None:
+        print("Datasets read: {}, reused from cache: {}".format(cache.misses, cache.hits))
+
+def main(argv: List[str] = None) -> int:
+    """
+    Command line entry point of the analysis program.
+
+    Parameters
+    ----------
+    argv : List[str], optional
+        Command line arguments without the program name.
+        The default is None, which reads sys.argv.
+
+    Returns
+    -------
+    int
+        Exit status. 0 when every configuration file ran or validated
+        successfully, 1 otherwise.
+
+    """
+    parser = argparse.ArgumentParser(description="Analyzes voltage run datasets listed in configuration files.")
+    parser.add_argument("configs", nargs="*", metavar="CONFIG",
+                        help="Configuration file(s). A pop-up window asks for one when none is given.")
+    parser.add_argument("-o", "--out-dir", help="Directory which replaces OUT_DIR of every configuration file.")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="Number of configuration files analyzed in parallel. Datasets are shared between them.")
+    parser.add_argument("--no-plots", action="store_true", help="Only write analyzed data, no plots.")
+    parser.add_argument("--show-plots", action="store_true",
+                        help="Show plots in windows. Plots are only saved to files by default when configuration files are given.")
+    parser.add_argument("--validate", action="store_true",
+                        help="Only check configuration files and dataset headers without loading any dataset.")
+    parser.add_argument("--instrument", action="store_true",
+                        help="Record the time spent in each stage of the program, as if INSTRUMENT were TRUE.")
+    parser.add_argument("--memory", action="store_true",
+                        help="Record the memory used by each stage of the program as well, as if MEMORY were TRUE. "
+                             "Ignored when --workers is greater than 1.")
+    parser.add_argument("--profile", nargs="+", metavar="STAGE", choices=Profiler.STAGES,
+                        help="Run stages (read, analyze, write, plot) under cProfile, as if listed by PROFILE. "
+                             "Profiles of a batch are also merged per stage into the --out-dir directory or the current directory.")
+    parser.add_argument("--progress", action="store_true",
+                        help="Report completed runs, runs/s, MB/s and ETA of each phase to the terminal.")
+    parser.add_argument("--progress-log", metavar="FILE",
+                        help="Append progress updates to FILE as JSON lines.")
+    args = parser.parse_args(argv)
+    
+    overrides = {}
+    if args.out_dir is not None:
+        overrides["OUT_DIR"] = args.out_dir
+    if args.instrument:
+        overrides["INSTRUMENT"] = "TRUE"
+    if args.memory:
+        overrides["MEMORY"] = "TRUE"
+    if args.profile is not None:
+        overrides["PROFILE"] = " | ".join(args.profile)
+    
+    sinks = []
+    if args.progress:
+        sinks.append(TerminalSink())
+    if args.progress_log is not None:
+        sinks.append(JsonLinesSink(args.progress_log))
+    
+    configs = args.configs
+    if len(configs) == 0:
+        configs = [selectConfigFile()]
+        # The configuration file was chosen in a pop-up window, so progress is shown in one as well
+        sinks.append(GuiSink())
+    elif not args.show_plots:
+        os.environ.setdefault("MPLBACKEND", "Agg")
+    
+    status = 0
+    if args.validate:
+        for configDir in configs:
+            errors = Reader.validate(configDir, overrides=overrides)
+            for error in errors:
+                print(configDir + ": " + str(error))
+            if len(errors) > 0:
+                status = 1
+            else:
+                print(configDir + ": OK")
+        return status
+    
+    cache = DatasetCache()
+    progress = ProgressReporter(sinks)
+    try:
+        summaries = runBatch(configs, overrides, args.workers, not args.no_plots, cache, progress)
+    finally:
+        progress.close()
+    printBatchSummary(summaries, cache)
+    if len(configs) > 1 and any(len(summary["PROFILES"]) > 0 for summary in summaries):
+        for path in mergeBatchProfiles(summaries, args.out_dir if args.out_dir is not None else os.getcwd()):
+            print("Merged profile written to " + path)
+    if any(summary["STATUS"] != "OK" for summary in summaries):
+        status = 1
+    return status
+        
+if __name__ == "__main__":
+    sys.exit(main())
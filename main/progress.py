@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+"""Progress Package
+
+This script contains classes which report the progress of each phase of the
+analysis program (reading, analysis, writing) while it runs: completed runs,
+runs per second, megabytes per second ingested and the estimated time left.
+
+Progress is sent to sinks, which are called with one event dictionary per
+update. Updates of a phase are rate-limited, so reporting stays cheap even
+when a phase advances thousands of times per second. The first and the last
+update of a phase are always sent.
+
+This program is written with Python version 3.7.3 with Spyder IDE.
+
+This file is imported as a module and contains the following classes:
+    * ProgressReporter - Hands out phases and sends their updates to sinks
+    * Phase - Tracks the progress of one phase
+    * TerminalSink - Writes updates to the terminal
+    * JsonLinesSink - Appends updates to a JSON-lines log file
+    * GuiSink - Shows updates in a `PySimpleGUI` progress meter
+
+It provides the following function:
+    * formatEvent - Returns an update as one line of text
+
+It provides the following object:
+    * NULL_PROGRESS - ProgressReporter object without sinks
+
+"""
+import json
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, TextIO
+
+class Phase(object):
+    """
+    Tracks the progress of one phase of the analysis program.
+
+    Attributes
+    ----------
+    name : str
+        Name of phase, e.g. "analyze".
+    label : str
+        Label of the program running the phase, e.g. its DESCRIPTION.
+    total : int
+        Number of units of the phase.
+    unit : str
+        Name of units, e.g. "runs".
+    completed : int
+        Number of completed units.
+    nbytes : int
+        Bytes ingested so far.
+    """
+
+    def __init__(self, reporter: 'ProgressReporter', name: str, total: int, unit: str = "runs", label: str = ""):
+        """
+        Parameters
+        ----------
+        reporter : ProgressReporter
+            ProgressReporter object which sends the updates.
+        name : str
+            Name of phase.
+        total : int
+            Number of units of the phase.
+        unit : str, optional
+            Name of units. The default is "runs".
+        label : str, optional
+            Label of the program running the phase. The default is "".
+
+        Returns
+        -------
+        None.
+
+        """
+        self._reporter = reporter
+        self.name = name
+        self.label = label
+        self.total = total
+        self.unit = unit
+        self.completed = 0
+        self.nbytes = 0
+        self._start = time.perf_counter()
+        self._lastUpdate = None
+        self._finished = False
+        self._update(self._start)
+
+    def advance(self, count: int = 1, nbytes: int = 0) -> None:
+        """
+        Marks units as completed.
+
+        Parameters
+        ----------
+        count : int, optional
+            Number of completed units. The default is 1.
+        nbytes : int, optional
+            Bytes ingested by the units. The default is 0.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.completed += count
+        self.nbytes += nbytes
+        now = time.perf_counter()
+        if now - self._lastUpdate >= self._reporter.interval:
+            self._update(now)
+
+    def finish(self) -> None:
+        """
+        Marks the phase as finished and sends its last update.
+
+        Returns
+        -------
+        None.
+
+        """
+        if not self._finished:
+            self._finished = True
+            self._update(time.perf_counter())
+
+    def event(self, now: float = None) -> Dict[str, Any]:
+        """
+        Returns the current progress of the phase.
+
+        Parameters
+        ----------
+        now : float, optional
+            Current time.perf_counter value. The default is None, which reads it.
+
+        Returns
+        -------
+        Dict[str, Any]
+            Progress with keys "PHASE", "LABEL", "UNIT", "COMPLETED", "TOTAL",
+            "ELAPSED", "RATE" (units per second), "MB_PER_S", "ETA" (seconds,
+            None while unknown) and "DONE".
+
+        """
+        if now is None:
+            now = time.perf_counter()
+        elapsed = now - self._start
+        rate = self.completed / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.completed >= self.total:
+            eta = 0.0
+        elif rate > 0:
+            eta = (self.total - self.completed) / rate
+        return {"PHASE": self.name, "LABEL": self.label, "UNIT": self.unit, "COMPLETED": self.completed,
+                "TOTAL": self.total, "ELAPSED": elapsed, "RATE": rate,
+                "MB_PER_S": self.nbytes / elapsed / 1e6 if elapsed > 0 else 0.0, "ETA": eta, "DONE": self._finished}
+
+    def _update(self, now: float) -> None:
+        self._lastUpdate = now
+        self._reporter.send(self.event(now))
+
+    def __enter__(self) -> 'Phase':
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        self.finish()
+        return False
+
+
+class _NullPhase(object):
+    """
+    Phase which tracks nothing.
+    """
+
+    def advance(self, count: int = 1, nbytes: int = 0) -> None:
+        pass
+
+    def finish(self) -> None:
+        pass
+
+    def __enter__(self) -> '_NullPhase':
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        return False
+
+_NULL_PHASE = _NullPhase()
+
+
+class ProgressReporter(object):
+    """
+    Hands out phases and sends their updates to sinks.
+
+    One ProgressReporter object can be shared by programs running in parallel
+    threads. Sinks are called one at a time.
+
+    Attributes
+    ----------
+    sinks : List[Callable[[Dict[str, Any]], None]]
+        Functions called with every update, see Phase.event.
+    interval : float
+        Least number of seconds between two updates of a phase.
+    """
+
+    def __init__(self, sinks: List[Callable[[Dict[str, Any]], None]] = None, interval: float = 0.5):
+        """
+        Parameters
+        ----------
+        sinks : List[Callable[[Dict[str, Any]], None]], optional
+            Functions called with every update. The default is None.
+        interval : float, optional
+            Least number of seconds between two updates of a phase. The default is 0.5.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.sinks = list(sinks) if sinks is not None else []
+        self.interval = interval
+        self._lock = threading.Lock()
+
+    def phase(self, name: str, total: int, unit: str = "runs", label: str = "") -> Any:
+        """
+        Starts a phase. It can be used as a context manager, which finishes it.
+
+        Parameters
+        ----------
+        name : str
+            Name of phase.
+        total : int
+            Number of units of the phase.
+        unit : str, optional
+            Name of units. The default is "runs".
+        label : str, optional
+            Label of the program running the phase. The default is "".
+
+        Returns
+        -------
+        Any
+            Phase object, or an object which tracks nothing when there are no sinks.
+
+        """
+        if len(self.sinks) == 0:
+            return _NULL_PHASE
+        return Phase(self, name, total, unit, label)
+
+    def send(self, event: Dict[str, Any]) -> None:
+        """
+        Sends an update to every sink.
+
+        Parameters
+        ----------
+        event : Dict[str, Any]
+            Update, see Phase.event.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            for sink in self.sinks:
+                sink(event)
+
+    def close(self) -> None:
+        """
+        Closes every sink which has a close method, e.g. JsonLinesSink objects.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            for sink in self.sinks:
+                if hasattr(sink, "close"):
+                    sink.close()
+
+NULL_PROGRESS = ProgressReporter()
+
+
+def formatEvent(event: Dict[str, Any]) -> str:
+    """
+    Returns an update as one line of text.
+
+    Parameters
+    ----------
+    event : Dict[str, Any]
+        Update, see Phase.event.
+
+    Returns
+    -------
+    str
+        E.g. "[Sample] analyze: 40/100 runs (40%), 12.5 runs/s, 3.2 MB/s, ETA 4.8 s".
+
+    """
+    label = "[" + event["LABEL"] + "] " if len(event["LABEL"]) > 0 else ""
+    percent = 100 * event["COMPLETED"] / event["TOTAL"] if event["TOTAL"] > 0 else 100.0
+    eta = "ETA {:.1f} s".format(event["ETA"]) if event["ETA"] is not None else "ETA unknown"
+    return (label + "{}: {}/{} {} ({:.0f}%), {:.1f} {}/s, {:.1f} MB/s, ".format(
+        event["PHASE"], event["COMPLETED"], event["TOTAL"], event["UNIT"], percent, event["RATE"], event["UNIT"],
+        event["MB_PER_S"]) + (eta if not event["DONE"] else "done in {:.1f} s".format(event["ELAPSED"])))
+
+
+class TerminalSink(object):
+    """
+    Writes updates to the terminal, one line each.
+    """
+
+    def __init__(self, stream: TextIO = None):
+        """
+        Parameters
+        ----------
+        stream : TextIO, optional
+            Stream written to. The default is None, which is sys.stderr.
+
+        Returns
+        -------
+        None.
+
+        """
+        self._stream = stream
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        stream = self._stream if self._stream is not None else sys.stderr
+        stream.write(formatEvent(event) + "\n")
+        stream.flush()
+
+
+class JsonLinesSink(object):
+    """
+    Appends updates to a machine-readable log file, one JSON object per line.
+    Each line has the keys of Phase.event and "TIMESTAMP" (seconds since the epoch).
+
+    The log file is kept open until the sink is closed, and every line is
+    flushed as it is written so the file can be followed while the program runs.
+    """
+
+    def __init__(self, path: str):
+        """
+        Parameters
+        ----------
+        path : str
+            File path of log file. Lines are appended to an existing file.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.path = path
+        self._logFile = open(path, 'a')
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        line = dict(event)
+        line["TIMESTAMP"] = time.time()
+        self._logFile.write(json.dumps(line) + "\n")
+        self._logFile.flush()
+
+    def close(self) -> None:
+        """
+        Closes the log file. It may be called more than once.
+
+        Returns
+        -------
+        None.
+
+        """
+        self._logFile.close()
+
+    def __enter__(self) -> 'JsonLinesSink':
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        self.close()
+        return False
+
+
+class GuiSink(object):
+    """
+    Shows updates in a `PySimpleGUI` progress meter per phase.
+
+    `PySimpleGUI` windows must be updated from the main thread, so this sink
+    is meant for programs which do not run parallel workers.
+    """
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        import PySimpleGUI as sg
+
+        key = "progress-" + event["LABEL"] + "-" + event["PHASE"]
+        sg.one_line_progress_meter("Analysis progress", event["COMPLETED"], max(event["TOTAL"], 1),
+                                   formatEvent(event), key=key, orientation="h")
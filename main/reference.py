@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""Reference Package
+
+This script contains the EmptyReference class which holds the analysis of an
+empty field voltage dataset (voltage data collected when the coil holds no
+nanoparticles) in the form needed by the analysis of every actual voltage run.
+
+The M spectrum of the empty field run is kept as a complex array and its
+products with the phase transfer factors of the empty field run are computed
+once, so the non-linear subtraction of an actual run is a single array
+operation over all corrected bins.
+
+This program is written with Python version 3.7.3 with Spyder IDE.
+
+Empty field runs recorded at several drive amplitudes are held by an
+EmptyReferenceLibrary, sorted by V_H_MAX, so each actual run finds the empty
+field run closest to its own V_H_MAX by binary search.
+
+This file is imported as a module and contains the following classes:
+    * EmptyReference - Empty field analysis reused by the analysis of actual voltage runs
+    * EmptyReferenceLibrary - Empty field analyses of several drive amplitudes
+
+"""
+import math
+import threading
+from typing import Dict, Iterator, List, Tuple
+import numpy as np
+import pandas as pd
+
+class EmptyReference(object):
+    """
+    Empty field analysis reused by the analysis of actual voltage runs.
+
+    Attributes
+    ----------
+    spectrum : np.ndarray
+        Complex M spectrum of the empty field run (M_SPECTRUM_REAL and M_SPECTRUM_IMAG).
+    mOverHReal : float
+        M_OVER_H_REAL property of the empty field run.
+    mOverHImag : float
+        M_OVER_H_IMAG property of the empty field run.
+    hPhaseReal : float
+        H_PHASE_REAL property of the empty field run.
+    hPhaseImag : float
+        H_PHASE_IMAG property of the empty field run.
+    vHMax : float
+        V_H_MAX property of the empty field run.
+    vHOffset : float
+        Half width of the band of V_H_MAX values of actual runs for which the
+        non-linear subtraction is done. NaN accepts no run.
+    """
+
+    def __init__(self, spectrum: np.ndarray, mOverHReal: float, mOverHImag: float, hPhaseReal: float,
+                 hPhaseImag: float, vHMax: float = math.nan, vHOffset: float = math.nan):
+        """
+        Parameters
+        ----------
+        spectrum : np.ndarray
+            Complex M spectrum of the empty field run.
+        mOverHReal : float
+            M_OVER_H_REAL property of the empty field run.
+        mOverHImag : float
+            M_OVER_H_IMAG property of the empty field run.
+        hPhaseReal : float
+            H_PHASE_REAL property of the empty field run.
+        hPhaseImag : float
+            H_PHASE_IMAG property of the empty field run.
+        vHMax : float, optional
+            V_H_MAX property of the empty field run. The default is NaN.
+        vHOffset : float, optional
+            Half width of the accepted band of V_H_MAX. The default is NaN.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.spectrum = np.asarray(spectrum, dtype=complex)
+        self.mOverHReal = mOverHReal
+        self.mOverHImag = mOverHImag
+        self.hPhaseReal = hPhaseReal
+        self.hPhaseImag = hPhaseImag
+        self.vHMax = vHMax
+        self.vHOffset = vHOffset
+        self._subtractions = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def fromAnalysis(cls, analyzed: Tuple[pd.DataFrame, Dict[str, float]], vHOffset: float = math.nan) -> 'EmptyReference':
+        """
+        Builds an EmptyReference object from the output of the fundmagphase
+        function in `analysis` for an empty field run.
+
+        Parameters
+        ----------
+        analyzed : Tuple[pd.DataFrame, Dict[str, float]]
+            Analyzed dataframe and properties of the empty field run.
+        vHOffset : float, optional
+            V_H_OFFSET parameter. The default is NaN.
+
+        Returns
+        -------
+        EmptyReference
+            Empty field reference.
+
+        """
+        logger, properties = analyzed
+        spectrum = logger["M_SPECTRUM_REAL"].to_numpy(dtype=float) + 1j*logger["M_SPECTRUM_IMAG"].to_numpy(dtype=float)
+        return cls(spectrum, properties["M_OVER_H_REAL"], properties["M_OVER_H_IMAG"], properties["H_PHASE_REAL"],
+                   properties["H_PHASE_IMAG"], properties["V_H_MAX"], vHOffset)
+
+    def accepts(self, vHMax: float) -> bool:
+        """
+        Returns True if an actual run of given V_H_MAX is within vHOffset of
+        the V_H_MAX of the empty field run.
+        """
+        return vHMax <= self.vHMax + self.vHOffset and vHMax >= self.vHMax - self.vHOffset
+
+    def transfer(self, phaseSign: float) -> complex:
+        """
+        Returns the phase transfer factor of the empty field run for bins of
+        given frequency sign.
+        """
+        return complex(self.hPhaseReal, -phaseSign*self.hPhaseImag)
+
+    def subtraction(self, phaseSign: float) -> np.ndarray:
+        """
+        Returns the empty field spectrum multiplied by its phase transfer
+        factor. It is computed once per frequency sign.
+
+        Parameters
+        ----------
+        phaseSign : float
+            Sign of frequency passed to transfer.
+
+        Returns
+        -------
+        np.ndarray
+            Complex spectrum to be subtracted.
+
+        """
+        with self._lock:
+            if phaseSign not in self._subtractions:
+                self._subtractions[phaseSign] = self.spectrum*self.transfer(phaseSign)
+            return self._subtractions[phaseSign]
+
+    def subtract(self, spectrum: np.ndarray, bins: np.ndarray, transfer: complex, phaseSign: float,
+                 positions: np.ndarray = None) -> None:
+        """
+        Subtracts the empty field spectrum from the bins of an actual run's
+        M spectrum in place. Each bin is rotated into the phase of the empty
+        field run by transfer, the empty field spectrum is subtracted and the
+        bin is rotated back. Bins beyond the empty field spectrum are left unchanged.
+
+        Parameters
+        ----------
+        spectrum : np.ndarray
+            Complex M spectrum of actual run.
+        bins : np.ndarray
+            Indices of bins to be subtracted.
+        transfer : complex
+            Phase transfer factor of actual run.
+        phaseSign : float
+            Frequency sign of the phase transfer factor of the empty field run.
+        positions : np.ndarray, optional
+            Indices of spectrum holding the bins, when spectrum only holds
+            some bins of the run. The default is None, which is bins.
+
+        Returns
+        -------
+        None.
+
+        """
+        bins = np.asarray(bins)
+        positions = bins if positions is None else np.asarray(positions)
+        inside = bins < self.spectrum.size
+        bins = bins[inside]
+        positions = positions[inside]
+        spectrum[positions] = (spectrum[positions]*transfer - self.subtraction(phaseSign)[bins])/transfer
+
+    def __len__(self) -> int:
+        return self.spectrum.size
+
+
+class EmptyReferenceLibrary(object):
+    """
+    Empty field analyses of several drive amplitudes, sorted by V_H_MAX.
+
+    Attributes
+    ----------
+    references : List[EmptyReference]
+        Empty field references in increasing order of V_H_MAX.
+    vHMax : np.ndarray
+        V_H_MAX of each reference.
+    """
+
+    def __init__(self, references: List[EmptyReference]):
+        """
+        Parameters
+        ----------
+        references : List[EmptyReference]
+            Empty field references in any order. References of equal V_H_MAX
+            keep their order.
+
+        Raises
+        ------
+        ValueError
+            Raised when no reference is given.
+
+        Returns
+        -------
+        None.
+
+        """
+        if len(references) == 0:
+            raise ValueError("EmptyReferenceLibrary needs at least one empty field reference")
+        order = np.argsort([reference.vHMax for reference in references], kind="stable")
+        self.references = [references[index] for index in order]
+        self.vHMax = np.array([reference.vHMax for reference in self.references], dtype=float)
+
+    def nearest(self, vHMax: float) -> EmptyReference:
+        """
+        Returns the reference whose V_H_MAX is closest to given V_H_MAX. The
+        reference of lower V_H_MAX is returned when two are equally close.
+
+        Parameters
+        ----------
+        vHMax : float
+            V_H_MAX of actual run.
+
+        Returns
+        -------
+        EmptyReference
+            Closest empty field reference.
+
+        """
+        index = int(np.searchsorted(self.vHMax, vHMax))
+        if index == len(self.references):
+            index -= 1
+        elif index > 0 and vHMax - self.vHMax[index - 1] <= self.vHMax[index] - vHMax:
+            index -= 1
+        return self.references[index]
+
+    def __iter__(self) -> Iterator[EmptyReference]:
+        return iter(self.references)
+
+    def __len__(self) -> int:
+        return len(self.references)
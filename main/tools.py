@@ -7,19 +7,24 @@ using a text file as input and produce csv files and plot images as outputs
 based on specifications in the input text file.
 
 This script requires that `pandas`, `numpy`, and `matplotlib` are installed
-within the Python environment. 
+within the Python environment. `matplotlib` is only imported when plots are
+written so that programs which do not plot start faster.
 
 This program is written with Python version 3.7.3 with Spyder IDE.
 
 This file is imported as a module and contains the following classes:
     * ReaderError - Exception for Reader class
     * WriterError - Exception for Writer class
+    * AnalysisConfig - Typed analysis parameters read by Reader class
+    * DatasetCache - Shares csv datasets between Reader objects
+    * LazyDatasets - Mapping of csv datasets which are read on first access
     * Writer - Writes output data for analysis program
     * Reader - Reads input data for analysis program
 
 It provides the following functions:
     * getBool - Returns bool value True if string input is an affirmative word
     * addDirectory - Joins two string filepaths into one
+    * readCsv - Reads a csv dataset, optionally with single precision float columns
     
 """
 
@@ -28,9 +33,12 @@ import datetime
 import pandas as pd
 import numpy as np
 import re
-from typing import Any, Dict, Tuple, List
+import threading
+import functools
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Tuple, List
 import math
-import matplotlib.pyplot as plt
+from progress import ProgressReporter, NULL_PROGRESS
 from pathlib import Path
 
 class ReaderError(Exception):
@@ -93,6 +101,363 @@ class WriterError(Exception):
         return f'{self.expression} -> {self.message}'
 
 
+class AnalysisConfig(object):
+    """
+    Immutable, typed view of the analysis parameters of a configuration file.
+    
+    The object is built once by the Reader class when the configuration file
+    is loaded. Numeric parameters are converted to float and boolean
+    parameters to bool, so the per-run analysis loop reads plain attributes
+    instead of looking up and converting the same strings for every run.
+    All invalid or missing parameters are reported together in a single
+    ReaderError.
+    
+    Attributes
+    ----------
+    cutoffFreq : float
+        CUTOFF_FREQ parameter.
+    knownFreq : float
+        KNOWN_FREQ parameter.
+    mOverHRealSub : float
+        M_OVER_H_REAL_SUB parameter.
+    mOverHImagSub : float
+        M_OVER_H_IMAG_SUB parameter.
+    mOverHCalib : float
+        M_OVER_H_CALIB parameter.
+    pmPhDiffPhaseAdj : float
+        PM_PH_DIFF_PHASE_ADJ parameter.
+    mOverH0Sub : float
+        M_OVER_H0_SUB parameter.
+    hPhaseRealSub : float
+        H_PHASE_REAL_SUB parameter.
+    hPhaseImagSub : float
+        H_PHASE_IMAG_SUB parameter.
+    numPeriod : float
+        NUM_PERIOD parameter.
+    beginTime : float
+        BEGIN_TIME parameter.
+    polarity : float
+        POLARITY parameter.
+    vHOffset : float
+        V_H_OFFSET parameter. Only required when both WITH_EMPTY and
+        NON_LINEAR_SUB are TRUE, otherwise it is NaN when not defined.
+    withEmpty : bool
+        WITH_EMPTY parameter.
+    nonLinearSub : bool
+        NON_LINEAR_SUB parameter.
+    readTime : bool
+        READ_TIME parameter.
+    instrument : bool
+        INSTRUMENT parameter. It is FALSE when not defined.
+    memory : bool
+        MEMORY parameter. It is FALSE when not defined.
+    frequencyCache : bool
+        FREQUENCY_CACHE parameter. It is FALSE when not defined.
+    decimate : bool
+        DECIMATE parameter. It is FALSE when not defined.
+    windowPeriods : float
+        WINDOW_PERIODS parameter. It is NaN when not defined.
+    windowHop : float
+        WINDOW_HOP parameter. It is NaN when not defined.
+    engine : str
+        ENGINE parameter in lower case. It is "fft" when not defined.
+    fftBackend : str
+        FFT_BACKEND parameter in lower case. It is "numpy" when not defined.
+    fftWorkers : int
+        FFT_WORKERS parameter. It is 1 when not defined.
+    processes : int
+        PROCESSES parameter. It is 1 when not defined.
+    fftLength : str
+        FFT_LENGTH_MODE parameter in lower case. It is "exact" when not defined.
+    precision : str
+        PRECISION parameter in lower case. It is "double" when not defined.
+    """
+    
+    __slots__ = ("cutoffFreq", "knownFreq", "mOverHRealSub", "mOverHImagSub", "mOverHCalib", "pmPhDiffPhaseAdj",
+                 "mOverH0Sub", "hPhaseRealSub", "hPhaseImagSub", "numPeriod", "beginTime", "polarity", "vHOffset",
+                 "withEmpty", "nonLinearSub", "readTime", "instrument", "memory", "windowPeriods", "windowHop",
+                 "engine", "fftBackend", "fftWorkers", "fftLength", "precision", "frequencyCache",
+                 "decimate", "processes")
+    
+    floatProperties = (("CUTOFF_FREQ", "cutoffFreq"), ("KNOWN_FREQ", "knownFreq"), ("M_OVER_H_REAL_SUB", "mOverHRealSub"),
+                       ("M_OVER_H_IMAG_SUB", "mOverHImagSub"), ("M_OVER_H_CALIB", "mOverHCalib"),
+                       ("PM_PH_DIFF_PHASE_ADJ", "pmPhDiffPhaseAdj"), ("M_OVER_H0_SUB", "mOverH0Sub"),
+                       ("H_PHASE_REAL_SUB", "hPhaseRealSub"), ("H_PHASE_IMAG_SUB", "hPhaseImagSub"),
+                       ("NUM_PERIOD", "numPeriod"), ("BEGIN_TIME", "beginTime"), ("POLARITY", "polarity"))
+    """
+    Tuple[Tuple[str, str]]: Configuration file property and attribute name of each required float parameter.
+    """
+    
+    optionalFloatProperties = (("WINDOW_PERIODS", "windowPeriods"), ("WINDOW_HOP", "windowHop"))
+    """
+    Tuple[Tuple[str, str]]: Configuration file property and attribute name of each optional positive float parameter.
+    """
+    
+    choiceProperties = (("ENGINE", "engine", ("fft", "sparse")), ("FFT_BACKEND", "fftBackend", ("numpy", "scipy")),
+                        ("FFT_LENGTH_MODE", "fftLength", ("exact", "trim", "resample")),
+                        ("PRECISION", "precision", ("double", "single")))
+    """
+    Tuple[Tuple[str, str, Tuple[str]]]: Configuration file property, attribute name and accepted
+    values of each optional parameter with a fixed set of values. The first value is the default.
+    """
+    
+    boolProperties = (("WITH_EMPTY", "withEmpty"), ("NON_LINEAR_SUB", "nonLinearSub"), ("READ_TIME", "readTime"),
+                      ("INSTRUMENT", "instrument"), ("MEMORY", "memory"), ("FREQUENCY_CACHE", "frequencyCache"),
+                      ("DECIMATE", "decimate"))
+    """
+    Tuple[Tuple[str, str]]: Configuration file property and attribute name of each bool parameter.
+    """
+    
+    def __init__(self, **values: Any):
+        """
+        Parameters
+        ----------
+        **values : Any
+            Value of every attribute listed in __slots__.
+
+        Returns
+        -------
+        None.
+
+        """
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("AnalysisConfig object is immutable")
+    
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("AnalysisConfig object is immutable")
+    
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Attributes are passed to __init__, as __setattr__ rejects them
+        return (functools.partial(AnalysisConfig, **{name: getattr(self, name) for name in self.__slots__}), ())
+    
+    def __repr__(self) -> str:
+        return "AnalysisConfig(" + ", ".join(name + "=" + repr(getattr(self, name)) for name in self.__slots__) + ")"
+    
+    @classmethod
+    def fromProperties(cls, properties: Dict[str, Any]) -> 'AnalysisConfig':
+        """
+        Builds an AnalysisConfig object from the raw properties read from a
+        configuration file.
+
+        Parameters
+        ----------
+        properties : Dict[str, Any]
+            Properties read from configuration file.
+
+        Raises
+        ------
+        ReaderError
+            Raised when any parameter is missing or cannot be converted. When
+            more than one property is faulty, the expression lists every faulty
+            property and the message contains one line per faulty property.
+
+        Returns
+        -------
+        AnalysisConfig
+            Parsed analysis parameters.
+
+        """
+        values = {}
+        errors = []
+        for prop, name in cls.boolProperties:
+            value = properties.get(prop, "")
+            values[name] = value if isinstance(value, bool) else getBool(str(value))
+        
+        for prop, name in cls.floatProperties + (("V_H_OFFSET", "vHOffset"),):
+            value = properties.get(prop, "")
+            if isinstance(value, str) and len(value) == 0:
+                if prop == "V_H_OFFSET" and not (values["withEmpty"] and values["nonLinearSub"]):
+                    values[name] = math.nan
+                else:
+                    errors.append((prop, "Property does not exist in configuration file"))
+                continue
+            try:
+                values[name] = float(value)
+            except (TypeError, ValueError):
+                errors.append((prop, "Property is not a float value"))
+        
+        for prop, name in cls.optionalFloatProperties:
+            value = properties.get(prop, "")
+            values[name] = math.nan
+            if isinstance(value, str) and len(value) == 0:
+                continue
+            try:
+                values[name] = float(value)
+            except (TypeError, ValueError):
+                errors.append((prop, "Property is not a float value"))
+                continue
+            if not values[name] > 0:
+                errors.append((prop, "Property must be greater than 0"))
+        
+        for prop, name, choices in cls.choiceProperties:
+            values[name] = str(properties.get(prop, "")).strip().lower()
+            if len(values[name]) == 0:
+                values[name] = choices[0]
+            elif values[name] not in choices:
+                errors.append((prop, "Property must be one of: " + ", ".join(choices)))
+        
+        value = str(properties.get("FFT_WORKERS", "")).strip()
+        values["fftWorkers"] = 1
+        if len(value) > 0:
+            try:
+                values["fftWorkers"] = int(value)
+                if values["fftWorkers"] == 0:
+                    errors.append(("FFT_WORKERS", "Property must not be 0"))
+            except ValueError:
+                errors.append(("FFT_WORKERS", "Property is not an integer value"))
+        
+        value = str(properties.get("PROCESSES", "")).strip()
+        values["processes"] = 1
+        if len(value) > 0:
+            try:
+                values["processes"] = int(value)
+                if values["processes"] < 1:
+                    errors.append(("PROCESSES", "Property must be greater than 0"))
+            except ValueError:
+                errors.append(("PROCESSES", "Property is not an integer value"))
+        
+        if len(errors) == 1:
+            raise ReaderError(errors[0][0], errors[0][1])
+        elif len(errors) > 1:
+            raise ReaderError(", ".join(prop for prop, message in errors),
+                              "\n".join(prop + " -> " + message for prop, message in errors))
+        return cls(**values)
+
+
+class DatasetCache(object):
+    """
+    Shares csv datasets between Reader objects of one process.
+    
+    Datasets are keyed by their resolved file path, a fingerprint of the
+    file (size and modification time) and the float type of their numeric
+    columns, so each distinct dataset is read once
+    and a file changed on disk is read again. The cache can be used by Reader
+    objects running in several threads at once. Cached datasets are shared
+    and must not be modified.
+    
+    Attributes
+    ----------
+    hits : int
+        Number of datasets returned from the cache.
+    misses : int
+        Number of datasets read from disk.
+    """
+    
+    def __init__(self):
+        """
+        Returns
+        -------
+        None.
+
+        """
+        self._datasets = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def fingerprint(self, path: str) -> Tuple[str, int, int]:
+        """
+        Returns the key of a dataset file within the cache.
+
+        Parameters
+        ----------
+        path : str
+            File path of dataset.
+
+        Returns
+        -------
+        Tuple[str, int, int]
+            Resolved file path, file size and modification time in nanoseconds.
+
+        """
+        resolved = os.path.realpath(path)
+        stat = os.stat(resolved)
+        return (resolved, stat.st_size, stat.st_mtime_ns)
+    
+    def read(self, path: str, floatType: type = None) -> pd.DataFrame:
+        """
+        Returns a csv dataset, reading it from disk only when it is not cached yet.
+
+        Parameters
+        ----------
+        path : str
+            File path of csv dataset.
+        floatType : type, optional
+            Type to which float columns are converted, see readCsv. The default
+            is None, which keeps them float64.
+
+        Returns
+        -------
+        pd.DataFrame
+            Dataset read from file.
+
+        """
+        key = self.fingerprint(path) + (None if floatType is None else np.dtype(floatType).name,)
+        with self._lock:
+            keyLock = self._locks.setdefault(key, threading.Lock())
+        with keyLock:
+            if key in self._datasets:
+                with self._lock:
+                    self.hits += 1
+                return self._datasets[key]
+            df = readCsv(key[0], floatType)
+            self._datasets[key] = df
+            with self._lock:
+                self.misses += 1
+            return df
+    
+    def __len__(self) -> int:
+        return len(self._datasets)
+
+
+class LazyDatasets(Mapping):
+    """
+    Read-only mapping of keys to csv datasets, each of which is read on its
+    first access. Iterating over the keys reads no dataset.
+    """
+    
+    def __init__(self, files: Dict[str, str], load: Callable[[str], pd.DataFrame]):
+        """
+        Parameters
+        ----------
+        files : Dict[str, str]
+            File path of the dataset of each key.
+        load : Callable[[str], pd.DataFrame]
+            Function reading the dataset of a file path.
+
+        Returns
+        -------
+        None.
+
+        """
+        self._files = dict(files)
+        self._load = load
+        self._datasets = {}
+        self._lock = threading.Lock()
+    
+    def __getitem__(self, key: str) -> pd.DataFrame:
+        with self._lock:
+            if key not in self._datasets:
+                self._datasets[key] = self._load(self._files[key])
+            return self._datasets[key]
+    
+    def __iter__(self):
+        return iter(self._files)
+    
+    def __len__(self) -> int:
+        return len(self._files)
+    
+    def isLoaded(self, key: str) -> bool:
+        """
+        Returns True if the dataset of a key has been read.
+        """
+        return key in self._datasets
+
+
 class Writer(object):
     """
     Writes output data in .csv files and plot images in .pdf and .jpg files
@@ -113,10 +478,18 @@ class Writer(object):
     TYPE is the kind of voltage dataset the original raw voltage (EMPTY or ACTUAL recording)
     and DESCRIPTION is value obtained from Reader object passed during intialization.
     
+    Sliding-window analysis of each voltage run, when WINDOW_PERIODS is
+    defined, is stored in:
+        OUT_DIR/DATE(YYYYMMDD)/TIME(HHMMSS)/MHTimeSeries
+    with the names of analyzed voltage data ending in _TimeSeries.csv instead of _Analyzed.csv.
+    
     Analyzed empty field voltage datasets
     (Voltage data collected when coil was filled with no nanoparticles)
     are stored as:
         EMPTY + _ + DESCRIPTION + _ + Analyzed + .csv
+    or, when DATA_EMPTY is a directory of empty field datasets, as:
+        EMPTY_ + FILENAME + _ + DESCRIPTION + _ + Analyzed + .csv
+    where FILENAME is the name of each dataset without its .csv extension.
         
     Graph plot output of Writer object is stored in:
         OUT_DIR/DATE(YYYYMMDD)/TIME(HHMMSS)/MHPlots
@@ -153,22 +526,132 @@ class Writer(object):
         
         self._dict = dictionary
         self._reader = reader
+        self._buildRunIndex()
+        
+    def _buildRunIndex(self) -> None:
+        """Builds a columnar index of the property values of every analyzed
+        voltage run so that plots select their runs with array operations
+        instead of re-scanning the dictionary object for every plot.
+        
+        Only the properties defined for every run are indexed, so a plot of
+        a property missing from any run raises WriterError. The H_MAX mask
+        and the rounded legend columns depend on plotting parameters and are
+        computed once, the first time they are needed.
+
+        Returns
+        -------
+        None.
+
+        """
+        self._runKeys = [key for key in self._dict if not key.startswith("EMPTY")]
+        self._runIndex = {}
+        if len(self._runKeys) > 0:
+            for prop in self._dict.get(self._runKeys[0])[1]:
+                if all(prop in self._dict.get(key)[1] for key in self._runKeys):
+                    self._runIndex[prop] = np.array([self._dict.get(key)[1][prop] for key in self._runKeys])
+        self._hMaxMask = None
+        self._legendGroups = {}
+        
+    def _getHMaxMask(self) -> np.ndarray:
+        """Returns a boolean mask of the runs whose H_MAX property lies
+        within the H_MIN and H_MAX plotting parameters.
+
+        Returns
+        -------
+        np.ndarray
+            Boolean mask aligned with the run index.
+
+        """
+        if self._hMaxMask is None:
+            if len(self._runKeys) == 0:
+                self._hMaxMask = np.zeros(0, dtype=bool)
+            else:
+                hMax = self._runIndex["H_MAX"]
+                self._hMaxMask = (hMax >= self._reader.get("H_MIN", Reader.asFloat)) & (hMax <= self._reader.get("H_MAX", Reader.asFloat))
+        return self._hMaxMask
+    
+    def _getLegendGroups(self, legend: str) -> Tuple[List[Any], List[np.ndarray]]:
+        """Groups the runs within the H_MAX mask by their rounded legend value.
+
+        Parameters
+        ----------
+        legend : str
+            Property parameter of each voltage dataset which serves as graph's legend.
+
+        Returns
+        -------
+        Tuple[List[Any], List[np.ndarray]]
+            Sorted legend labels and, for each label, the positions of its
+            runs in the run index in their original order.
+
+        """
+        if legend not in self._legendGroups:
+            mask = self._getHMaxMask()
+            positions = np.flatnonzero(mask)
+            if legend not in self._runIndex or len(positions) == 0:
+                self._legendGroups[legend] = ([], [])
+            else:
+                rounded = np.array([self._roundNum(value, 2) for value in self._runIndex[legend][positions]])
+                labels, inverse, counts = np.unique(rounded, return_inverse=True, return_counts=True)
+                order = np.argsort(inverse.ravel(), kind="stable")
+                groups = np.split(positions[order], np.cumsum(counts)[:-1])
+                self._legendGroups[legend] = (labels.tolist(), groups)
+        return self._legendGroups[legend]
         
-    def writeData(self) -> None:
+    def writeData(self, progress: ProgressReporter = None) -> None:
         """Writes analyzed data into specified file directory.
 
+        Parameters
+        ----------
+        progress : ProgressReporter, optional
+            Reports the progress of writing as phase "writeData".
+            The default is None, which reports nothing.
+
         Returns
         -------
         None.
 
         """
         path = addDirectory(addDirectory(addDirectory(self._reader.get("OUT_DIR"), self._reader.get("DATE")), self._reader.get("TIME")), "MHAnalyzed")
-        for key in self._dict:
-            self._dict[key][0].to_csv(addDirectory(path, key + '_'+ self._reader.get("DESCRIPTION") + '_Analyzed' + ".csv"), index=False)
+        progress = NULL_PROGRESS if progress is None else progress
+        with progress.phase("writeData", len(self._dict), "runs", self._reader.get("DESCRIPTION")) as phase:
+            for key in self._dict:
+                self._dict[key][0].to_csv(addDirectory(path, key + '_'+ self._reader.get("DESCRIPTION") + '_Analyzed' + ".csv"), index=False)
+                phase.advance()
+    
+    def writeTimeSeries(self, timeSeries: Dict[str, pd.DataFrame], progress: ProgressReporter = None) -> None:
+        """Writes sliding-window analysis of voltage runs into specified file directory.
+
+        Parameters
+        ----------
+        timeSeries : Dict[str, pd.DataFrame]
+            Output of fundmagphase_windows function of `analysis` module for
+            each key of analyzed data.
+        progress : ProgressReporter, optional
+            Reports the progress of writing as phase "writeTimeSeries".
+            The default is None, which reports nothing.
+
+        Returns
+        -------
+        None.
+
+        """
+        path = addDirectory(addDirectory(addDirectory(self._reader.get("OUT_DIR"), self._reader.get("DATE")), self._reader.get("TIME")), "MHTimeSeries")
+        progress = NULL_PROGRESS if progress is None else progress
+        with progress.phase("writeTimeSeries", len(timeSeries), "runs", self._reader.get("DESCRIPTION")) as phase:
+            for key in timeSeries:
+                timeSeries[key].to_csv(addDirectory(path, key + '_'+ self._reader.get("DESCRIPTION") + '_TimeSeries' + ".csv"), index=False)
+                phase.advance()
     
-    def writePlots(self) -> None:
+    def writePlots(self, progress: ProgressReporter = None) -> None:
         """Writes plots of analyzed data into specified file directory.
 
+        Parameters
+        ----------
+        progress : ProgressReporter, optional
+            Reports the progress of writing as phase "writePlots", one unit
+            per plot. The default is None, which reports nothing.
+
         Returns
         -------
         None.
@@ -178,8 +661,23 @@ class Writer(object):
         
         plotList = self._reader.get("PLOT").upper().split("|")
         plotLabel = self._reader.get("PLOT_LABEL").split("|")
-        
-        
+        propertyPlotList = self._reader.get("PROPERTY_PLOT").upper().split("|")
+        propertyPlotLabel = self._reader.get("PROPERTY_PLOT_LABEL").split("|")
+        numOfLegends = len([legend for legend in self._reader.get("LEGEND").split("|") if len(legend.strip()) > 0])
+        progress = NULL_PROGRESS if progress is None else progress
+        with progress.phase("writePlots", len(plotList)*numOfLegends + len(propertyPlotList), "plots",
+                            self._reader.get("DESCRIPTION")) as phase:
+            self._writePlots(anyKey, plotList, plotLabel, propertyPlotList, propertyPlotLabel, phase)
+    
+    def _writePlots(self, anyKey: str, plotList: List[str], plotLabel: List[str], propertyPlotList: List[str],
+                    propertyPlotLabel: List[str], phase: Any) -> None:
+        """Writes every plot of writePlots and advances its phase once per plot.
+
+        Returns
+        -------
+        None.
+
+        """
         for i in range(len(plotList)):
             item = plotList[i].strip()
             try:    
@@ -209,6 +707,7 @@ class Writer(object):
                 legend = legends[j].strip()
                 if len(legend) != 0:    
                     self._plotFunc(legend, x, y, xlabel, ylabel, anyKey)
+                    phase.advance()
                 else:
                     print("Warning: Empty string passed as LEGEND option is ignored. Fix: Remove unnecessary | at the beginning or end of lists or watch for double || symbols")
             
@@ -219,8 +718,6 @@ class Writer(object):
             else:
                 print("Warning: " + string + " -> PLOT_LABEL option value ignored due to no corresponding PLOT option value")
         
-        propertyPlotList = self._reader.get("PROPERTY_PLOT").upper().split("|")
-        propertyPlotLabel = self._reader.get("PROPERTY_PLOT_LABEL").split("|")
         for i in range(len(propertyPlotList)):
             item = propertyPlotList[i].strip()
             try:    
@@ -247,20 +744,14 @@ class Writer(object):
             ylabel = ylabel.strip()
             x = x.strip()
             y = y.strip()
-            valueListX = []
-            valueListY = []
-            for key in self._dict:
-                if key == "EMPTY":
-                    continue
-                try:
-                    valueListX.append(self._dict.get(key)[1][x])
-                except:
-                    raise WriterError(x, "X-parameter not defined properly for PROPERTY_PLOT parameter in configuration file for plot kind: "+x+':'+y)
-                try:
-                    valueListY.append(self._dict.get(key)[1][y])
-                except:
-                    raise WriterError(x, "Y-parameter not defined properly for PROPERTY_PLOT parameter in configuration file for plot kind: "+x+':'+y)
+            if len(self._runKeys) > 0 and x not in self._runIndex:
+                raise WriterError(x, "X-parameter not defined properly for PROPERTY_PLOT parameter in configuration file for plot kind: "+x+':'+y)
+            if len(self._runKeys) > 0 and y not in self._runIndex:
+                raise WriterError(x, "Y-parameter not defined properly for PROPERTY_PLOT parameter in configuration file for plot kind: "+x+':'+y)
+            valueListX = self._runIndex.get(x, np.zeros(0))
+            valueListY = self._runIndex.get(y, np.zeros(0))
             self._plotPropFunc(valueListX, valueListY, x, y, xlabel, ylabel)
+            phase.advance()
             
         for i in range(len(propertyPlotList), len(propertyPlotLabel)):
             string = propertyPlotLabel[i].strip()
@@ -311,6 +802,8 @@ class Writer(object):
         None.
 
         """
+        import matplotlib.pyplot as plt
+        
         path = addDirectory(addDirectory(addDirectory(self._reader.get("OUT_DIR"), self._reader.get("DATE")), self._reader.get("TIME")), "MHPlots")
         plt.figure()
         plt.plot(xlist, ylist, 'ro')
@@ -356,11 +849,11 @@ class Writer(object):
         None.
 
         """
+        import matplotlib.pyplot as plt
+        
         path = addDirectory(addDirectory(addDirectory(self._reader.get("OUT_DIR"), self._reader.get("DATE")), self._reader.get("TIME")), "MHPlots")
         
         fig, ax = plt.subplots()
-        numOfColors = 0
-        dataDict = {}
         
         if legend not in self._dict.get(anyKey)[1]:
             raise WriterError(legend, "Legend parameter LEGEND not defined properly in configuration file")
@@ -369,23 +862,14 @@ class Writer(object):
         elif y not in self._dict.get(anyKey)[0]:
             raise WriterError(y, "Y-parameter not defined properly for PLOT parameter in configuration filefor plot kind: "+x+':'+y)
         
-        for key in self._dict:
-            if key == "EMPTY":
-                continue
-            if self._dict.get(key)[1]["H_MAX"] >= self._reader.get("H_MIN", Reader.asFloat) and self._dict.get(key)[1]["H_MAX"] <= self._reader.get("H_MAX", Reader.asFloat):
-                numOfColors += 1
-                if dataDict.get(self._roundNum(self._dict.get(key)[1][legend], 2)) is None:
-                    dataDict[self._roundNum(self._dict.get(key)[1][legend], 2)] = []
-                data = [self._dict.get(key)[0][x].to_numpy(), self._dict.get(key)[0][y].to_numpy()]
-                dataDict.get(self._roundNum(self._dict.get(key)[1][legend], 2)).append(data)
-        
-        labelList = sorted(list(dataDict.keys()))
+        labelList, groups = self._getLegendGroups(legend)
+        numOfColors = int(np.count_nonzero(self._getHMaxMask()))
         ax.set_prop_cycle(color = [plt.cm.rainbow(i) for i in np.linspace(0, 1, numOfColors)])
         
-        for key in labelList:
-            dataList = dataDict.get(key)
-            for data in dataList:
-                ax.plot(data[0], data[1], label=key)
+        for label, positions in zip(labelList, groups):
+            for position in positions:
+                data = self._dict.get(self._runKeys[position])[0]
+                ax.plot(data[x].to_numpy(), data[y].to_numpy(), label=label)
         
         ax.set_title(self._reader.get("DESCRIPTION") + " LEGEND: " + legend)
         ax.grid(True)
@@ -440,7 +924,16 @@ class Reader(object):
     bool: Serves as a boolean parameter for code legibility. 
     """
     
-    def __init__(self, fileDir: str, delimiter:str = "="):
+    optionalProperties = ("INSTRUMENT", "MEMORY", "PROFILE", "WINDOW_PERIODS", "WINDOW_HOP", "ENGINE",
+                          "FFT_BACKEND", "FFT_WORKERS", "FFT_LENGTH_MODE", "PRECISION", "CALIBRATION_DIR",
+                          "FREQUENCY_CACHE", "DECIMATE", "PROCESSES")
+    """
+    Tuple[str]: Properties which may be left out of the configuration file.
+    They are not written into the output property file when not defined.
+    """
+    
+    def __init__(self, fileDir: str, delimiter:str = "=", overrides: Dict[str, str] = None, cache: 'DatasetCache' = None,
+                 progress: ProgressReporter = None):
         """
         Parameters
         ----------
@@ -448,6 +941,15 @@ class Reader(object):
             File directory of input configuration file
         delimiter : str, optional
             Delimiter of properties in configuration file. The default is "=".
+        overrides : Dict[str, str], optional
+            Property values which replace those of the configuration file,
+            e.g. OUT_DIR given on the command line. The default is None.
+        cache : DatasetCache, optional
+            Cache shared with other Reader objects from which csv datasets
+            are read. The default is None, which reads every dataset from disk.
+        progress : ProgressReporter, optional
+            Reports the progress of reading voltage datasets as phase "read".
+            The default is None, which reports nothing.
 
         Raises
         ------
@@ -463,57 +965,10 @@ class Reader(object):
         None.
 
         """
-        self._data = {"OUT_DIR":"", "BASE_DIR":"", "M_G_FACTOR_FILE":"", "H_G_FACTOR_FILE":"", "DATA_EMPTY":"", "DATA_ACTUAL":"", 
-                     "DESCRIPTION":"", "CUTOFF_FREQ":"", "KNOWN_FREQ":"", "M_OVER_H_REAL_SUB":"", "M_OVER_H_IMAG_SUB":"", "V_H_OFFSET":"",
-                     "M_OVER_H_CALIB":"", "PM_PH_DIFF_PHASE_ADJ":"", "M_OVER_H0_SUB":"", "NUM_PERIOD":"", "NON_LINEAR_SUB":"",
-                     "H_PHASE_REAL_SUB":"", "H_PHASE_IMAG_SUB":"","BEGIN_TIME":"", "WITH_EMPTY":"", "TEMP_DIR":"", "H_MIN":"", "POLARITY":"",
-                     "H_MAX":"", "LEGEND":"","PLOT":"", "PLOT_LABEL":"", "PROPERTY_PLOT":"", "PROPERTY_PLOT_LABEL": "", "TIME_DIR": "", "READ_TIME":""}
-        currentDate = datetime.datetime.now()
-        date = str(currentDate.strftime("%Y%m%d"))
-        time = str(currentDate.strftime('%H%M%S'))
-        self._data["DATE"] = date
-        self._data["TIME"] = time
-        try:    
-            file = open(fileDir, 'r')
-        except OSError:
-            raise ReaderError(fileDir, "Configuration file does not exist or wrongly specified")
-        
-        if delimiter == "|":
-            raise ReaderError("|", "This symbol cannot serve as a delimiter for the Reader object")
+        self._cache = cache
+        self._readConfigFile(fileDir, delimiter, overrides=overrides)
         
-        for line in file:
-            newLine = None
-            for index, letter in enumerate(line):
-                if letter == "#":
-                    newLine = line[:index]
-                    break
-            
-            if newLine is None:
-                line = line.strip()
-            else:
-                line = newLine.strip()
-                
-            try:
-                key, value = line.split(delimiter)
-                key = key.strip().upper()
-                value = value.strip()
-                if key in self._data:
-                    self._data[key] = value
-                else:
-                    file.close()
-                    raise ReaderError(key, "Property is not poorly defined or not necessary")
-            except ValueError:
-                if len(line) == 0:
-                    continue
-                elif len(line) > 0:
-                    file.close()
-                    raise ReaderError(line, "Line could not be read from file")
-                else:
-                    file.close()
-                    raise ReaderError(line, "Unknown unexpected error") 
-                
-                
-        file.close()
+        self._analysisConfig = AnalysisConfig.fromProperties(self._data)
         
         # All directories are converted ito OS-specific directories
         self._data["OUT_DIR"] = Path(self.get("OUT_DIR"))
@@ -535,13 +990,13 @@ class Reader(object):
             raise ReaderError(self.get("BASE_DIR"), "BASE_DIR does not exist.")
             
         try:
-            self._data["H_G_FACTOR_DATAFRAME"] = pd.read_csv(os.path.join(self.get("BASE_DIR"), self.get("H_G_FACTOR_FILE")))
+            self._data["H_G_FACTOR_DATAFRAME"] = self._readCsv(os.path.join(self.get("BASE_DIR"), self.get("H_G_FACTOR_FILE")))
         except:
             raise ReaderError(self.get("H_G_FACTOR_FILE"),
                               "H_G_FACTOR_FILE not defined properly or does not exist. File read from directory: " + os.path.join(self.get("BASE_DIR"), self.get("H_G_FACTOR_FILE")))
 
         try:
-            self._data["M_G_FACTOR_DATAFRAME"] = pd.read_csv(os.path.join(self.get("BASE_DIR"), self.get("M_G_FACTOR_FILE")))
+            self._data["M_G_FACTOR_DATAFRAME"] = self._readCsv(os.path.join(self.get("BASE_DIR"), self.get("M_G_FACTOR_FILE")))
         except:
             raise ReaderError(self.get("M_G_FACTOR_FILE"),
                               "M_G_FACTOR_FILE not defined properly or does not exist. File read from directory: " + os.path.join(self.get("BASE_DIR"), self.get("M_G_FACTOR_FILE")))
@@ -561,17 +1016,33 @@ class Reader(object):
         self._data["WITH_EMPTY"] = getBool(self.get("WITH_EMPTY"))
         self._data["NON_LINEAR_SUB"] = getBool(self.get("NON_LINEAR_SUB"))
         self._data["READ_TIME"] = getBool(self.get("READ_TIME"))
+        # Voltage datasets are held in single precision when PRECISION is SINGLE
+        voltageType = np.float32 if self._analysisConfig.precision == "single" else None
+        self._data["DICT_DATAFRAME_EMPTY"] = {}
+        self._data["DICT_FILE_EMPTY"] = {}
         if (self._data["WITH_EMPTY"]):
-            try:
-               df = pd.read_csv(Path(os.path.join(self.get("BASE_DIR"), self.get("DATA_EMPTY"))))
-            except:
-                raise ReaderError(self.get("DATA_EMPTY"),
-                                  "DATA_EMPTY file not defined properly or does not exist. File read from directory: " + os.path.join(self.get("BASE_DIR"), self.get("DATA_EMPTY")))
-            
-            if substringInList("Voltage(CH1)", df.columns):
-                self._data["DATAFRAME_EMPTY"] = df
+            emptyPath = os.path.join(self.get("BASE_DIR"), self.get("DATA_EMPTY"))
+            # A directory of empty field datasets holds one capture per drive amplitude
+            if os.path.isdir(emptyPath):
+                emptyFiles = {"EMPTY_" + os.path.splitext(file)[0]: os.path.join(emptyPath, file)
+                              for file in sorted(os.listdir(emptyPath)) if ".csv" in file}
+                if len(emptyFiles) == 0:
+                    raise ReaderError(self.get("DATA_EMPTY"), "DATA_EMPTY directory contains no expected voltage data files")
             else:
-                raise ReaderError(self.get("DATA_EMPTY"), "DATA_EMPTY file is not of expected voltage dataset kind")
+                emptyFiles = {"EMPTY": emptyPath}
+            # Only the headers are checked here. The datasets are read when first
+            # analyzed, so those loaded from calibration artifacts are never read
+            for key, file in emptyFiles.items():
+                try:
+                   columns = pd.read_csv(file, nrows=0).columns
+                except:
+                    raise ReaderError(self.get("DATA_EMPTY"),
+                                      "DATA_EMPTY file not defined properly or does not exist. File read from directory: " + file)
+                
+                if not substringInList("Voltage(CH1)", columns):
+                    raise ReaderError(self.get("DATA_EMPTY"), "DATA_EMPTY file is not of expected voltage dataset kind")
+            self._data["DICT_DATAFRAME_EMPTY"] = LazyDatasets(emptyFiles, lambda file: self._readEmpty(file, voltageType))
+            self._data["DICT_FILE_EMPTY"] = emptyFiles
        
         path = Path(os.path.join(self.get("BASE_DIR"), self.get("DATA_ACTUAL")))
         
@@ -580,14 +1051,17 @@ class Reader(object):
         if not os.path.exists(path):
             raise ReaderError(path, "Combined BASE_DIR + DATA_ACTUAL path does not exist.")
         
-        for file in os.listdir(path):
-            if ".csv" in file:
+        files = [file for file in os.listdir(path) if ".csv" in file]
+        progress = NULL_PROGRESS if progress is None else progress
+        with progress.phase("read", len(files), "files", self.get("DESCRIPTION")) as phase:
+            for file in files:
                 readTempData = True
-                df = pd.read_csv(os.path.join(path, file))
+                df = self._readCsv(os.path.join(path, file), voltageType)
                 if not substringInList("Voltage(CH1)", df.columns):
                     raise ReaderError(file, "Voltage dataset of such filename in DATA_ACTUAL is not of expected voltage dataset kind. Reason: Does not have appropriate headers for analysis. Eg: 'Voltage(CH1)'")
                 else:
                     self._data["DICT_DATAFRAME_ACTUAL"][file.rstrip(".csv")] = df
+                phase.advance(1, os.path.getsize(os.path.join(path, file)))
                 
         if not readTempData:
             raise ReaderError(self.get("DATA_ACTUAL"), "DATA_ACTUAL path contains no expected voltage data files")
@@ -600,7 +1074,7 @@ class Reader(object):
         
         for file in os.listdir(tempPath):
             if ".csv" in file:
-                df = pd.read_csv(os.path.join(tempPath, file))
+                df = self._readCsv(os.path.join(tempPath, file))
                 regex = re.compile(r'\d{14}')
                 
                 try:
@@ -619,7 +1093,7 @@ class Reader(object):
                         self._data["DICT_DATAFRAME_TEMPERATURE"]["TEMP_V_RUN"][dateTime] = {}
                     self._data["DICT_DATAFRAME_TEMPERATURE"]["TEMP_V_RUN"][dateTime][collectionKind] = df
                 elif substringInList("Time", df.columns) and (substringInList("Temp", df.columns) or substringInList("Temperature", df.columns)):
-                    if datetime not in self._data["DICT_DATAFRAME_TEMPERATURE"]["TEMP_V_TIME"]:
+                    if dateTime not in self._data["DICT_DATAFRAME_TEMPERATURE"]["TEMP_V_TIME"]:
                         self._data["DICT_DATAFRAME_TEMPERATURE"]["TEMP_V_TIME"][dateTime] = {}
                     self._data["DICT_DATAFRAME_TEMPERATURE"]["TEMP_V_TIME"][dateTime][collectionKind] = df
                 else:
@@ -635,7 +1109,7 @@ class Reader(object):
             
             for file in os.listdir(timePath):
                 if ".csv" in file:
-                    df = pd.read_csv(os.path.join(timePath, file))
+                    df = self._readCsv(os.path.join(timePath, file))
                     regex = re.compile(r'\d{14}')
                     
                     try:
@@ -655,20 +1129,451 @@ class Reader(object):
                         self._data["DICT_DATAFRAME_TIME"][dateTime][collectionKind] = df
                     else:
                         raise ReaderError(file, "Time file of such filename in TIME_DIR is not an expected csv dataset. Reason: Does not have appropriate headers for analysis. Eg: 'Data' or 'Time'")
+        
+        # Temp-V-Run and time datasets are only indexed by row, so their values
+        # are kept as contiguous arrays keyed by (dateTime, collectionKind)
+        self._tempRunArrays = {}
+        for dateTime, kinds in self._data["DICT_DATAFRAME_TEMPERATURE"]["TEMP_V_RUN"].items():
+            for kind, df in kinds.items():
+                self._tempRunArrays[(dateTime, kind)] = np.ascontiguousarray(df.iloc[:, 1].to_numpy())
+        self._timeArrays = {}
+        for dateTime, kinds in self._data.get("DICT_DATAFRAME_TIME", {}).items():
+            for kind, df in kinds.items():
+                self._timeArrays[(dateTime, kind)] = np.ascontiguousarray(df.iloc[:, 1].to_numpy())
+        self._tempTimeArrays = {}
+        for dateTime, kinds in self._data["DICT_DATAFRAME_TEMPERATURE"]["TEMP_V_TIME"].items():
+            for kind, df in kinds.items():
+                timeColumn = next((column for column in df.columns if "time" in column.lower() and "temp" not in column.lower()), df.columns[0])
+                tempColumn = next((column for column in df.columns if "temp" in column.lower()), df.columns[1])
+                times = df[timeColumn].to_numpy(dtype=float)
+                order = np.argsort(times, kind="stable")
+                self._tempTimeArrays[(dateTime, kind)] = (np.ascontiguousarray(times[order]),
+                                                          np.ascontiguousarray(df[tempColumn].to_numpy(dtype=float)[order]))
     
-    def get(self, prop: str, kind: bool=False) -> Any:
+    def _readCsv(self, path: str, floatType: type = None) -> pd.DataFrame:
         """
-        Returns a property stored within the Reader object.
+        Reads a csv dataset from disk or from the DatasetCache object of the Reader.
 
         Parameters
         ----------
-        prop : str
-            Property to be returned.
-        kind : bool, optional
-            Returns property as a string when True. The default is False.
+        path : str
+            File path of csv dataset.
+        floatType : type, optional
+            Type to which float columns are converted, see readCsv. The default
+            is None, which keeps them float64.
 
-        Raises
-        ------
+        Returns
+        -------
+        pd.DataFrame
+            Dataset read from file. It may be shared with other Reader objects
+            and must not be modified.
+
+        """
+        if self._cache is None:
+            return readCsv(path, floatType)
+        return self._cache.read(path, floatType)
+    
+    def _readEmpty(self, path: str, floatType: type = None) -> pd.DataFrame:
+        """
+        Reads an empty field voltage dataset of DICT_DATAFRAME_EMPTY.
+
+        Parameters
+        ----------
+        path : str
+            File path of dataset.
+        floatType : type, optional
+            Type to which float columns are converted, see readCsv. The default
+            is None, which keeps them float64.
+
+        Raises
+        ------
+        ReaderError
+            Raised when the dataset cannot be read.
+
+        Returns
+        -------
+        pd.DataFrame
+            Dataset read from file.
+
+        """
+        try:
+            return self._readCsv(Path(path), floatType)
+        except Exception:
+            raise ReaderError(self.get("DATA_EMPTY"),
+                              "DATA_EMPTY file not defined properly or does not exist. File read from directory: " + path)
+    
+    def _readConfigFile(self, fileDir: str, delimiter: str, errors: List[ReaderError] = None, overrides: Dict[str, str] = None) -> None:
+        """
+        Reads the properties of the configuration file into the Reader object.
+
+        Parameters
+        ----------
+        fileDir : str
+            File directory of input configuration file
+        delimiter : str
+            Delimiter of properties in configuration file.
+        errors : List[ReaderError], optional
+            When given, errors of single lines are appended to this list and
+            reading continues instead of raising the first error.
+            The default is None.
+        overrides : Dict[str, str], optional
+            Property values which replace those of the configuration file.
+            The default is None.
+
+        Raises
+        ------
+        ReaderError
+            Raised when:
+                * Configuration file does not exist.
+                * Delimiter is not accepted.
+                * Any property not needed by program is defined and errors is None.
+                * Any non-empty line which is not a comment is defined without a delimiter and errors is None.
+
+        Returns
+        -------
+        None.
+
+        """
+        self._data = {"OUT_DIR":"", "BASE_DIR":"", "M_G_FACTOR_FILE":"", "H_G_FACTOR_FILE":"", "DATA_EMPTY":"", "DATA_ACTUAL":"", 
+                     "DESCRIPTION":"", "CUTOFF_FREQ":"", "KNOWN_FREQ":"", "M_OVER_H_REAL_SUB":"", "M_OVER_H_IMAG_SUB":"", "V_H_OFFSET":"",
+                     "M_OVER_H_CALIB":"", "PM_PH_DIFF_PHASE_ADJ":"", "M_OVER_H0_SUB":"", "NUM_PERIOD":"", "NON_LINEAR_SUB":"",
+                     "H_PHASE_REAL_SUB":"", "H_PHASE_IMAG_SUB":"","BEGIN_TIME":"", "WITH_EMPTY":"", "TEMP_DIR":"", "H_MIN":"", "POLARITY":"",
+                     "H_MAX":"", "LEGEND":"","PLOT":"", "PLOT_LABEL":"", "PROPERTY_PLOT":"", "PROPERTY_PLOT_LABEL": "", "TIME_DIR": "", "READ_TIME":""}
+        for key in self.optionalProperties:
+            self._data[key] = ""
+        currentDate = datetime.datetime.now()
+        date = str(currentDate.strftime("%Y%m%d"))
+        time = str(currentDate.strftime('%H%M%S'))
+        self._data["DATE"] = date
+        self._data["TIME"] = time
+        try:    
+            file = open(fileDir, 'r')
+        except OSError:
+            raise ReaderError(fileDir, "Configuration file does not exist or wrongly specified")
+        
+        if delimiter == "|":
+            raise ReaderError("|", "This symbol cannot serve as a delimiter for the Reader object")
+        
+        for line in file:
+            newLine = None
+            for index, letter in enumerate(line):
+                if letter == "#":
+                    newLine = line[:index]
+                    break
+            
+            if newLine is None:
+                line = line.strip()
+            else:
+                line = newLine.strip()
+                
+            try:
+                key, value = line.split(delimiter)
+                key = key.strip().upper()
+                value = value.strip()
+                if key in self._data:
+                    self._data[key] = value
+                elif errors is not None:
+                    errors.append(ReaderError(key, "Property is not poorly defined or not necessary"))
+                else:
+                    file.close()
+                    raise ReaderError(key, "Property is not poorly defined or not necessary")
+            except ValueError:
+                if len(line) == 0:
+                    continue
+                elif errors is not None:
+                    errors.append(ReaderError(line, "Line could not be read from file"))
+                elif len(line) > 0:
+                    file.close()
+                    raise ReaderError(line, "Line could not be read from file")
+                else:
+                    file.close()
+                    raise ReaderError(line, "Unknown unexpected error") 
+                
+                
+        file.close()
+        
+        if overrides is not None:
+            for key, value in overrides.items():
+                key = key.strip().upper()
+                if key in self._data:
+                    self._data[key] = str(value).strip()
+                elif errors is not None:
+                    errors.append(ReaderError(key, "Property is not poorly defined or not necessary"))
+                else:
+                    raise ReaderError(key, "Property is not poorly defined or not necessary")
+    
+    @classmethod
+    def readProperties(cls, fileDir: str, delimiter: str = "=", overrides: Dict[str, str] = None) -> Dict[str, str]:
+        """
+        Returns the properties of a configuration file without loading any dataset.
+
+        Parameters
+        ----------
+        fileDir : str
+            File directory of input configuration file
+        delimiter : str, optional
+            Delimiter of properties in configuration file. The default is "=".
+        overrides : Dict[str, str], optional
+            Property values which replace those of the configuration file.
+            The default is None.
+
+        Raises
+        ------
+        ReaderError
+            Raised for the same configuration file errors as the Reader object.
+
+        Returns
+        -------
+        Dict[str, str]
+            Raw property values. Undefined properties are empty strings.
+
+        """
+        reader = cls.__new__(cls)
+        reader._readConfigFile(fileDir, delimiter, overrides=overrides)
+        return reader._data
+    
+    @staticmethod
+    def getProfileStages(properties: Dict[str, str]) -> List[str]:
+        """
+        Returns the stages listed by the PROFILE property.
+        
+        Accepted PROFILE values are of nature:
+            STAGE | STAGE | ... | STAGE
+        where STAGE is one of "read", "analyze", "write" or "plot".
+
+        Parameters
+        ----------
+        properties : Dict[str, str]
+            Raw property values, e.g. returned by readProperties.
+
+        Raises
+        ------
+        ReaderError
+            Raised when a stage is not accepted.
+
+        Returns
+        -------
+        List[str]
+            Stages in lower case. Empty when PROFILE is not defined.
+
+        """
+        from instrumentation import Profiler
+        
+        stages = [stage.strip().lower() for stage in str(properties.get("PROFILE", "")).split("|") if len(stage.strip()) > 0]
+        for stage in stages:
+            if stage not in Profiler.STAGES:
+                raise ReaderError("PROFILE", "Stage " + stage + " cannot be profiled. Accepted stages: " + ", ".join(Profiler.STAGES))
+        return stages
+    
+    @classmethod
+    def validate(cls, fileDir: str, delimiter: str = "=", overrides: Dict[str, str] = None) -> List[ReaderError]:
+        """
+        Checks a configuration file and the datasets it refers to without
+        loading any dataset.
+        
+        Only the headers of csv files are read and file names are parsed.
+        Every voltage run of DATA_ACTUAL is cross-checked against the
+        Temp-V-Run rows of TEMP_DIR and, when READ_TIME is TRUE, against the
+        start times of TIME_DIR. Rows of Temp-V-Run and time files are counted
+        without being parsed. No directory is created and every problem found
+        is reported instead of only the first one.
+
+        Parameters
+        ----------
+        fileDir : str
+            File directory of input configuration file
+        delimiter : str, optional
+            Delimiter of properties in configuration file. The default is "=".
+        overrides : Dict[str, str], optional
+            Property values which replace those of the configuration file.
+            The default is None.
+
+        Returns
+        -------
+        List[ReaderError]
+            Every problem found. The list is empty when the configuration
+            and datasets are consistent.
+
+        """
+        errors = []
+        reader = cls.__new__(cls)
+        try:
+            reader._readConfigFile(fileDir, delimiter, errors, overrides)
+        except ReaderError as error:
+            return [error]
+        
+        data = reader._data
+        try:
+            AnalysisConfig.fromProperties(data)
+        except ReaderError as error:
+            errors.append(error)
+        try:
+            cls.getProfileStages(data)
+        except ReaderError as error:
+            errors.append(error)
+        
+        withEmpty = getBool(data["WITH_EMPTY"])
+        readTime = getBool(data["READ_TIME"])
+        required = ["OUT_DIR", "BASE_DIR", "M_G_FACTOR_FILE", "H_G_FACTOR_FILE", "DATA_ACTUAL", "TEMP_DIR"]
+        if withEmpty:
+            required.append("DATA_EMPTY")
+        if readTime:
+            required.append("TIME_DIR")
+        for prop in required:
+            if len(data[prop]) == 0:
+                errors.append(ReaderError(prop, "Property does not exist in configuration file"))
+        
+        if len(data["OUT_DIR"]) > 0 and not os.path.isdir(Path(data["OUT_DIR"])):
+            if not os.path.isdir(os.path.abspath(os.path.join(Path(data["OUT_DIR"]), '..'))):
+                errors.append(ReaderError(Path(data["OUT_DIR"]), "OUT_DIR does not exist."))
+        baseDir = Path(data["BASE_DIR"])
+        if len(data["BASE_DIR"]) > 0 and not os.path.isdir(baseDir):
+            errors.append(ReaderError(baseDir, "BASE_DIR does not exist."))
+            return errors
+        
+        def readHeader(path: str, prop: str, message: str) -> List[str]:
+            try:
+                return list(pd.read_csv(path, nrows=0).columns)
+            except Exception:
+                errors.append(ReaderError(prop, message + path))
+                return None
+        
+        for prop, needsBoth in (("M_G_FACTOR_FILE", False), ("H_G_FACTOR_FILE", True)):
+            if len(data[prop]) == 0:
+                continue
+            path = os.path.join(baseDir, Path(data[prop]))
+            columns = readHeader(path, prop, prop + " not defined properly or does not exist. File read from directory: ")
+            if columns is None:
+                continue
+            hasFrequency = substringInList("Frequency", columns)
+            hasGFactor = substringInList("gfactor", columns)
+            if not ((hasFrequency and hasGFactor) if needsBoth else (hasFrequency or hasGFactor)):
+                errors.append(ReaderError(path, "G-Factor dataset in " + prop + " is not of expected dataset kind. Reason: Does not have appropriate headers for analysis. Eg: 'Frequency'"))
+        
+        if withEmpty and len(data["DATA_EMPTY"]) > 0:
+            emptyPath = os.path.join(baseDir, Path(data["DATA_EMPTY"]))
+            emptyFiles = [emptyPath]
+            if os.path.isdir(emptyPath):
+                emptyFiles = [os.path.join(emptyPath, file) for file in sorted(os.listdir(emptyPath)) if ".csv" in file]
+                if len(emptyFiles) == 0:
+                    errors.append(ReaderError(emptyPath, "DATA_EMPTY directory contains no expected voltage data files"))
+            for path in emptyFiles:
+                columns = readHeader(path, "DATA_EMPTY", "DATA_EMPTY file not defined properly or does not exist. File read from directory: ")
+                if columns is not None and not substringInList("Voltage(CH1)", columns):
+                    errors.append(ReaderError(path, "DATA_EMPTY file is not of expected voltage dataset kind"))
+        
+        runs = []
+        fileNameMessage = "Voltage file name is not in the right format. Expected: 'voltageDataScopeRun'+ '(<RUN_NUM>)' + <DATE> + <TIME> + 'CollectionKind' + <KIND_NUM> + '.csv' where 'CollectionKind' + <KIND_NUM> is optional for backwards compatibility"
+        actualPath = Path(os.path.join(baseDir, Path(data["DATA_ACTUAL"])))
+        if len(data["DATA_ACTUAL"]) > 0 and not os.path.exists(actualPath):
+            errors.append(ReaderError(actualPath, "Combined BASE_DIR + DATA_ACTUAL path does not exist."))
+        elif len(data["DATA_ACTUAL"]) > 0:
+            for file in sorted(os.listdir(actualPath)):
+                if ".csv" not in file:
+                    continue
+                columns = readHeader(os.path.join(actualPath, file), file, "Voltage dataset could not be read. File read from directory: ")
+                if columns is not None and not substringInList("Voltage(CH1)", columns):
+                    errors.append(ReaderError(file, "Voltage dataset of such filename in DATA_ACTUAL is not of expected voltage dataset kind. Reason: Does not have appropriate headers for analysis. Eg: 'Voltage(CH1)'"))
+                key = file.rstrip(".csv")
+                if not key.startswith("voltageDataScopeRun"):
+                    errors.append(ReaderError(file, "Voltage dataset file name does not start with 'voltageDataScopeRun' and is not analyzed"))
+                    continue
+                dateTime = re.findall(r'\d{14}', key)
+                runNum = re.findall(r'\W\d+\W', key)
+                if len(dateTime) == 0 or len(runNum) == 0:
+                    errors.append(ReaderError(key, fileNameMessage))
+                    continue
+                kind = re.findall(r'CollectionKind\d+', key)
+                runs.append((key, dateTime[0], int(kind[0].lstrip('CollectionKind')) if len(kind) > 0 else -1, int(runNum[0].strip('()'))))
+            if not any(".csv" in file for file in os.listdir(actualPath)):
+                errors.append(ReaderError(data["DATA_ACTUAL"], "DATA_ACTUAL path contains no expected voltage data files"))
+        
+        def readGroups(prop: str, label: str, classify) -> Dict[Tuple[str, int], int]:
+            groups = {}
+            path = Path(os.path.join(baseDir, Path(data[prop])))
+            if not os.path.exists(path):
+                errors.append(ReaderError(path, "Combined BASE_DIR + " + prop + " path does not exist."))
+                return groups
+            for file in sorted(os.listdir(path)):
+                if ".csv" not in file:
+                    continue
+                columns = readHeader(os.path.join(path, file), file, label + " file could not be read. File read from directory: ")
+                if columns is None:
+                    continue
+                dateTime = re.findall(r'\d{14}', file)
+                if len(dateTime) == 0:
+                    errors.append(ReaderError(file, label + " file of such filename in " + prop + " is not an expected csv dataset. Expected file name: <NAME> + <DATE> + <TIME> + 'CollectionKind' + <KIND_NUM> + '.csv'"))
+                    continue
+                kind = re.findall(r'CollectionKind\d+', file)
+                kind = int(kind[0].lstrip('CollectionKind')) if len(kind) > 0 else -1
+                isGroup = classify(columns)
+                if isGroup is None:
+                    errors.append(ReaderError(file, label + " file of such filename in " + prop + " is not an expected csv dataset. Reason: Does not have appropriate headers for analysis."))
+                elif isGroup:
+                    groups[(dateTime[0], kind)] = cls._countRows(os.path.join(path, file))
+            return groups
+        
+        def classifyTemp(columns: List[str]) -> bool:
+            hasTemp = substringInList("Temp", columns) or substringInList("Temperature", columns)
+            if (substringInList("Oscilloscope Run", columns) or substringInList("Run", columns)) and hasTemp:
+                return True
+            elif substringInList("Time", columns) and hasTemp:
+                return False
+            return None
+        
+        def classifyTime(columns: List[str]) -> bool:
+            if substringInList("Data", columns) and substringInList("Time", columns):
+                return True
+            return None
+        
+        tempGroups = readGroups("TEMP_DIR", "Temperature", classifyTemp) if len(data["TEMP_DIR"]) > 0 else {}
+        timeGroups = readGroups("TIME_DIR", "Time", classifyTime) if readTime and len(data["TIME_DIR"]) > 0 else {}
+        
+        for key, dateTime, kind, runNum in runs:
+            if len(data["TEMP_DIR"]) > 0:
+                if (dateTime, kind) not in tempGroups:
+                    errors.append(ReaderError(key, "Temp-V-Run Series data of dateTime " + dateTime + " and 'CollectionKind' " + str(kind) + " not added to TEMP_DIR."))
+                elif not -tempGroups[(dateTime, kind)] <= runNum - 1 < tempGroups[(dateTime, kind)]:
+                    errors.append(ReaderError(key, "Temp-V-Run Series data of this date-time value does not contain temperature value for Run " + str(runNum)))
+            if readTime and len(data["TIME_DIR"]) > 0:
+                if (dateTime, kind) not in timeGroups:
+                    errors.append(ReaderError(key, "Time data of dateTime " + dateTime + " and 'CollectionKind' " + str(kind) + " not added to TIME_DIR."))
+                elif not -timeGroups[(dateTime, kind)] <= (2 * runNum) + 2 < timeGroups[(dateTime, kind)]:
+                    errors.append(ReaderError(key, "Time data of this date-time value does not contain start time value for Run " + str(runNum)))
+        return errors
+    
+    @staticmethod
+    def _countRows(path: str) -> int:
+        """
+        Returns the number of data rows of a csv file without parsing it.
+
+        Parameters
+        ----------
+        path : str
+            File path of csv file with a header line.
+
+        Returns
+        -------
+        int
+            Number of non-empty lines after the header line.
+
+        """
+        with open(path, 'r') as file:
+            return max(sum(1 for line in file if line.strip()) - 1, 0)
+    
+    def get(self, prop: str, kind: bool=False) -> Any:
+        """
+        Returns a property stored within the Reader object.
+
+        Parameters
+        ----------
+        prop : str
+            Property to be returned.
+        kind : bool, optional
+            Returns property as a string when True. The default is False.
+
+        Raises
+        ------
         ReaderError
             Raised when:
                 * Property does not exist.
@@ -681,6 +1586,9 @@ class Reader(object):
 
         """
         value = None
+        if prop == "DATAFRAME_EMPTY" and len(self._data.get("DICT_DATAFRAME_EMPTY", {})) > 0:
+            # The first empty field dataset, read on first access
+            return next(iter(self._data["DICT_DATAFRAME_EMPTY"].values()))
         try:
             value = self._data[prop]
         except KeyError:
@@ -696,6 +1604,19 @@ class Reader(object):
         else:
             return value
     
+    def getAnalysisConfig(self) -> AnalysisConfig:
+        """
+        Returns the analysis parameters parsed and validated when the
+        configuration file was loaded.
+
+        Returns
+        -------
+        AnalysisConfig
+            Immutable analysis parameters.
+
+        """
+        return self._analysisConfig
+    
     def getRunTemp(self, filename: str) -> float:
         """
         Returns the a voltage run dataset's temperature.
@@ -729,10 +1650,10 @@ class Reader(object):
         except:
             kind = -1
             
-        tempDf = None
+        temperatures = None
         if dateTime in self._data["DICT_DATAFRAME_TEMPERATURE"]["TEMP_V_RUN"]:
             if kind in self._data["DICT_DATAFRAME_TEMPERATURE"]["TEMP_V_RUN"][dateTime]:
-                tempDf = self._data["DICT_DATAFRAME_TEMPERATURE"]["TEMP_V_RUN"][dateTime].get(kind)
+                temperatures = self._tempRunArrays[(dateTime, kind)]
             else:
                 raise ReaderError(kind, "Temp-V-Run Series data of dateTime "+ dateTime +" does not have this value of 'CollectionKind' added to TEMP_DIR.")
         else:
@@ -745,7 +1666,7 @@ class Reader(object):
             raise ReaderError(filename, "Voltage file name is not in the right format. Expected: 'voltageDataScopeRun'+ '(<RUN_NUM>)' + <DATE> + <TIME> + 'CollectionKind' + <KIND_NUM> + '.csv' where 'CollectionKind' + <KIND_NUM> is optional for backwards compatibility")
         
         try:
-            return tempDf.iloc[value - 1 , 1]
+            return temperatures[value - 1]
         except IndexError:
             raise ReaderError(dateTime, "Temp-V-Run Series data of this date-time value does not contain temperature value for Run "+str(value))
                 
@@ -796,10 +1717,10 @@ class Reader(object):
         except:
             collectionKind = -1
             
-        timeDf = None
+        times = None
         if dateTime in self._data["DICT_DATAFRAME_TIME"]:
             if collectionKind in self._data["DICT_DATAFRAME_TIME"][dateTime]:
-                timeDf = self._data["DICT_DATAFRAME_TIME"][dateTime].get(collectionKind)
+                times = self._timeArrays[(dateTime, collectionKind)]
             else:
                 raise ReaderError(collectionKind, "Time-V-Run Series data of dateTime "+ dateTime +" does not have this value of 'CollectionKind' added to TIME_DIR.")
         else:
@@ -808,11 +1729,11 @@ class Reader(object):
         if kind == "program":
             if relative:
                 return 0
-            return timeDf.iloc[0,1]
+            return times[0]
         elif kind == "opsens":
             if relative:
-                return timeDf.iloc[2,1]
-            return timeDf.iloc[1,1]
+                return times[2]
+            return times[1]
         elif kind == "oscilloscope":
             regex = re.compile(r'\W\d+\W')
             
@@ -822,17 +1743,132 @@ class Reader(object):
                 raise ReaderError(filename, "Voltage file name is not in the right format. Expected: 'voltageDataScopeRun'+ '(<RUN_NUM>)' + <DATE> + <TIME> + 'CollectionKind' + <KIND_NUM> + '.csv' where 'CollectionKind' + <KIND_NUM> is optional for backwards compatibility")
             if relative:
                 try:
-                    return timeDf.iloc[(2 * value) + 2, 1]
+                    return times[(2 * value) + 2]
                 except IndexError:
                     raise ReaderError(dateTime, "Time data of this date-time value does not contain start time value for Run "+str(value))
             else:
                try:
-                    return timeDf.iloc[(2 * value) + 1, 1]
+                    return times[(2 * value) + 1]
                except IndexError:
                     raise ReaderError(dateTime, "Time data of this date-time value does not contain start time value for Run "+str(value))
         else:
             raise ReaderError(kind, "Reader.getTime() `kind` option is not an expected value.")
         
+    def getRunGroup(self, filename: str) -> Tuple[str, int]:
+        """
+        Returns the date-time value and collection kind of a voltage run,
+        which key its Temp-V-Run and time data.
+
+        Parameters
+        ----------
+        filename : str
+            Filename of voltage run dataset.
+
+        Raises
+        ------
+        ReaderError
+            Raised when:
+                * When name of voltage run is not in the right format.
+
+        Returns
+        -------
+        Tuple[str, int]
+            Date-time value and collection kind of voltage run. The collection
+            kind is -1 when the filename does not state it.
+
+        """
+        regex = re.compile(r'\d{14}')
+        try:
+            dateTime = regex.findall(filename)[0]
+        except IndexError:
+            raise ReaderError(filename, "Voltage file name is not in the right format. Expected: 'voltageDataScopeRun'+ '(<RUN_NUM>)' + <DATE> + <TIME> + 'CollectionKind' + <KIND_NUM> + '.csv' where 'CollectionKind' + <KIND_NUM> is optional for backwards compatibility")
+        
+        regex = re.compile(r'CollectionKind\d+')
+        try:
+            collectionKind = int(regex.findall(filename)[0].lstrip('CollectionKind'))
+        except:
+            collectionKind = -1
+        return dateTime, collectionKind
+    
+    def getRunTemps(self, dateTime: str, collectionKind: int, runNums: List[int]) -> np.ndarray:
+        """
+        Returns the temperatures of many voltage runs of one collection in one call.
+
+        Parameters
+        ----------
+        dateTime : str
+            Date-time value of the collection.
+        collectionKind : int
+            Collection kind of the collection. -1 when not stated in filenames.
+        runNums : List[int]
+            Run numbers of voltage runs.
+
+        Raises
+        ------
+        ReaderError
+            Raised when:
+                * When Temp-V-Run Series data of the collection is not added to TEMP_DIR.
+                * When Temp-V-Run Series data does not contain the temperature of a run.
+
+        Returns
+        -------
+        np.ndarray
+            Temperature during each voltage run during data collection.
+
+        """
+        if (dateTime, collectionKind) not in self._tempRunArrays:
+            raise ReaderError(dateTime, "Temp-V-Run Series data of this date-time value and 'CollectionKind' " + str(collectionKind) + " not added to TEMP_DIR.")
+        temperatures = self._tempRunArrays[(dateTime, collectionKind)]
+        runNums = np.asarray(runNums, dtype=np.intp)
+        indices = runNums - 1
+        missing = (indices >= len(temperatures)) | (indices < -len(temperatures))
+        if np.any(missing):
+            raise ReaderError(dateTime, "Temp-V-Run Series data of this date-time value does not contain temperature value for Run " + ", ".join(str(run) for run in runNums[missing]))
+        return temperatures[indices]
+    
+    def getTimes(self, dateTime: str, collectionKind: int, runNums: List[int], relative: bool = True) -> np.ndarray:
+        """
+        Returns the oscilloscope start times of many voltage runs of one
+        collection in one call.
+
+        Parameters
+        ----------
+        dateTime : str
+            Date-time value of the collection.
+        collectionKind : int
+            Collection kind of the collection. -1 when not stated in filenames.
+        runNums : List[int]
+            Run numbers of voltage runs.
+        relative: bool
+            This returns the time values relative to the program start time if True.
+            Default value is True.
+
+        Raises
+        ------
+        ReaderError
+            Raised when:
+                * When time data of the collection is not added to TIME_DIR.
+                * When time data does not contain the start time of a run.
+
+        Returns
+        -------
+        np.ndarray
+            Start time of each oscilloscope run. All values are NaN when
+            READ_TIME is FALSE.
+
+        """
+        runNums = np.asarray(runNums, dtype=np.intp)
+        if not self._data["READ_TIME"]:
+            return np.full(len(runNums), np.nan)
+        if (dateTime, collectionKind) not in self._timeArrays:
+            raise ReaderError(dateTime, "Time data of this date-time value and 'CollectionKind' " + str(collectionKind) + " not added to TIME_DIR.")
+        times = self._timeArrays[(dateTime, collectionKind)]
+        indices = (2 * runNums) + (2 if relative else 1)
+        missing = (indices >= len(times)) | (indices < -len(times))
+        if np.any(missing):
+            raise ReaderError(dateTime, "Time data of this date-time value does not contain start time value for Run " + ", ".join(str(run) for run in runNums[missing]))
+        return times[indices]
+    
     def getTempSeriesDf(self, filename: str) -> pd.DataFrame:
         """
         Returns the Temp-V-Time Series data of a voltage run.
@@ -877,6 +1913,50 @@ class Reader(object):
         else:
             raise ReaderError(dateTime, "Temp-V-Run Series data of this date-time value not added to TEMP_DIR.")
     
+    def getCaptureTemps(self, dateTime: str, collectionKind: int, runNums: List[int], durations: List[float]) -> np.ndarray:
+        """
+        Returns the mean temperature of the Temp-V-Time Series data over each
+        oscilloscope capture window of many voltage runs of one collection.
+        
+        A capture window starts at the oscilloscope start time of its run and
+        lasts for its duration. Time values of the Temp-V-Time Series data are
+        taken relative to the start time of the Opsens thermometer collection.
+
+        Parameters
+        ----------
+        dateTime : str
+            Date-time value of the collection.
+        collectionKind : int
+            Collection kind of the collection. -1 when not stated in filenames.
+        runNums : List[int]
+            Run numbers of voltage runs.
+        durations : List[float]
+            Duration of each voltage run in seconds.
+
+        Raises
+        ------
+        ReaderError
+            Raised when:
+                * When time data of the collection is not added to TIME_DIR.
+                * When time data does not contain the start time of a run.
+
+        Returns
+        -------
+        np.ndarray
+            Mean temperature during each capture window. Values are NaN when
+            READ_TIME is FALSE, when the collection has no Temp-V-Time Series data
+            or when a window lies outside of it.
+
+        """
+        runNums = np.asarray(runNums, dtype=np.intp)
+        if not self._data["READ_TIME"] or (dateTime, collectionKind) not in self._tempTimeArrays:
+            return np.full(len(runNums), np.nan)
+        times = self._timeArrays.get((dateTime, collectionKind))
+        if times is None:
+            raise ReaderError(dateTime, "Time data of this date-time value and 'CollectionKind' " + str(collectionKind) + " not added to TIME_DIR.")
+        starts = self.getTimes(dateTime, collectionKind, runNums) - times[2]
+        return windowAverage(*self._tempTimeArrays[(dateTime, collectionKind)], starts, starts + np.asarray(durations, dtype=float))
+    
     def getRunNum(self, filename: str) -> int:
         """
         Returns the run number of a voltage run.
@@ -908,6 +1988,8 @@ class Reader(object):
     def writeConfigFile(self) -> None:
         self._infoFile = open(addDirectory(addDirectory(addDirectory(self.get("OUT_DIR"), self.get("DATE")), self.get("TIME")), self.get("DATE") + self.get("TIME") +self.get("DESCRIPTION") + ".txt"), 'w')
         for key in self._data:
+            if key in self.optionalProperties and len(str(self._data.get(key))) == 0:
+                continue
             if not (key.startswith("DICT") or key.endswith("DATAFRAME") or key.startswith("DATAFRAME") or key == "DATE" or key == "TIME"):    
                 self._infoFile.write(key + " = " + str(self._data.get(key)) + '\n')
         self._infoFile.close()
@@ -926,7 +2008,8 @@ def addDirectory(iPath: str, newPath: str) -> str:
     Parameters
     ----------
     iPath : str
-        Initial path or directory. This is created if it does not exist
+        Initial path or directory. This is created, with its missing parent
+        directories, if it does not exist. Threads may create it at once.
     newPath : str
         Path to be joined to initial path.
 
@@ -935,8 +2018,7 @@ def addDirectory(iPath: str, newPath: str) -> str:
     str
         Full string of joined file-paths.
     """
-    if not os.path.exists(iPath):
-        os.mkdir(iPath)
+    os.makedirs(iPath, exist_ok=True)
     return os.path.join(iPath, newPath)
     
 def getBool(boolStr: str) -> bool:
@@ -976,4 +2058,86 @@ def substringInList(substring: str, listOfString: List[str]) -> bool:
     for word in listOfString:
         if substring.lower() in word.lower():
             return True
-    return False
\ No newline at end of file
+    return False
+
+def windowAverage(x: np.ndarray, y: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Returns the mean of a piecewise-linear series over many windows at once.
+    
+    The series is integrated once with the trapezoidal rule, so each window
+    costs two binary searches. Windows are clipped to the range of the series.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Sorted sample positions of the series.
+    y : np.ndarray
+        Sample values of the series.
+    starts : np.ndarray
+        Start position of each window.
+    ends : np.ndarray
+        End position of each window.
+
+    Returns
+    -------
+    np.ndarray
+        Mean of the series over each window. The interpolated value is
+        returned for zero-length windows and NaN for windows outside the series.
+
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    starts = np.asarray(starts, dtype=float)
+    ends = np.asarray(ends, dtype=float)
+    if len(x) == 0:
+        return np.full(starts.shape, np.nan)
+    if len(x) == 1:
+        return np.where((ends >= x[0]) & (starts <= x[0]), y[0], np.nan)
+    
+    cumulative = np.concatenate(([0.0], np.cumsum(np.diff(x) * (y[1:] + y[:-1]) / 2)))
+    
+    def integral(position):
+        index = np.clip(np.searchsorted(x, position, side="right") - 1, 0, len(x) - 2)
+        span = x[index + 1] - x[index]
+        value = y[index] + (y[index + 1] - y[index]) * np.divide(position - x[index], span, out=np.zeros_like(span), where=span != 0)
+        return cumulative[index] + (position - x[index]) * (y[index] + value) / 2, value
+    
+    lower = np.clip(np.minimum(starts, ends), x[0], x[-1])
+    upper = np.clip(np.maximum(starts, ends), x[0], x[-1])
+    lowerIntegral, lowerValue = integral(lower)
+    upperIntegral, upperValue = integral(upper)
+    width = upper - lower
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(width > 0, (upperIntegral - lowerIntegral) / width, lowerValue)
+    outside = (np.maximum(starts, ends) < x[0]) | (np.minimum(starts, ends) > x[-1]) | np.isnan(starts) | np.isnan(ends)
+    means[outside] = np.nan
+    return means
+
+def readCsv(path: str, floatType: type = None) -> pd.DataFrame:
+    """
+    Reads a csv dataset and parses its float columns as floatType.
+    
+    The float columns are found from the first rows of the file and parsed
+    directly as floatType, so no float64 copy of them is held. The first
+    column is kept in float64. It holds the sample times of voltage datasets,
+    whose spacing float32 cannot resolve over a long run.
+
+    Parameters
+    ----------
+    path : str
+        File path of csv dataset.
+    floatType : type, optional
+        Type of float columns other than the first, e.g. np.float32.
+        The default is None, which keeps them float64.
+
+    Returns
+    -------
+    pd.DataFrame
+        Dataset read from file.
+
+    """
+    if floatType is None:
+        return pd.read_csv(path)
+    head = pd.read_csv(path, nrows=100)
+    columns = [column for column in head.columns[1:] if head[column].dtype == np.float64]
+    return pd.read_csv(path, dtype=dict.fromkeys(columns, floatType))
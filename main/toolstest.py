@@ -10,10 +10,62 @@ within the Python environment.
 This program is written with Python version 3.7.3 with Spyder IDE.
 """
 import os
+import shutil
+import glob
+import json
+import pstats
+import threading
+import pickle
+import tempfile
+import io
+import contextlib
 from pathlib import Path
 import unittest
+from unittest import mock
 import tools
+import fftbackend
+import reference
+import calibration
+import frequency
+import transport
+import benchmark
+import instrumentation
+import main
+import progress
+import analysis
 import math
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+def writeSampleTree(root, numRuns):
+    """Writes a small configuration file and dataset tree into root and returns the configuration file path."""
+    dateTime = "20210131140159"
+    for folder in ["MCoil", "HCoil", "Oscilloscope", "Opsens", "Time"]:
+        os.mkdir(os.path.join(root, folder))
+    gfactors = pd.DataFrame({"Frequency": [0.0, 5e6], "Mag": [1.0, 1.0], "Phase": [0.0, 0.0], "gfactor real": [1.0, 1.0], "gfactor imag": [0.0, 0.0]})
+    gfactors.to_csv(os.path.join(root, "MCoil", "gfactors.csv"), index=False)
+    gfactors.to_csv(os.path.join(root, "HCoil", "gfactors.csv"), index=False)
+    for run in range(1, numRuns + 1):
+        pd.DataFrame({"Time(s)": [0.0, 1e-7], "Voltage(CH1)": [0.0, 1.0], "Voltage(CH2)": [0.0, 1.0]}).to_csv(
+            os.path.join(root, "Oscilloscope", "voltageDataScopeRun" + dateTime + "(" + str(run) + ")CollectionKind1.csv"), index=False)
+    pd.DataFrame({"Oscilloscope Run": list(range(1, numRuns + 1)), "Temperature": [25.0 + run for run in range(numRuns)]}).to_csv(
+        os.path.join(root, "Opsens", "tempData" + dateTime + "CollectionKind1.csv"), index=False)
+    pd.DataFrame({"Time": [0.0, 1.0], "Temperature": [25.0, 26.0]}).to_csv(
+        os.path.join(root, "Opsens", "tempTimeData" + dateTime + "CollectionKind1.csv"), index=False)
+    times = [100.0, 100.5, 0.5]
+    for run in range(1, numRuns + 1):
+        times += [100.0 + run, float(run)]
+    pd.DataFrame({"Data": ["Time"] * len(times), "Time": times}).to_csv(os.path.join(root, "Time", "Time_ComparisonRun" + dateTime + "CollectionKind1.csv"), index=False)
+    configDir = os.path.join(root, "config.txt")
+    with open(configDir, 'w') as configFile:
+        configFile.write("OUT_DIR = " + os.path.join(root, "out") + "\n" + "BASE_DIR = " + root + "\n")
+        configFile.write("DATA_ACTUAL = Oscilloscope\nDATA_EMPTY = Oscilloscope/empty.csv\nDESCRIPTION = Sample\nM_G_FACTOR_FILE = MCoil/gfactors.csv\nH_G_FACTOR_FILE = HCoil/gfactors.csv\n")
+        for prop in ["CUTOFF_FREQ", "KNOWN_FREQ", "M_OVER_H_REAL_SUB", "M_OVER_H_IMAG_SUB", "M_OVER_H_CALIB", "PM_PH_DIFF_PHASE_ADJ",
+                     "M_OVER_H0_SUB", "H_PHASE_REAL_SUB", "H_PHASE_IMAG_SUB", "NUM_PERIOD", "BEGIN_TIME", "POLARITY"]:
+            configFile.write(prop + " = 1\n")
+        configFile.write("WITH_EMPTY = FALSE\nNON_LINEAR_SUB = FALSE\nTEMP_DIR = Opsens\nTIME_DIR = Time\nREAD_TIME = TRUE\n")
+    return configDir
 
 def assertDoNotRaise(function, params):
     try:
@@ -625,6 +677,899 @@ class ReaderClassMethodTestClass(unittest.TestCase):
         
     
     
+class AnalysisConfigTestClass(unittest.TestCase):
+    
+    def setUp(self):
+        self.properties = {"CUTOFF_FREQ": "4000000", "KNOWN_FREQ": "0", "M_OVER_H_REAL_SUB": "0", "M_OVER_H_IMAG_SUB": "0",
+                           "M_OVER_H_CALIB": "0", "PM_PH_DIFF_PHASE_ADJ": "0", "M_OVER_H0_SUB": "0", "H_PHASE_REAL_SUB": "0",
+                           "H_PHASE_IMAG_SUB": "0", "V_H_OFFSET": "30", "NUM_PERIOD": "2", "BEGIN_TIME": "0", "POLARITY": "1.00",
+                           "WITH_EMPTY": "TRUE", "NON_LINEAR_SUB": "TRUE", "READ_TIME": "FALSE"}
+    
+    def test_fromProperties(self):
+        config = tools.AnalysisConfig.fromProperties(self.properties)
+        self.assertEqual(config.cutoffFreq, 4000000.0)
+        self.assertEqual(config.numPeriod, 2.0)
+        self.assertEqual(config.vHOffset, 30.0)
+        self.assertTrue(config.withEmpty)
+        self.assertTrue(config.nonLinearSub)
+        self.assertFalse(config.readTime)
+        self.assertFalse(config.frequencyCache)
+        self.assertEqual(config.processes, 1)
+        self.assertEqual(repr(pickle.loads(pickle.dumps(config))), repr(config))
+        
+        with self.assertRaises(AttributeError):
+            config.cutoffFreq = 0
+        
+        self.properties["V_H_OFFSET"] = ""
+        self.properties["NON_LINEAR_SUB"] = "FALSE"
+        self.assertTrue(math.isnan(tools.AnalysisConfig.fromProperties(self.properties).vHOffset))
+    
+    def test_errorsReportedTogether(self):
+        self.properties["CUTOFF_FREQ"] = "abc"
+        self.properties["NUM_PERIOD"] = ""
+        with self.assertRaises(tools.ReaderError) as error:
+            tools.AnalysisConfig.fromProperties(self.properties)
+        self.assertEqual(error.exception.expression, "CUTOFF_FREQ, NUM_PERIOD")
+        self.assertEqual(error.exception.message, "CUTOFF_FREQ -> Property is not a float value\nNUM_PERIOD -> Property does not exist in configuration file")
         
+        self.properties["NUM_PERIOD"] = "2"
+        with self.assertRaises(tools.ReaderError) as error:
+            tools.AnalysisConfig.fromProperties(self.properties)
+        self.assertEqual(error.exception.expression, "CUTOFF_FREQ")
+        self.assertEqual(error.exception.message, "Property is not a float value")
+
+    def test_windowProperties(self):
+        config = tools.AnalysisConfig.fromProperties(self.properties)
+        self.assertTrue(math.isnan(config.windowPeriods))
+        self.assertTrue(math.isnan(config.windowHop))
+
+        self.properties["WINDOW_PERIODS"] = "10"
+        self.properties["WINDOW_HOP"] = "0.5"
+        config = tools.AnalysisConfig.fromProperties(self.properties)
+        self.assertEqual(config.windowPeriods, 10.0)
+        self.assertEqual(config.windowHop, 0.5)
+
+        self.properties["WINDOW_HOP"] = "0"
+        with self.assertRaises(tools.ReaderError) as error:
+            tools.AnalysisConfig.fromProperties(self.properties)
+        self.assertEqual(error.exception.expression, "WINDOW_HOP")
+        self.assertEqual(error.exception.message, "Property must be greater than 0")
+
+    def test_engine(self):
+        self.assertEqual(tools.AnalysisConfig.fromProperties(self.properties).engine, "fft")
+        self.properties["ENGINE"] = "Sparse"
+        self.assertEqual(tools.AnalysisConfig.fromProperties(self.properties).engine, "sparse")
+        self.properties["ENGINE"] = "goertzel"
+        with self.assertRaises(tools.ReaderError) as error:
+            tools.AnalysisConfig.fromProperties(self.properties)
+        self.assertEqual(error.exception.expression, "ENGINE")
+
+    def test_fftProperties(self):
+        config = tools.AnalysisConfig.fromProperties(self.properties)
+        self.assertEqual((config.fftBackend, config.fftWorkers, config.fftLength), ("numpy", 1, "exact"))
+        self.properties.update({"FFT_BACKEND": "scipy", "FFT_WORKERS": "-1", "FFT_LENGTH_MODE": "resample"})
+        config = tools.AnalysisConfig.fromProperties(self.properties)
+        self.assertEqual((config.fftBackend, config.fftWorkers, config.fftLength), ("scipy", -1, "resample"))
+        for key, value in [("FFT_WORKERS", "0"), ("FFT_WORKERS", "1.5"), ("FFT_LENGTH_MODE", "pad"), ("PROCESSES", "0")]:
+            properties = dict(self.properties)
+            properties[key] = value
+            with self.assertRaises(tools.ReaderError) as error:
+                tools.AnalysisConfig.fromProperties(properties)
+            self.assertEqual(error.exception.expression, key)
+
+    def test_precision(self):
+        self.assertEqual(tools.AnalysisConfig.fromProperties(self.properties).precision, "double")
+        self.properties["PRECISION"] = "SINGLE"
+        self.assertEqual(tools.AnalysisConfig.fromProperties(self.properties).precision, "single")
+        self.properties["PRECISION"] = "half"
+        with self.assertRaises(tools.ReaderError) as error:
+            tools.AnalysisConfig.fromProperties(self.properties)
+        self.assertEqual(error.exception.expression, "PRECISION")
+
+        root = tempfile.mkdtemp()
+        try:
+            path = os.path.join(root, "voltage.csv")
+            pd.DataFrame({"Time(s)": [0.0, 1e-7], "Voltage(CH1)": [0.5, 1.0], "Label": ["a", "b"]}).to_csv(path, index=False)
+            df = tools.readCsv(path, np.float32)
+            self.assertEqual(list(df.dtypes[:2]), [np.float64, np.float32])
+            self.assertEqual(df["Label"].tolist(), ["a", "b"])
+            self.assertEqual(tools.readCsv(path)["Voltage(CH1)"].dtype, np.float64)
+        finally:
+            shutil.rmtree(root)
+
+    def test_planLength(self):
+        self.assertEqual(fftbackend.planLength(1009, 2003, "exact"), (1009*2003, 2003))
+        self.assertEqual(fftbackend.planLength(1000, 7, "trim"), (7000, 7))
+        self.assertEqual(fftbackend.planLength(96, 203, "trim"), (96*200, 200.0))
+        self.assertEqual(fftbackend.planLength(97, 203, "trim"), (97*203, 203))
+        length, periods = fftbackend.planLength(97, 203, "resample")
+        self.assertTrue(fftbackend.isFastLength(length))
+        self.assertEqual(periods, 203)
+        self.assertGreaterEqual(length, 97*203)
+        self.assertTrue(fftbackend.isFastLength(1320))
+        self.assertEqual(fftbackend.nextFastLength(1319), 1320)
+
+
+class ReaderValidateTestClass(unittest.TestCase):
+    
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.configDir = writeSampleTree(self.root, 3)
+    
+    def tearDown(self):
+        shutil.rmtree(self.root)
+    
+    def test_validateConsistentTree(self):
+        self.assertEqual(tools.Reader.validate(self.configDir), [])
+        self.assertFalse(os.path.exists(os.path.join(self.root, "out")))
+    
+    def test_validateReportsEveryProblem(self):
+        with open(self.configDir, 'a') as configFile:
+            configFile.write("NUM_PERIOD = abc\nNOT_A_PROPERTY = 1\n")
+        pd.DataFrame({"Oscilloscope Run": [1], "Temperature": [25.0]}).to_csv(
+            os.path.join(self.root, "Opsens", "tempData20210131140159CollectionKind1.csv"), index=False)
+        os.remove(os.path.join(self.root, "Time", "Time_ComparisonRun20210131140159CollectionKind1.csv"))
+        
+        errors = tools.Reader.validate(self.configDir)
+        messages = [error.message for error in errors]
+        self.assertIn("Property is not poorly defined or not necessary", messages)
+        self.assertIn("Property is not a float value", messages)
+        self.assertIn("Temp-V-Run Series data of this date-time value does not contain temperature value for Run 2", messages)
+        self.assertIn("Temp-V-Run Series data of this date-time value does not contain temperature value for Run 3", messages)
+        self.assertEqual(len([message for message in messages if message.startswith("Time data of dateTime 20210131140159")]), 3)
+        
+        
+class ReaderBulkLookupTestClass(unittest.TestCase):
+    
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.reader = tools.Reader(writeSampleTree(self.root, 3))
+    
+    def tearDown(self):
+        shutil.rmtree(self.root)
+    
+    def test_getRunGroup(self):
+        self.assertEqual(self.reader.getRunGroup("voltageDataScopeRun20210131140159(2)CollectionKind1.csv"), ("20210131140159", 1))
+        self.assertEqual(self.reader.getRunGroup("voltageDataScopeRun20210131140159(2).csv"), ("20210131140159", -1))
+        self.assertRaises(tools.ReaderError, self.reader.getRunGroup, "voltageDataScopeRun(2).csv")
+    
+    def test_getRunTemps(self):
+        np.testing.assert_array_equal(self.reader.getRunTemps("20210131140159", 1, [3, 1, 2]), [27.0, 25.0, 26.0])
+        for run in range(1, 4):
+            filename = "voltageDataScopeRun20210131140159(" + str(run) + ")CollectionKind1.csv"
+            self.assertEqual(self.reader.getRunTemp(filename), 24.0 + run)
+        with self.assertRaises(tools.ReaderError) as context:
+            self.reader.getRunTemps("20210131140159", 1, [1, 4, 5])
+        self.assertEqual(context.exception.message, "Temp-V-Run Series data of this date-time value does not contain temperature value for Run 4, 5")
+        self.assertRaises(tools.ReaderError, self.reader.getRunTemps, "20210131140159", 2, [1])
+    
+    def test_getTimes(self):
+        np.testing.assert_array_equal(self.reader.getTimes("20210131140159", 1, [1, 2, 3]), [1.0, 2.0, 3.0])
+        np.testing.assert_array_equal(self.reader.getTimes("20210131140159", 1, [1, 2, 3], relative=False), [101.0, 102.0, 103.0])
+        for run in range(1, 4):
+            filename = "voltageDataScopeRun20210131140159(" + str(run) + ")CollectionKind1.csv"
+            self.assertEqual(self.reader.getTime(filename, "oscilloscope"), run)
+        self.assertRaises(tools.ReaderError, self.reader.getTimes, "20210131140159", 1, [4])
+    
+    def test_getCaptureTemps(self):
+        temperatures = self.reader.getCaptureTemps("20210131140159", 1, [1, 2], [1e-7, 1e-7])
+        self.assertAlmostEqual(temperatures[0], 25.5)
+        self.assertTrue(math.isnan(temperatures[1]))
+        self.assertTrue(np.isnan(self.reader.getCaptureTemps("20210131140159", 2, [1], [1e-7])).all())
+    
+    def test_windowAverage(self):
+        x = np.array([0.0, 1.0, 2.0, 4.0])
+        y = np.array([0.0, 2.0, 2.0, 6.0])
+        means = tools.windowAverage(x, y, [0.0, 1.0, 0.5, 3.0, 5.0, -1.0], [2.0, 2.0, 0.5, 4.0, 6.0, 1.0])
+        np.testing.assert_allclose(means[:4], [1.5, 2.0, 1.0, 5.0])
+        self.assertTrue(math.isnan(means[4]))
+        self.assertAlmostEqual(means[5], 1.0)
+        
+        
+class WriterRunIndexTestClass(unittest.TestCase):
+    
+    class _StubReader(object):
+        def get(self, prop, kind=False):
+            return {"H_MIN": 20.0, "H_MAX": 60.0}[prop]
+    
+    def setUp(self):
+        self.dictionary = {"EMPTY": (pd.DataFrame(), {"H_MAX": 40.0, "TEMPERATURE": 1.0, "RUN_NUM": math.nan})}
+        hMaxValues = [10.0, 25.0, 35.0, 45.0, 55.0, 70.0]
+        temperatures = [25.5, 25.5, 24.0, 25.5, 24.0, 24.0]
+        for i in range(len(hMaxValues)):
+            self.dictionary["run" + str(i + 1)] = (pd.DataFrame(), {"H_MAX": hMaxValues[i], "TEMPERATURE": temperatures[i], "RUN_NUM": i + 1})
+        self.writer = tools.Writer(self._StubReader(), self.dictionary)
+    
+    def test_runIndex(self):
+        self.assertEqual(self.writer._runKeys, ["run1", "run2", "run3", "run4", "run5", "run6"])
+        self.assertEqual(self.writer._runIndex["RUN_NUM"].tolist(), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(self.writer._getHMaxMask().tolist(), [False, True, True, True, True, False])
+    
+    def test_legendGroups(self):
+        labels, groups = self.writer._getLegendGroups("TEMPERATURE")
+        self.assertEqual(labels, [24.0, 25.5])
+        self.assertEqual([[self.writer._runKeys[position] for position in group] for group in groups], [["run3", "run5"], ["run2", "run4"]])
+        self.assertIs(self.writer._getLegendGroups("TEMPERATURE")[1], groups)
+    
+    def test_missingProperty(self):
+        del self.dictionary["run4"][1]["TEMPERATURE"]
+        writer = tools.Writer(self._StubReader(), self.dictionary)
+        self.assertNotIn("TEMPERATURE", writer._runIndex)
+        self.assertEqual(writer._runIndex["H_MAX"].tolist(), [10.0, 25.0, 35.0, 45.0, 55.0, 70.0])
+        
+        
+class DatasetCacheTestClass(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "data.csv")
+        pd.DataFrame({"Time": [0.0, 1.0], "Voltage(CH1)": [1.0, 2.0]}).to_csv(self.path, index=False)
+        self.cache = tools.DatasetCache()
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def test_hitsMisses(self):
+        first = self.cache.read(self.path)
+        self.assertIs(self.cache.read(os.path.join(self.directory, ".", "data.csv")), first)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertEqual(self.cache.read(self.path, np.float32)["Voltage(CH1)"].dtype, np.float32)
+        self.assertEqual((self.cache.hits, self.cache.misses, len(self.cache)), (1, 2, 2))
+    
+    def test_modifiedFile(self):
+        self.cache.read(self.path)
+        pd.DataFrame({"Time": [0.0, 1.0], "Voltage(CH1)": [3.0, 4.0]}).to_csv(self.path, index=False)
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(self.cache.read(self.path)["Voltage(CH1)"].tolist(), [3.0, 4.0])
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+
+
+class RunBatchTestClass(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.configDir = benchmark.writeDataTree(self.directory, 2, numPoints=2000)
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def test_failureIsolation(self):
+        configDirs = [self.configDir, os.path.join(self.directory, "missing.txt"), self.configDir]
+        summaries = main.runBatch(configDirs, workers=2, plot=False)
+        self.assertEqual([summary["STATUS"] for summary in summaries], ["OK", "FAILED", "OK"])
+        self.assertEqual([summary["RUNS"] for summary in summaries], [2, 0, 2])
+        self.assertIn("missing.txt", summaries[1]["ERROR"])
+        self.assertTrue(summaries[1]["ERROR"].startswith("ReaderError: "))
+        self.assertIn("Traceback", summaries[1]["TRACEBACK"])
+        self.assertEqual(summaries[0]["TRACEBACK"], "")
+    
+    def test_parallelMemory(self):
+        summaries = main.runBatch([self.configDir, self.configDir], {"MEMORY": "TRUE"}, workers=2, plot=False)
+        self.assertEqual([summary["STATUS"] for summary in summaries], ["OK", "OK"])
+        reports = glob.glob(os.path.join(self.directory, "out", "*", "*", "*_instrumentation.json"))
+        self.assertEqual(len(reports), 2)
+        for path in reports:
+            with open(path) as report:
+                self.assertNotIn("MEMORY_RUNS", json.load(report))
+    
+    def test_parallelProfiles(self):
+        summaries = main.runBatch([self.configDir, self.configDir], {"PROFILE": "analyze"}, workers=2, plot=False)
+        paths = [summary["PROFILES"]["analyze"] for summary in summaries]
+        self.assertEqual(len(set(paths)), 2)
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+        self.assertEqual([summary["PROFILE_ERRORS"] for summary in summaries], [[], []])
+        self.assertEqual(main.mergeBatchProfiles(summaries, self.directory), [os.path.join(self.directory, "batch_analyze.prof")])
+    
+    def test_shortWindows(self):
+        summaries = main.runBatch([self.configDir], {"WINDOW_PERIODS": "1000"}, plot=False)
+        self.assertEqual(summaries[0]["STATUS"], "OK")
+        self.assertEqual(glob.glob(os.path.join(self.directory, "out", "*", "*", "MHTimeSeries", "*.csv")), [])
+        summaries = main.runBatch([self.configDir], {"WINDOW_PERIODS": "4"}, plot=False)
+        self.assertEqual(len(glob.glob(os.path.join(self.directory, "out", "*", "*", "MHTimeSeries", "*.csv"))), 2)
+    
+    def test_reportsWithoutRuns(self):
+        program = main.Main(self.configDir, {"PRECISION": "SINGLE", "DECIMATE": "TRUE"})
+        program.reader.get("DICT_DATAFRAME_ACTUAL").clear()
+        program._precisionReport()
+        program._decimationReport()
+        self.assertEqual((program.precisionReport, program.decimationReport), (None, None))
+    
+    def test_batchDescriptions(self):
+        otherDir = os.path.join(self.directory, "other.txt")
+        shutil.copy(self.configDir, otherDir)
+        self.assertEqual(main.batchDescriptions([self.configDir]), [None])
+        self.assertEqual(main.batchDescriptions([self.configDir, otherDir, self.configDir]),
+                         ["Benchmark_config_1", "Benchmark_other", "Benchmark_config_3"])
+        # One after the other, the configuration files keep their DESCRIPTION and write into folders of different seconds
+        main.runBatch([self.configDir, otherDir], plot=False)
+        analyzed = glob.glob(os.path.join(self.directory, "out", "*", "*", "MHAnalyzed", "*.csv"))
+        self.assertEqual(len(analyzed), 4)
+        self.assertEqual(len({os.path.dirname(path) for path in analyzed}), 2)
+        self.assertFalse(any("_config" in path or "_other" in path for path in analyzed))
+        shutil.rmtree(os.path.join(self.directory, "out"))
+        os.makedirs(os.path.join(self.directory, "out"))
+        main.runBatch([self.configDir, otherDir], workers=2, plot=False)
+        analyzed = glob.glob(os.path.join(self.directory, "out", "*", "*", "MHAnalyzed", "*.csv"))
+        self.assertEqual(len(analyzed), 4)
+        self.assertEqual(len([path for path in analyzed if "Benchmark_other" in path]), 2)
+
+
+class CommandLineTestClass(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.configDir = benchmark.writeDataTree(self.directory, 2, numPoints=2000)
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def runMain(self, argv):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            status = main.main(argv)
+        return status, output.getvalue()
+    
+    def test_validate(self):
+        missing = os.path.join(self.directory, "missing.txt")
+        self.assertEqual(self.runMain([self.configDir, "--validate"]), (0, self.configDir + ": OK\n"))
+        status, output = self.runMain([self.configDir, missing, "--validate"])
+        self.assertEqual(status, 1)
+        self.assertIn(missing + ": ", output)
+        self.assertEqual(glob.glob(os.path.join(self.directory, "out", "*")), [])
+    
+    def test_arguments(self):
+        outDir = os.path.join(self.directory, "elsewhere")
+        summary = {"CONFIG": self.configDir, "STATUS": "OK", "RUNS": 2, "SECONDS": 0.0, "ERROR": "", "TRACEBACK": "",
+                   "PROFILES": {}, "PROFILE_ERRORS": []}
+        with mock.patch.object(main, "runBatch", return_value=[summary]) as runBatch:
+            status = self.runMain([self.configDir, "-o", outDir, "-j", "3", "--no-plots", "--instrument"])[0]
+        self.assertEqual(status, 0)
+        configs, overrides, workers, plot = runBatch.call_args[0][:4]
+        self.assertEqual((configs, overrides, workers, plot), ([self.configDir], {"OUT_DIR": outDir, "INSTRUMENT": "TRUE"}, 3, False))
+        with mock.patch.object(main, "runBatch", return_value=[dict(summary, STATUS="FAILED")]) as runBatch:
+            with contextlib.redirect_stderr(io.StringIO()):
+                status = self.runMain([self.configDir, "--profile", "analyze", "--memory"])[0]
+        self.assertEqual(status, 1)
+        self.assertEqual(runBatch.call_args[0][1:3], ({"MEMORY": "TRUE", "PROFILE": "analyze"}, 1))
+        with mock.patch.object(tools.Reader, "validate", return_value=[]) as validate:
+            self.runMain([self.configDir, "--validate", "-o", outDir])
+        self.assertEqual(validate.call_args[1]["overrides"], {"OUT_DIR": outDir})
+
+
+class InstrumentationTestClass(unittest.TestCase):
+    
+    def test_stopwatchLaps(self):
+        timer = instrumentation.Instrumentation()
+        stopwatch = timer.stopwatch(3, 800)
+        stopwatch.lap("read")
+        stopwatch.lap("fft", 1600)
+        stopwatch.lap("fft")
+        self.assertEqual([(record["STAGE"], record["RUN"], record["BYTES"]) for record in timer.records],
+                         [("read", 3, 800), ("fft", 3, 1600), ("fft", 3, 800)])
+        self.assertTrue(all(record["WALL"] >= 0 and record["CPU"] >= 0 for record in timer.records))
+        summary = timer.summary()
+        self.assertEqual(list(summary), ["read", "fft"])
+        self.assertEqual((summary["fft"]["COUNT"], summary["fft"]["BYTES"]), (2, 2400))
+        self.assertAlmostEqual(summary["fft"]["WALL"], timer.records[1]["WALL"] + timer.records[2]["WALL"])
+        self.assertEqual(list(timer.runs()), ["3"])
+        self.assertEqual(list(timer.runs()["3"]), ["read", "fft"])
+    
+    def test_stage(self):
+        timer = instrumentation.Instrumentation()
+        with timer.stage("writeData") as stage:
+            stage.nbytes = 100
+        with self.assertRaises(ValueError):
+            with timer.stage("plot", run=1):
+                raise ValueError()
+        self.assertEqual([(record["STAGE"], record["RUN"], record["BYTES"]) for record in timer.records],
+                         [("writeData", None, 100), ("plot", 1, 0)])
+        self.assertEqual(timer.runs(), {"1": {"plot": timer.records[1]["WALL"]}})
+        self.assertNotIn("MEMORY_RUNS", timer.report())
+    
+    def test_tracingUsers(self):
+        self.assertFalse(tracemalloc.is_tracing())
+        instrumentation._startTracing()
+        instrumentation._startTracing()
+        instrumentation._stopTracing()
+        self.assertTrue(tracemalloc.is_tracing())
+        instrumentation._stopTracing()
+        self.assertFalse(tracemalloc.is_tracing())
+        tracemalloc.start()
+        try:
+            instrumentation._startTracing()
+            instrumentation._stopTracing()
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
+    
+    def test_memoryRuns(self):
+        timer = instrumentation.Instrumentation(memory=True)
+        with timer.stage("analyze", run=1, nbytes=1000):
+            values = list(range(10000))
+        timer.close()
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertGreater(timer.records[0]["PEAK"], 0)
+        self.assertIn("MEMORY_RUNS", timer.report())
+        del values
+        
+        timer = instrumentation.Instrumentation()
+        for run, peak in enumerate([1000, 1200, 900, 5000]):
+            timer.record("analyze", 0.1, 0.1, 1000, run, {"PEAK": peak, "RETAINED": 0, "RSS": 0})
+            timer.record("fft", 0.1, 0.1, 1000, run, {"PEAK": peak//2, "RETAINED": 0, "RSS": 0})
+        memory = timer.memoryRuns()
+        self.assertEqual(memory["3"]["PEAK"], 5000)
+        self.assertAlmostEqual(memory["0"]["PEAK_PER_BYTE"], 1.0)
+        self.assertEqual(timer.abnormalRuns(), ["3"])
+        self.assertEqual(timer.report()["ABNORMAL_RUNS"], ["3"])
+        timer.records = timer.records[:4]
+        self.assertEqual(timer.abnormalRuns(), [])
+    
+    def test_nullInstrumentation(self):
+        for timer in [instrumentation.NULL_INSTRUMENTATION, instrumentation.Instrumentation(enabled=False)]:
+            self.assertFalse(timer.enabled)
+            with timer.stage("read") as stage:
+                stage.lap("fft")
+            timer.stopwatch(1, 8).lap("fft")
+            timer.record("read", 1.0, 1.0)
+            self.assertIs(timer.stage("read"), timer.stopwatch())
+            self.assertEqual((timer.records, timer.summary(), timer.runs()), ([], {}, {}))
+
+
+class ProfilerTestClass(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    @staticmethod
+    def _term(k: int) -> float:
+        return (-1)**k/(2*k + 1)
+    
+    def _work(self, count: int) -> float:
+        return sum(self._term(k) for k in range(count))
+    
+    def test_stage(self):
+        self.assertRaises(ValueError, instrumentation.Profiler, ["fft"])
+        profiler = instrumentation.Profiler(["analyze"])
+        self.assertIs(profiler.stage("read"), instrumentation._NULL_STAGE)
+        with profiler.stage("analyze"):
+            self._work(10)
+        paths = profiler.dump(os.path.join(self.directory, "run_"))
+        self.assertEqual(paths, {"analyze": os.path.join(self.directory, "run_analyze.prof")})
+        self.assertTrue(os.path.exists(os.path.join(self.directory, "run_analyze.txt")))
+        self.assertEqual(profiler.errors, [])
+    
+    def test_parallelStages(self):
+        profilers = [instrumentation.Profiler(["analyze"]) for i in range(4)]
+        def profile(profiler):
+            with profiler.stage("analyze"):
+                self._work(2000)
+        threads = [threading.Thread(target=profile, args=(profiler,)) for profiler in profilers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([profiler.errors for profiler in profilers], [[]]*4)
+    
+    def test_mergeProfiles(self):
+        paths = []
+        for i, count in enumerate([3, 5]):
+            profiler = instrumentation.Profiler(["plot"])
+            with profiler.stage("plot"):
+                self._work(count)
+            paths.append(profiler.dump(os.path.join(self.directory, str(i) + "_"))["plot"])
+        merged = instrumentation.mergeProfiles(paths, os.path.join(self.directory, "merged.prof"))
+        calls = [value[1] for key, value in pstats.Stats(merged).stats.items() if key[2] == "_term"]
+        self.assertEqual(calls, [8])
+        self.assertTrue(os.path.exists(os.path.join(self.directory, "merged.txt")))
+
+
+class ProgressTestClass(unittest.TestCase):
+    
+    def test_rateLimiting(self):
+        events = []
+        reporter = progress.ProgressReporter([events.append], interval=3600)
+        with reporter.phase("analyze", 100, "runs", "Sample") as phase:
+            for _ in range(100):
+                phase.advance(nbytes=10)
+        self.assertEqual([(event["COMPLETED"], event["DONE"]) for event in events], [(0, False), (100, True)])
+        self.assertEqual((events[1]["ETA"], events[1]["LABEL"]), (0.0, "Sample"))
+        events.clear()
+        with progress.ProgressReporter([events.append], interval=0).phase("read", 3, "files") as phase:
+            for _ in range(3):
+                phase.advance()
+        self.assertEqual([event["COMPLETED"] for event in events], [0, 1, 2, 3, 3])
+        self.assertIsNone(events[0]["ETA"])
+        self.assertIs(progress.NULL_PROGRESS.phase("read", 3), progress._NULL_PHASE)
+    
+    def test_formatEvent(self):
+        event = {"PHASE": "analyze", "LABEL": "Sample", "UNIT": "runs", "COMPLETED": 40, "TOTAL": 100, "ELAPSED": 3.2,
+                 "RATE": 12.5, "MB_PER_S": 3.2, "ETA": 4.8, "DONE": False}
+        self.assertEqual(progress.formatEvent(event), "[Sample] analyze: 40/100 runs (40%), 12.5 runs/s, 3.2 MB/s, ETA 4.8 s")
+        event.update({"LABEL": "", "ETA": None})
+        self.assertTrue(progress.formatEvent(event).endswith("ETA unknown"))
+        event.update({"COMPLETED": 0, "TOTAL": 0, "DONE": True})
+        self.assertEqual(progress.formatEvent(event), "analyze: 0/0 runs (100%), 12.5 runs/s, 3.2 MB/s, done in 3.2 s")
+    
+    def test_jsonLinesSink(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "progress.jsonl")
+            with open(path, 'w') as logFile:
+                logFile.write("{}\n")
+            with progress.JsonLinesSink(path) as sink:
+                reporter = progress.ProgressReporter([sink], interval=0)
+                with reporter.phase("writeData", 2) as phase:
+                    phase.advance(2)
+                with open(path) as logFile:
+                    self.assertEqual(len(logFile.readlines()), 4)
+            reporter.close()
+            with open(path) as logFile:
+                lines = [json.loads(line) for line in logFile]
+            self.assertEqual([line.get("COMPLETED") for line in lines], [None, 0, 2, 2])
+            self.assertTrue(all("TIMESTAMP" in line for line in lines[1:]))
+        finally:
+            shutil.rmtree(directory)
+    
+    def test_writePlots(self):
+        os.environ.setdefault("MPLBACKEND", "Agg")
+        directory = tempfile.mkdtemp()
+        try:
+            events = []
+            configDir = benchmark.writeDataTree(directory, 2, numPoints=2000)
+            main.runBatch([configDir], progress=progress.ProgressReporter([events.append], interval=0))
+            plots = [(event["COMPLETED"], event["TOTAL"], event["UNIT"]) for event in events if event["PHASE"] == "writePlots"]
+            self.assertEqual(plots, [(0, 2, "plots"), (1, 2, "plots"), (2, 2, "plots"), (2, 2, "plots")])
+        finally:
+            shutil.rmtree(directory)
+
+
+class BenchmarkTestClass(unittest.TestCase):
+    
+    def test_compareResults(self):
+        baseline = [{"SCENARIO": "reader", "RUNS": 100, "MIN": 1.0}, {"SCENARIO": "opt_freq", "RUNS": 100, "MIN": 1.0},
+                    {"SCENARIO": "writeData", "RUNS": 100, "MIN": 1.0}, {"SCENARIO": "writePlots", "RUNS": 100, "MIN": 0.5},
+                    {"SCENARIO": "reader", "RUNS": 10, "MIN": 0.04}]
+        results = [{"SCENARIO": "reader", "RUNS": 100, "MIN": 1.2}, {"SCENARIO": "opt_freq", "RUNS": 100, "MIN": 1.3},
+                   {"SCENARIO": "writeData", "RUNS": 100, "MIN": 0.7}, {"SCENARIO": "writePlots", "RUNS": 100, "MIN": 0.64},
+                   {"SCENARIO": "reader", "RUNS": 10, "MIN": 0.08}, {"SCENARIO": "fundmagphase", "RUNS": 100, "MIN": 2.0}]
+        rows = benchmark.compareResults(results, baseline)
+        self.assertEqual([row["STATUS"] for row in rows], ["OK", "REGRESSION", "FASTER", "REGRESSION", "UNGATED", "NEW"])
+        self.assertAlmostEqual(rows[1]["RATIO"], 1.3)
+        self.assertEqual((rows[5]["BASELINE"], rows[5]["RATIO"]), (None, None))
+        rows = benchmark.compareResults(results, baseline, tolerance=0.25, minSeconds=0.2, minBaseline=0.01)
+        self.assertEqual([row["STATUS"] for row in rows], ["OK", "REGRESSION", "FASTER", "OK", "OK", "NEW"])
+        rows = benchmark.compareResults(results, baseline, ungated=["opt_freq"])
+        self.assertEqual(rows[1]["STATUS"], "UNGATED")
+        for result in baseline + results:
+            result["MEDIAN"] = result.pop("MIN")
+        rows = benchmark.compareResults(results, baseline, statistic="MEDIAN")
+        self.assertEqual(rows[1]["STATUS"], "REGRESSION")
+
+
+class EmptyReferenceTestClass(unittest.TestCase):
+    
+    def setUp(self):
+        spectrum = np.arange(8) + 1j*np.arange(8)[::-1]
+        logger = pd.DataFrame({"M_SPECTRUM_REAL": spectrum.real, "M_SPECTRUM_IMAG": spectrum.imag})
+        properties = {"M_OVER_H_REAL": 0.1, "M_OVER_H_IMAG": 0.2, "H_PHASE_REAL": 0.6, "H_PHASE_IMAG": 0.8, "V_H_MAX": 2.0}
+        self.reference = reference.EmptyReference.fromAnalysis((logger, properties), 0.5)
+    
+    def test_accepts(self):
+        self.assertTrue(self.reference.accepts(2.5))
+        self.assertTrue(self.reference.accepts(1.5))
+        self.assertFalse(self.reference.accepts(2.6))
+        self.assertFalse(reference.EmptyReference(np.zeros(8), 0, 0, 1, 0, 2.0).accepts(2.0))
+    
+    def test_subtract(self):
+        actual = np.arange(10) - 2j*np.arange(10)
+        expected = actual.copy()
+        transfer = complex(0.8, 0.6)
+        for i in [1, 3, 9]:
+            if i < len(self.reference):
+                term = complex(self.reference.spectrum[i])*complex(0.6, 0.8)
+                expected[i] = (complex(expected[i])*transfer - term)/transfer
+        self.reference.subtract(actual, np.array([1, 3, 9]), transfer, -1.0)
+        np.testing.assert_allclose(actual, expected, rtol=1e-14)
+        self.assertEqual(actual[9], 9 - 18j)
+        compact = np.arange(10)[[1, 3, 9]] - 2j*np.arange(10)[[1, 3, 9]]
+        self.reference.subtract(compact, np.array([1, 3, 9]), transfer, -1.0, np.arange(3))
+        np.testing.assert_array_equal(compact, actual[[1, 3, 9]])
+    
+    def test_libraryNearest(self):
+        references = [reference.EmptyReference(np.zeros(4), 0, 0, 1, 0, vHMax, 2.0) for vHMax in [45.0, 33.0, 40.0]]
+        library = reference.EmptyReferenceLibrary(references)
+        np.testing.assert_array_equal(library.vHMax, [33.0, 40.0, 45.0])
+        self.assertIs(library.nearest(10.0), references[1])
+        self.assertIs(library.nearest(36.5), references[1])
+        self.assertIs(library.nearest(36.6), references[2])
+        self.assertIs(library.nearest(43.0), references[0])
+        self.assertIs(library.nearest(100.0), references[0])
+        with self.assertRaises(ValueError):
+            reference.EmptyReferenceLibrary([])
+
+class CalibrationStoreTestClass(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = calibration.CalibrationStore(os.path.join(self.directory, "calib"))
+        self.config = tools.AnalysisConfig.fromProperties({"CUTOFF_FREQ": "4000000", "KNOWN_FREQ": "0", "M_OVER_H_REAL_SUB": "0", "M_OVER_H_IMAG_SUB": "0",
+            "M_OVER_H_CALIB": "0", "PM_PH_DIFF_PHASE_ADJ": "0", "M_OVER_H0_SUB": "0", "H_PHASE_REAL_SUB": "0",
+            "H_PHASE_IMAG_SUB": "0", "V_H_OFFSET": "30", "NUM_PERIOD": "2", "BEGIN_TIME": "0", "POLARITY": "1.00",
+            "WITH_EMPTY": "TRUE", "NON_LINEAR_SUB": "TRUE", "READ_TIME": "FALSE"})
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def test_saveLoad(self):
+        logger = pd.DataFrame({"TIME": np.linspace(0, 1, 5), "M_SPECTRUM_REAL": np.arange(5.0)})
+        properties = {"V_H_MAX": np.float64(2.5), "ENGINE": "fft"}
+        self.assertIsNone(self.store.load("key"))
+        self.store.save("key", (logger, properties))
+        loaded, loadedProperties = self.store.load("key")
+        pd.testing.assert_frame_equal(loaded, logger)
+        self.assertEqual(loadedProperties, {"V_H_MAX": 2.5, "ENGINE": "fft"})
+        self.assertIsNone(self.store.load("otherKey"))
+        self.assertEqual(os.listdir(self.store.directory), ["EMPTY_key.npz"])
+    
+    def test_fingerprint(self):
+        path = os.path.join(self.directory, "empty.csv")
+        Path(path).write_text("1,2\n")
+        first = calibration.fingerprint([path], self.config)
+        self.assertEqual(first, calibration.fingerprint([path], self.config))
+        Path(path).write_text("1,3\n")
+        self.assertNotEqual(first, calibration.fingerprint([path], self.config))
+        hashed = []
+        calibration.fingerprint([path], self.config, lambda file: hashed.append(file) or "0")
+        self.assertEqual(hashed, [module.__file__ for module in (analysis, fftbackend, reference)] + [path])
+    
+    def test_fileDigest(self):
+        path = os.path.join(self.directory, "empty.csv")
+        Path(path).write_text("1,2\n")
+        self.assertEqual(self.store.fileDigest(path), calibration.fileDigest(path))
+        fileDigest = calibration.fileDigest
+        try:
+            calibration.fileDigest = None
+            # A new store reads the digest from the index without hashing the file
+            self.assertEqual(calibration.CalibrationStore(self.store.directory).fileDigest(path), fileDigest(path))
+        finally:
+            calibration.fileDigest = fileDigest
+        Path(path).write_text("1,23\n")
+        self.assertEqual(self.store.fileDigest(path), calibration.fileDigest(path))
+        with open(os.path.join(self.store.directory, "DIGESTS.json")) as indexFile:
+            self.assertEqual(list(json.load(indexFile).values()), [calibration.fileDigest(path)])
+    
+    def test_emptyNotRead(self):
+        configDir = benchmark.writeDataTree(self.directory, 1, numPoints=2000, withEmpty=True,
+                                            extra="CALIBRATION_DIR = " + self.store.directory + "\n")
+        for loaded in (True, False):
+            program = main.Main(configDir)
+            program.run(plot=False)
+            self.assertEqual(program.reader.get("DICT_DATAFRAME_EMPTY").isLoaded("EMPTY"), loaded)
+
+class TransportTestClass(unittest.TestCase):
+    
+    def test_shareResolve(self):
+        df = pd.DataFrame({"TIME": np.linspace(0, 1, 1000), "Voltage(CH1)": np.sin(np.arange(1000.0)),
+                           "Voltage(CH2)": np.arange(1000, dtype=np.float32), "LABEL": ["a"]*1000})
+        empty = reference.EmptyReference(np.arange(5) + 1j, 0.5, 0.25, 1.0, -1.0, 20.0, 30.0)
+        for sharedMemory in [True, False]:
+            with transport.Transport(sharedMemory=sharedMemory) as shared:
+                frame = shared.share(df)
+                self.assertIs(shared.share(df), frame)
+                self.assertEqual(shared.share(1.5), 1.5)
+                self.assertLess(len(pickle.dumps(frame)), df.memory_usage(index=False).sum()/4)
+                resolved = transport.resolve(pickle.loads(pickle.dumps(frame)))
+                pd.testing.assert_frame_equal(resolved, df)
+                self.assertFalse(resolved["Voltage(CH1)"].to_numpy().flags.writeable)
+                self.assertIs(transport.resolve(frame), resolved)
+                emptyResolved = transport.resolve(shared.share(empty))
+                np.testing.assert_array_equal(emptyResolved.spectrum, empty.spectrum)
+                self.assertEqual(emptyResolved.vHMax, 20.0)
+                names = [block.name for block in shared._blocks]
+                del resolved, emptyResolved
+                transport.detachAll()
+            self.assertTrue(shared.closed)
+            self.assertEqual(len(shared), 0)
+            self.assertFalse(any(os.path.exists(name) or os.path.exists("/dev/shm/" + name) for name in names))
+            self.assertRaises(ValueError, shared.share, df)
+    
+    def test_release(self):
+        class HeldBlock(object):
+            unlinked = False
+            def close(self):
+                raise BufferError("cannot close exported pointers exist")
+            def unlink(self):
+                self.unlinked = True
+        block = HeldBlock()
+        transport._release([block], [])
+        self.assertTrue(block.unlinked)
+        directory = tempfile.mkdtemp()
+        try:
+            memmapBlock = transport._MemmapBlock(np.memmap(os.path.join(directory, "block"), dtype=np.float64, mode="w+", shape=(4,)))
+            memmapBlock.close()
+            memmapBlock.unlink()
+            memmapBlock.unlink()
+            self.assertFalse(os.path.exists(memmapBlock.name))
+        finally:
+            shutil.rmtree(directory)
+
+class AnalysisGlobalFunctionTest(unittest.TestCase):
+    
+    def test_fitSinBatch(self):
+        tt = np.arange(2000)/1e6
+        amplitude = np.array([1.0, 2.5, 0.5])
+        phase = np.array([0.3, -2.0, 3.0])
+        offset = np.array([0.1, -0.4, 0.0])
+        yy = amplitude[:, None]*np.sin(2*np.pi*1e4*tt + phase[:, None]) + offset[:, None]
+        for freq in [1e4, np.full(3, 1e4), None]:
+            fit = analysis.fit_sin_batch(tt, yy, freq)
+            np.testing.assert_allclose(fit[:, 0], amplitude, rtol=1e-9)
+            np.testing.assert_allclose(fit[:, 1], 2*np.pi*1e4)
+            np.testing.assert_allclose(fit[:, 2], phase, rtol=1e-9)
+            np.testing.assert_allclose(fit[:, 3], offset, atol=1e-9)
+        np.testing.assert_allclose(analysis.fit_sin_batch(tt, yy[1], 1e4), fit[1], rtol=1e-9, atol=1e-9)
+        refined = analysis.fit_sin_batch(tt, yy, 1.01e4, refine_tolerance=1e-3)
+        np.testing.assert_allclose(refined[:, 1], 2*np.pi*1e4, rtol=1e-6)
+        refined = analysis.fit_sin_batch(tt, yy, [1.01e4, 1e4, 0.99e4], refine_tolerance=1e-3)
+        np.testing.assert_allclose(refined[:, 1], 2*np.pi*1e4, rtol=1e-6)
+    
+    def test_piMod(self):
+        angles = np.array([-0.5, 0.0, 1.0, 2*math.pi, 2*math.pi + 1.0, 4*math.pi, -2*math.pi])
+        expected = [2*math.pi - 0.5, 0.0, 1.0, 2*math.pi, 1.0, 2*math.pi, 0.0]
+        np.testing.assert_array_equal(analysis.pi_mod(angles), expected)
+        self.assertEqual(analysis.pi_mod(-0.5), 2*math.pi - 0.5)
+        
+    def test_piModArray(self):
+        phases = np.array([[0.1, 0.2, 6.2, 3.0], [3.0, 3.1, 6.2, 0.1], [6.1, 6.2, -0.1, 0.1]])
+        np.testing.assert_allclose(analysis.pi_mod_array(phases[0]), [0.1, 0.2, 6.2 - 2*math.pi, 3.0])
+        np.testing.assert_allclose(analysis.pi_mod_array(phases, axis=1),
+                                   [[0.1, 0.2, 6.2 - 2*math.pi, 3.0], [3.0, 3.1, 6.2, 0.1], [6.1, 6.2, 2*math.pi - 0.1, 0.1 + 2*math.pi]])
+        np.testing.assert_allclose(analysis.unwrap_phase([6.2, 0.1, -6.1]), [6.2, 0.1 + 2*math.pi, 4*math.pi - 6.1])
+    
+    def test_decimateRun(self):
+        self.assertEqual(analysis.decimation_factor(1e-8, 4e6), 10)
+        self.assertEqual(analysis.decimation_factor(1e-7, 4e6), 1)
+        tt = np.arange(20000)*1e-8
+        df = pd.DataFrame({"Time(s)": tt, "Voltage(CH1)": np.sin(2*np.pi*1e5*tt + 0.3), "Voltage(CH2)": np.cos(2*np.pi*3e5*tt)})
+        decimated, factor = analysis.decimate_run(df, 4e6)
+        self.assertEqual(factor, 10)
+        self.assertEqual(list(decimated.columns), list(df.columns))
+        np.testing.assert_array_equal(decimated.iloc[:, 0], tt[::10])
+        # Away from the edges the filter keeps amplitude and phase
+        np.testing.assert_allclose(decimated.iloc[100:-100, 1], np.sin(2*np.pi*1e5*tt[::10] + 0.3)[100:-100], atol=1e-3)
+        np.testing.assert_allclose(decimated.iloc[100:-100, 2], np.cos(2*np.pi*3e5*tt[::10])[100:-100], atol=1e-3)
+        self.assertIs(analysis.decimate_run(df, 5e7)[0], df)
+        # 666 samples of a 150 kHz period allow 18 of the 20 samples of the cutoff
+        self.assertEqual(analysis.decimation_factor(1e-8, 2e6), 20)
+        self.assertEqual(analysis.decimation_factor(1e-8, 2e6, period_steps=666), 18)
+        self.assertEqual(analysis.decimation_factor(1e-8, 2e6, period_steps=661), 1)
+        decimated, factor = analysis.decimate_run(df, 4e6, 100000, start=13)
+        self.assertEqual(factor, 10)
+        np.testing.assert_array_equal(decimated.iloc[:, 0], tt[3::10])
+        # Ends extended by whole periods keep no filter transient
+        np.testing.assert_allclose(decimated.iloc[:, 1], np.sin(2*np.pi*1e5*tt[3::10] + 0.3), atol=1e-4)
+    
+    def test_fundmagphaseDecimate(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "gfactors.csv")
+            benchmark.writeGFactorFile(path, 100e6)
+            gfactors = pd.read_csv(path)
+        finally:
+            shutil.rmtree(directory)
+        # The undecimated INTEGRAL keeps the trapezoids of the loop
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "gfactors.csv")
+            benchmark.writeGFactorFile(path, 10e6)
+            slowGfactors = pd.read_csv(path)
+        finally:
+            shutil.rmtree(directory)
+        df = benchmark.makeVoltageDataFrame(5000, 10e6, 100e3, 50.0, 0.4)
+        for knownFreq in (100000, 0):
+            properties = analysis.fundmagphase(df, slowGfactors, slowGfactors, 4000000, knownFreq, 0.01, 0.02, 0, 0, 0, 0, 0, 4, 0, 1)[1]
+            self.assertAlmostEqual(properties["INTEGRAL"], -195729.4228291516, delta=1e-9*195729.4228291516)
+        for frequency in (100000, 160000):
+            df = benchmark.makeVoltageDataFrame(20000, 100e6, frequency, 50.0, 0.4)
+            full = analysis.fundmagphase(df, gfactors, gfactors, 2000000, frequency, 0.01, 0.02, 0, 0, 0, 0, 0, 4, 0, 1)[1]
+            decimated = analysis.fundmagphase(df, gfactors, gfactors, 2000000, frequency, 0.01, 0.02, 0, 0, 0, 0, 0, 4, 0, 1,
+                                              decimate=True)[1]
+            self.assertGreater(decimated["DECIMATION"], 1)
+            self.assertEqual(int((1/frequency)//1e-8) % decimated["DECIMATION"], 0)
+            for name, tolerance in (("M_OVER_H_G", 1e-5), ("PM_MINUS_PH_G", 1e-5), ("INTEGRAL", 1e-4), ("HC", 2e-3)):
+                self.assertAlmostEqual(decimated[name], full[name], delta=tolerance*abs(full[name]), msg=name)
+            self.assertEqual(decimated["V_H_MAX"], full["V_H_MAX"])
+        report = analysis.decimation_report(df, gfactors, gfactors, high_cutoff_freq=2000000, known_freq=160000,
+                                            MoverHrealforsub=0.01, MoverHimagforsub=0.02, MoverHforcalib=0,
+                                            pMminuspHforphaseadj=0, MoverH0forsubtraction=0, Hphaserealforsub=0,
+                                            Hphaseimagforsub=0, est_num_periods=4, begintime=0, polarity=1, repeats=1)
+        self.assertEqual(list(report.index), ["M_OVER_H_G", "PM_MINUS_PH_G", "HC", "INTEGRAL"])
+        self.assertTrue(report.loc[["M_OVER_H_G", "PM_MINUS_PH_G", "INTEGRAL"], "WITHIN_TOLERANCE"].all())
+        self.assertEqual(report.attrs["DECIMATION"], decimated["DECIMATION"])
+        self.assertGreater(report.attrs["SPEEDUP"], 0)
+    
+    def test_fundmagphaseWindows(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "gfactors.csv")
+            benchmark.writeGFactorFile(path, 10e6)
+            gfactors = pd.read_csv(path)
+        finally:
+            shutil.rmtree(directory)
+        df = benchmark.makeVoltageDataFrame(5000, 10e6, 100e3, 50.0, 0.4)
+        properties = analysis.fundmagphase(df, gfactors, gfactors, 4000000, 100000, 0.01, 0.02, 0, 0, 0, 0, 0, 4, 0, 1)[1]
+        timeSeries = analysis.fundmagphase_windows(df, gfactors, gfactors, 4000000, 100000, 4, 1, 0, 1, 0.01, 0.02)
+        self.assertEqual(len(timeSeries), (5000 - 1 - 400)//100 + 1)
+        np.testing.assert_allclose(timeSeries["TIME"].iloc[:2], df.iloc[[1, 101], 0])
+        self.assertAlmostEqual(timeSeries["FREQUENCY"].iloc[0], 100e3)
+        for name in ("M_OVER_H_REAL", "M_OVER_H_IMAG", "M_OVER_H_G", "PM_MINUS_PH_G", "H_MAX", "M_MAX", "HC", "INTEGRAL"):
+            self.assertAlmostEqual(timeSeries[name].iloc[0], properties[name], delta=1e-9*abs(properties[name]), msg=name)
+        with self.assertRaises(ValueError):
+            analysis.fundmagphase_windows(df.iloc[:300], gfactors, gfactors, 4000000, 100000, 4, 1, 0, 1)
+    
+    def test_sparseEngine(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "gfactors.csv")
+            benchmark.writeGFactorFile(path, 10e6)
+            gfactors = pd.read_csv(path)
+        finally:
+            shutil.rmtree(directory)
+        df = benchmark.makeVoltageDataFrame(5000, 10e6, 100e3, 50.0, 0.4)
+        empty = benchmark.makeVoltageDataFrame(5000, 10e6, 100e3, 50.0, 0.1, {1: 0.01, 3: 0.002}, seed=1)
+        emptyReference = reference.EmptyReference.fromAnalysis(
+            analysis.fundmagphase(empty, gfactors, gfactors, 4000000, 100000, 0, 0, 0, 0, 0, 0, 0, 4, 0, 1), 10)
+        for isNonLinearSub in (False, True):
+            fft, sparse = [analysis.fundmagphase(df, gfactors, gfactors, 4000000, 100000, 0.01, 0.02, 0, 0, 0,
+                                                 emptyReference.hPhaseReal, emptyReference.hPhaseImag, 4, 0, 1,
+                                                 isNonLinearSub=isNonLinearSub, empty_reference=emptyReference,
+                                                 engine=engine) for engine in ("fft", "sparse")]
+            for name in ("M_OVER_H_REAL", "M_OVER_H_IMAG", "M_OVER_H_G", "PM_MINUS_PH_G", "H_MAX", "M_MAX", "HC", "INTEGRAL"):
+                self.assertAlmostEqual(sparse[1][name], fft[1][name], delta=1e-9*abs(fft[1][name]), msg=name)
+            for name in ("M_INT_RECONSTRUCTED_REAL_LIST", "H_INT_RECONSTRUCTED_REAL_LIST", "FREQ_LIST"):
+                np.testing.assert_allclose(sparse[0][name], fft[0][name], rtol=1e-9, atol=1e-9*fft[0][name].abs().max())
+            # The sparse engine only evaluates the bins kept by the analysis
+            bins = np.flatnonzero(sparse[0]["M_SPECTRUM_REAL"].to_numpy() != 0)
+            self.assertIn(4, bins)
+            for name in ("M_SPECTRUM_REAL", "M_SPECTRUM_IMAG"):
+                np.testing.assert_allclose(sparse[0][name].iloc[bins], fft[0][name].iloc[bins], rtol=1e-9, atol=1e-9)
+    
+    def test_slowResample(self):
+        
+        class SlowBackend(fftbackend.FFTBackend):
+            def speedup(self, original: int, chosen: int) -> float:
+                return 0.9 if original != chosen else 1.0
+        
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "gfactors.csv")
+            benchmark.writeGFactorFile(path, 9.7e6)
+            gfactors = pd.read_csv(path)
+        finally:
+            shutil.rmtree(directory)
+        df = benchmark.makeVoltageDataFrame(5000, 9.7e6, 100e3, 50.0, 0.4)
+        args = (df, gfactors, gfactors, 3000000, 100000, 0, 0, 0, 0, 0, 0, 0, 4, 0, 1)
+        exact = analysis.fundmagphase(*args)
+        self.assertFalse(fftbackend.isFastLength(exact[1]["FFT_LENGTH"]))
+        self.assertNotEqual(fftbackend.planLength(exact[1]["FFT_LENGTH"]//4, 4, "resample")[0], exact[1]["FFT_LENGTH"])
+        kept = analysis.fundmagphase(*args, fft_length="resample", fft_backend=SlowBackend())
+        self.assertEqual((kept[1]["FFT_LENGTH"], kept[1]["FFT_SPEEDUP"]), (exact[1]["FFT_LENGTH"], 1.0))
+        self.assertEqual((kept[1]["HC"], kept[1]["INTEGRAL"]), (exact[1]["HC"], exact[1]["INTEGRAL"]))
+    
+    def test_frequencyCache(self):
+        timestep = 1e-7
+        H = [np.sin(2*np.pi*113.7e3*np.arange(20000)*timestep + phase) for phase in (0.0, 0.4)]
+        full = [analysis.opt_freq(h, len(h), timestep, analysis.peak_freq(h, timestep)) for h in H]
+        cache = frequency.FrequencyCache()
+        self.assertEqual([cache.search(("20210131140159", 1), h, timestep) for h in H], full)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(cache.search(("20210131140159", 2), H[0], timestep), full[0])
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (1, 2, 2))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+"""Transport Package
+
+This script contains the Transport class which hands voltage runs, G-Factor
+datasets and empty field references to worker processes through shared
+memory, so a task of a process pool carries a small descriptor of each
+dataset instead of a pickled copy of it.
+
+The parent process shares every dataset once with a Transport object, which
+copies it into a `multiprocessing.shared_memory` block, or into a memory
+mapped file when shared memory is not available. Worker processes resolve
+the descriptors into arrays and dataframes which view the block without
+copying it. Each block is attached once per worker process and reused by
+every later task of that process.
+
+The Transport object removes its blocks when it is closed, which its
+context manager does on success, error and interrupt alike. Blocks which
+are still open are also removed when the Transport object is garbage
+collected or when the interpreter exits. Workers which are still running
+keep their views valid, as removing a block only removes its name.
+
+This program is written with Python version 3.7.3 with Spyder IDE.
+
+This file is imported as a module and contains the following classes:
+    * Transport - Owns the shared blocks of the datasets of a process pool
+    * SharedArray - Picklable descriptor of an array held by a Transport object
+    * SharedFrame - Picklable descriptor of a dataframe held by a Transport object
+    * SharedReference - Picklable descriptor of an EmptyReference held by a Transport object
+
+It provides the following functions:
+    * resolve - Returns the value of a descriptor in the current process
+    * runTask - Runs a function of `analysis` on resolved arguments, the task of a worker process
+    * detachAll - Closes the blocks attached by the current process
+
+"""
+import os
+import shutil
+import tempfile
+import weakref
+from typing import Any, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from reference import EmptyReference
+
+_ALIGNMENT = 64
+
+_attached = {}
+"""
+Dict[str, Any]: SharedMemory or np.memmap object of each block attached by the current process.
+"""
+
+_resolved = {}
+"""
+Dict[Tuple[str, int], Any]: Value of each descriptor resolved by the current process.
+"""
+
+def _attachBlock(kind: str, name: str, nbytes: int) -> memoryview:
+    # Buffer of a block, attached once per process
+    if name not in _attached:
+        if kind == "shm":
+            from multiprocessing import shared_memory
+            # Workers share the resource tracker of the parent process, which
+            # only removes the block once the parent process has exited
+            block = shared_memory.SharedMemory(name=name)
+        else:
+            block = np.memmap(name, dtype=np.uint8, mode="r", shape=(nbytes,))
+        _attached[name] = block
+    block = _attached[name]
+    return block.buf if kind == "shm" else memoryview(block)
+
+
+class SharedArray(object):
+    """
+    Picklable descriptor of an array held by a Transport object.
+
+    Attributes
+    ----------
+    kind : str
+        "shm" for a shared memory block, "memmap" for a memory mapped file.
+    name : str
+        Name of shared memory block or path of file.
+    nbytes : int
+        Size of block in bytes.
+    offset : int
+        Position of array in block in bytes.
+    shape : Tuple[int]
+        Shape of array.
+    dtype : str
+        Data type of array.
+    """
+
+    def __init__(self, kind: str, name: str, nbytes: int, offset: int, shape: Tuple[int], dtype: str):
+        self.kind = kind
+        self.name = name
+        self.nbytes = nbytes
+        self.offset = offset
+        self.shape = tuple(shape)
+        self.dtype = str(dtype)
+
+    def attach(self) -> np.ndarray:
+        """
+        Returns a read-only view of the array, without copying it.
+        """
+        array = np.ndarray(self.shape, dtype=np.dtype(self.dtype), buffer=_attachBlock(self.kind, self.name, self.nbytes),
+                           offset=self.offset)
+        array.flags.writeable = False
+        return array
+
+
+class SharedFrame(object):
+    """
+    Picklable descriptor of a dataframe held by a Transport object. Numeric
+    columns are views of a block and other columns are carried by the
+    descriptor itself.
+
+    Attributes
+    ----------
+    columns : List[Tuple[str, Any]]
+        Name of each column and its SharedArray object or list of values.
+    """
+
+    def __init__(self, columns: List[Tuple[str, Any]]):
+        self.columns = columns
+
+    def attach(self) -> pd.DataFrame:
+        """
+        Returns the dataframe, whose numeric columns view the block.
+        """
+        data = {name: (values.attach() if isinstance(values, SharedArray) else values) for name, values in self.columns}
+        return pd.DataFrame(data, columns=[name for name, values in self.columns], copy=False)
+
+
+class SharedReference(object):
+    """
+    Picklable descriptor of an EmptyReference object held by a Transport object.
+
+    Attributes
+    ----------
+    spectrum : SharedArray
+        Complex M spectrum of the empty field run.
+    values : Dict[str, float]
+        Every other attribute of the EmptyReference object.
+    """
+
+    def __init__(self, spectrum: SharedArray, values: Dict[str, float]):
+        self.spectrum = spectrum
+        self.values = values
+
+    def attach(self) -> EmptyReference:
+        """
+        Returns the EmptyReference object, whose spectrum views the block.
+        """
+        return EmptyReference(self.spectrum.attach(), **self.values)
+
+
+def resolve(value: Any) -> Any:
+    """
+    Returns the value of a descriptor of a Transport object in the current
+    process. A descriptor is resolved once per process, so the same
+    dataframe or EmptyReference object is returned to every later task.
+    Any other value is returned unchanged.
+    """
+    if not isinstance(value, (SharedArray, SharedFrame, SharedReference)):
+        return value
+    array = value if isinstance(value, SharedArray) else value.spectrum if isinstance(value, SharedReference) \
+        else next((values for name, values in value.columns if isinstance(values, SharedArray)), None)
+    if array is None:
+        return value.attach()
+    key = (array.name, array.offset)
+    if key not in _resolved:
+        _resolved[key] = value.attach()
+    return _resolved[key]
+
+
+def runTask(function: str, args: Tuple[Any], kwargs: Dict[str, Any]) -> Any:
+    """
+    Resolves the arguments of a task and runs a function of `analysis` on
+    them. It is the function run by the worker processes of Main.
+
+    Parameters
+    ----------
+    function : str
+        Name of function of `analysis`, e.g. "fundmagphase_config".
+    args : Tuple[Any]
+        Positional arguments, possibly descriptors of a Transport object.
+    kwargs : Dict[str, Any]
+        Keyword arguments, possibly descriptors of a Transport object.
+
+    Returns
+    -------
+    Any
+        Output of function.
+
+    """
+    import analysis
+    return getattr(analysis, function)(*[resolve(arg) for arg in args], **{key: resolve(arg) for key, arg in kwargs.items()})
+
+
+def detachAll() -> None:
+    """
+    Closes the blocks attached by the current process. Values resolved from
+    them must not be used afterwards.
+    """
+    _resolved.clear()
+    for name, block in list(_attached.items()):
+        del _attached[name]
+        if hasattr(block, "close"):
+            try:
+                block.close()
+            except BufferError:
+                # A view of the block is still referenced, it is closed when collected
+                pass
+
+
+def _release(blocks: List[Any], directory: List[str]) -> None:
+    # Closes and removes the blocks of a Transport object, called once
+    while len(blocks) > 0:
+        block = blocks.pop()
+        try:
+            block.close()
+        except BufferError:
+            # A view of the block is still held, its memory is released with the view
+            pass
+        try:
+            block.unlink()
+        except (FileNotFoundError, PermissionError):
+            pass
+    if len(directory) > 0:
+        shutil.rmtree(directory.pop(), ignore_errors=True)
+
+
+class Transport(object):
+    """
+    Owns the shared blocks of the datasets handed to a process pool.
+
+    Attributes
+    ----------
+    kind : str
+        "shm" while `multiprocessing.shared_memory` blocks are created,
+        "memmap" once memory mapped files are used instead.
+    nbytes : int
+        Bytes held by the blocks.
+    """
+
+    def __init__(self, directory: str = None, sharedMemory: bool = True):
+        """
+        Parameters
+        ----------
+        directory : str, optional
+            Directory in which the folder of memory mapped files is created.
+            The default is None, which is the temporary directory of the system.
+        sharedMemory : bool, optional
+            Uses shared memory blocks when True and they can be created,
+            memory mapped files otherwise. The default is True.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.kind = "shm" if sharedMemory else "memmap"
+        self.nbytes = 0
+        self._parent = directory
+        self._directory = []
+        self._blocks = []
+        self._shared = {}
+        self._values = []
+        self._finalizer = weakref.finalize(self, _release, self._blocks, self._directory)
+
+    def __enter__(self) -> 'Transport':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _allocate(self, nbytes: int) -> Tuple[str, str, memoryview]:
+        # Creates a block of nbytes bytes and returns its kind, name and buffer
+        if self.kind == "shm":
+            try:
+                from multiprocessing import shared_memory
+                block = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+                self._blocks.append(block)
+                return "shm", block.name, block.buf
+            except (ImportError, OSError):
+                self.kind = "memmap"
+        if len(self._directory) == 0:
+            self._directory.append(tempfile.mkdtemp(prefix="transport_", dir=self._parent))
+        handle, path = tempfile.mkstemp(suffix=".bin", dir=self._directory[0])
+        os.close(handle)
+        block = np.memmap(path, dtype=np.uint8, mode="w+", shape=(max(nbytes, 1),))
+        self._blocks.append(_MemmapBlock(block))
+        return "memmap", path, memoryview(block)
+
+    def _shareArrays(self, arrays: List[np.ndarray]) -> List[SharedArray]:
+        # Copies arrays into one block, each aligned to _ALIGNMENT bytes
+        offsets = []
+        nbytes = 0
+        for array in arrays:
+            offsets.append(nbytes)
+            nbytes += -(-array.nbytes//_ALIGNMENT)*_ALIGNMENT
+        kind, name, buffer = self._allocate(nbytes)
+        shared = []
+        for array, offset in zip(arrays, offsets):
+            view = np.ndarray(array.shape, dtype=array.dtype, buffer=buffer, offset=offset)
+            view[...] = array
+            shared.append(SharedArray(kind, name, max(nbytes, 1), offset, array.shape, array.dtype.str))
+        self.nbytes += nbytes
+        del buffer, view
+        return shared
+
+    def share(self, value: Any) -> Any:
+        """
+        Places a dataset in a shared block and returns its descriptor. The
+        same object is only placed once, later calls return its descriptor.
+
+        Parameters
+        ----------
+        value : Any
+            np.ndarray, pd.DataFrame or EmptyReference object. Any other
+            value is returned unchanged and pickled with its task.
+
+        Raises
+        ------
+        ValueError
+            Raised when the Transport object is closed.
+
+        Returns
+        -------
+        Any
+            SharedArray, SharedFrame or SharedReference object.
+
+        """
+        if not isinstance(value, (np.ndarray, pd.DataFrame, EmptyReference)):
+            return value
+        if not self._finalizer.alive:
+            raise ValueError("Transport object is closed")
+        if id(value) in self._shared:
+            return self._shared[id(value)]
+        if isinstance(value, np.ndarray):
+            shared = self._shareArrays([np.ascontiguousarray(value)])[0]
+        elif isinstance(value, pd.DataFrame):
+            numeric = [index for index in range(value.shape[1]) if value.dtypes.iloc[index].kind in "biufc"]
+            arrays = iter(self._shareArrays([np.ascontiguousarray(value.iloc[:, index].to_numpy()) for index in numeric]))
+            shared = SharedFrame([(column, next(arrays) if index in numeric else value.iloc[:, index].tolist())
+                                  for index, column in enumerate(value.columns)])
+        else:
+            shared = SharedReference(self._shareArrays([value.spectrum])[0],
+                                     {"mOverHReal": value.mOverHReal, "mOverHImag": value.mOverHImag,
+                                      "hPhaseReal": value.hPhaseReal, "hPhaseImag": value.hPhaseImag,
+                                      "vHMax": value.vHMax, "vHOffset": value.vHOffset})
+        # The object is kept alive so its id is not reused by another object
+        self._values.append(value)
+        self._shared[id(value)] = shared
+        return shared
+
+    def close(self) -> None:
+        """
+        Closes and removes every block. It may be called more than once.
+
+        Returns
+        -------
+        None.
+
+        """
+        self._shared.clear()
+        self._values.clear()
+        self._finalizer()
+
+    @property
+    def closed(self) -> bool:
+        return not self._finalizer.alive
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+
+class _MemmapBlock(object):
+    # Memory mapped file with the close and unlink methods of a SharedMemory object
+
+    def __init__(self, block: np.memmap):
+        self._block = block
+        self.name = block.filename
+
+    def close(self) -> None:
+        if self._block is not None:
+            self._block.flush()
+            self._block = None
+
+    def unlink(self) -> None:
+        try:
+            os.remove(self.name)
+        except FileNotFoundError:
+            pass
+        except PermissionError:
+            # Windows does not remove a file which is still mapped
+            pass